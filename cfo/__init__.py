@@ -0,0 +1,13 @@
+"""Business logic for the Slushie CFO Assistant.
+
+Everything in this package is importable without a running Streamlit
+session, so the same code backs the app pages, background workers and
+command-line jobs.
+"""
+
+import os
+
+# Where caches, logs and archives are written. Override with SLUSHIE_DATA_DIR.
+DATA_DIR = os.environ.get("SLUSHIE_DATA_DIR", "data")
+
+FLAVORS = ["Blue Raspberry", "Cherry", "Lime", "Orange", "Strawberry", "Grape"]
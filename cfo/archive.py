@@ -0,0 +1,262 @@
+"""Closed months of the sales and Venmo ledgers, kept as memory-mapped Arrow files.
+
+A month is closed once the next one starts. :meth:`Archive.close_store`
+(run when a session starts) moves closed rows out of the stored ledger
+into ``DATA_DIR/archive/<dataset>.arrow``, so sessions only hold the
+open month in ``st.session_state``. A Parquet copy of each archive is
+written alongside for other tools.
+
+The Arrow file is uncompressed and holds one record batch.
+:meth:`Archive.frame` memory-maps it and builds the DataFrame on top of
+the mapped buffers without copying them (strings included). The
+operating system then shares the same pages with every session and
+every process on the host, and years of history open in milliseconds.
+Callers keep one frame per file version and hold their own open rows
+(:meth:`Archive.open_rows`) beside it, so a session costs only its open
+month.
+
+Columns outside an archive's schema (extra Venmo fields, say) are kept
+as text columns, so closing a month loses nothing.
+
+Rows are matched by ``id``: sales rows get one when they are created
+(:func:`cfo.ledger.assign_ids`), and Venmo payments carry theirs. A
+session left open across the month end may save its old rows again,
+and closing them twice adds nothing, while two real sales with the
+same values stay two rows. Rows saved before sales had IDs are matched
+by value as multisets instead: such a row is archived only as many more
+times as it appears beyond what the archive already holds.
+
+Needs pyarrow; without it nothing is archived and the ledgers stay
+whole in the store.
+"""
+
+import json
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from cfo import DATA_DIR, store
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+SALES, VENMO = "sales_data", "venmo_data"
+
+DATE_COLUMNS = {SALES: "Date", VENMO: "date"}
+# Columns that identify a row without an ID when merging
+KEYS = {SALES: ["Date", "Flavor", "Quantity", "Revenue"], VENMO: ["date", "time", "amount", "note"]}
+
+if pa is not None:
+    SCHEMAS = {
+        SALES: pa.schema([
+            ("Date", pa.timestamp("s")),
+            ("Flavor", pa.string()),
+            ("Quantity", pa.float64()),
+            ("Revenue", pa.float64()),
+            ("id", pa.string()),
+        ]),
+        VENMO: pa.schema([
+            ("id", pa.string()),
+            ("date", pa.timestamp("s")),
+            ("time", pa.string()),
+            ("amount", pa.float64()),
+            ("note", pa.string()),
+        ]),
+    }
+
+
+def available():
+    return pa is not None
+
+
+def month_start(today=None):
+    """First day of the open month; rows dated before it are closed"""
+    return pd.Timestamp(today or date.today()).normalize().replace(day=1)
+
+
+def _text(value):
+    if isinstance(value, str):
+        return value
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return json.dumps(value, default=str)
+
+
+def extra_columns(dataset, frame):
+    """Columns of ``frame`` outside the archive's schema"""
+    columns = {field.name for field in SCHEMAS[dataset]}
+    return [column for column in frame.columns if column not in columns]
+
+
+def normalize(dataset, records):
+    """Records (or a frame) as a typed frame with the archive's columns first; other columns become text"""
+    raw = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    columns = [field.name for field in SCHEMAS[dataset]]
+    extras = extra_columns(dataset, raw)
+    frame = raw.reindex(columns=columns + extras).reset_index(drop=True)
+    for column in extras:
+        frame[column] = frame[column].map(_text).astype(object)
+    date_column = DATE_COLUMNS[dataset]
+    frame[date_column] = pd.to_datetime(frame[date_column].astype("string").str[:10], errors="coerce").astype("datetime64[s]")
+    for field in SCHEMAS[dataset]:
+        if pa.types.is_floating(field.type):
+            frame[field.name] = pd.to_numeric(frame[field.name], errors="coerce").fillna(0.0).astype("float64")
+        elif pa.types.is_string(field.type):
+            frame[field.name] = frame[field.name].fillna("").astype("str")
+    return frame
+
+
+def _new_by_value(dataset, archived, rows):
+    """Mask of ``rows`` beyond what ``archived`` holds, comparing values and counting repeats"""
+    keys = KEYS[dataset]
+    if archived.empty or rows.empty:
+        return np.ones(len(rows), dtype=bool)
+
+    def numbered(frame):
+        frame = frame[keys].reset_index(drop=True)
+        return frame.assign(occurrence=frame.groupby(keys, dropna=False).cumcount())
+
+    merged = numbered(rows).merge(numbered(archived), how="left", on=keys + ["occurrence"], indicator=True)
+    return (merged["_merge"] == "left_only").to_numpy()
+
+
+def missing(dataset, archived, rows):
+    """The rows of ``rows`` the archive doesn't already hold"""
+    if archived.empty or rows.empty:
+        return rows
+    date_column = DATE_COLUMNS[dataset]
+    dated = rows[date_column].dropna()
+    if dated.empty:
+        return rows
+    # Only archived rows in the same date range can match
+    archived = archived[archived[date_column].between(dated.min(), dated.max())]
+    if archived.empty:
+        return rows
+
+    no_id = pd.Series("", index=archived.index)
+    archived_ids = archived["id"].fillna("") if "id" in archived else no_id
+    ids = rows["id"].fillna("")
+    new = ~(ids.ne("") & ids.isin(archived_ids[archived_ids.ne("")])).to_numpy()
+    # Rows without an ID may be any archived row; an unknown ID may be a row archived before IDs
+    unidentified = ids.eq("").to_numpy()
+    new[unidentified] = _new_by_value(dataset, archived, rows[unidentified])
+    unknown = new & ~unidentified
+    new[unknown] = _new_by_value(dataset, archived[archived_ids.eq("")], rows[unknown])
+    return rows[new]
+
+
+def combine(archived, rows):
+    """One frame of archived and open rows; the archived frame itself when nothing is open"""
+    if rows.empty:
+        return archived
+    if archived.empty:
+        return rows
+    return pd.concat([archived, rows], ignore_index=True)
+
+
+class Archive:
+    """Closed ledger months on disk, shared read-only through memory maps"""
+
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir or DATA_DIR
+        self.directory = os.path.join(self.data_dir, "archive")
+        self._lock = threading.Lock()
+
+    def path(self, dataset, suffix=".arrow"):
+        return os.path.join(self.directory, dataset + suffix)
+
+    def modified(self, dataset):
+        """Modification time of the archive, or None"""
+        target = self.path(dataset)
+        return os.path.getmtime(target) if os.path.exists(target) else None
+
+    def _stamp(self, dataset):
+        try:
+            stat = os.stat(self.path(dataset))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def table(self, dataset):
+        """The archive as an Arrow table over the memory-mapped file"""
+        stamp = self._stamp(dataset)
+        if stamp is None:
+            return SCHEMAS[dataset].empty_table()
+        # The table's buffers keep the map open after the reader is gone
+        return ipc.open_file(pa.memory_map(self.path(dataset))).read_all()
+
+    def frame(self, dataset):
+        """The archive as a DataFrame over the memory map; cheap to build, and read-only"""
+        return self.table(dataset).to_pandas(split_blocks=True)
+
+    def open_rows(self, dataset, records, archived=None):
+        """The open ``records`` (or frame) the archive doesn't hold yet, normalized"""
+        rows = normalize(dataset, records)
+        return missing(dataset, self.frame(dataset) if archived is None else archived, rows)
+
+    def with_open(self, dataset, records):
+        """Archived rows plus the open ``records`` (or frame) the archive doesn't hold yet"""
+        archived = self.frame(dataset)
+        return combine(archived, self.open_rows(dataset, records, archived))
+
+    def _write(self, dataset, frame):
+        extras = extra_columns(dataset, frame)
+        frame = frame.assign(**{column: frame[column].map(_text).astype(object) for column in extras})
+        # Rows archived before a column existed get it empty
+        frame = frame.assign(**{
+            field.name: frame[field.name].fillna("") if field.name in frame else ""
+            for field in SCHEMAS[dataset] if pa.types.is_string(field.type)
+        })
+        schema = pa.schema(list(SCHEMAS[dataset]) + [pa.field(column, pa.string()) for column in extras])
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False).combine_chunks()
+        os.makedirs(self.directory, exist_ok=True)
+        target = self.path(dataset)
+        with pa.OSFile(target + ".tmp", "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+        # Readers holding the old map keep the old file until they let go
+        os.replace(target + ".tmp", target)
+        pq.write_table(table, self.path(dataset, ".parquet.tmp"))
+        os.replace(self.path(dataset, ".parquet.tmp"), self.path(dataset, ".parquet"))
+
+    def close(self, dataset, records, today=None):
+        """Archive the rows of ``records`` dated before the open month.
+
+        Returns ``(open records, rows added to the archive)``; undated
+        rows stay open.
+        """
+        records = list(records)
+        if not records:
+            return records, 0
+        dates = normalize(dataset, records)[DATE_COLUMNS[dataset]]
+        closed = (dates < month_start(today)).to_numpy()
+        if not closed.any():
+            return records, 0
+        with self._lock:
+            archived = self.frame(dataset)
+            added = missing(dataset, archived, normalize(dataset, [r for r, c in zip(records, closed) if c]))
+            if not added.empty:
+                merged = pd.concat([archived, added], ignore_index=True)
+                self._write(dataset, merged.sort_values(DATE_COLUMNS[dataset], kind="stable"))
+        return [r for r, c in zip(records, closed) if not c], len(added)
+
+    def close_store(self, dataset, today=None):
+        """Move the stored ledger's closed rows into the archive; returns how many were added"""
+        value = store.load(dataset, None, self.data_dir)
+        if not value:
+            return 0
+        records = value.get("transactions", []) if dataset == VENMO else value
+        kept, added = self.close(dataset, records, today)
+        if len(kept) < len(records):
+            if dataset == VENMO:
+                value = {**value, "transactions": kept}
+            else:
+                value = kept
+            store.save(dataset, value, self.data_dir)
+        return added
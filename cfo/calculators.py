@@ -0,0 +1,90 @@
+"""Business calculators shared by the chat commands and the chat model's tools.
+
+Each function takes plain numbers and returns a dict of the inputs and
+results, so ``/calculate`` can format them and the model can be handed
+exact figures instead of doing arithmetic itself.
+"""
+
+from cfo import ledger
+
+
+def profit_margin(revenue, costs):
+    profit = revenue - costs
+    margin = (profit / revenue) * 100 if revenue > 0 else 0
+    return {"revenue": revenue, "costs": costs, "profit": profit, "margin_percent": margin}
+
+
+def break_even(fixed_costs, price, variable_cost):
+    contribution_margin = price - variable_cost
+    units = fixed_costs / contribution_margin if contribution_margin > 0 else 0
+    return {
+        "fixed_costs": fixed_costs,
+        "price": price,
+        "variable_cost": variable_cost,
+        "contribution_margin": contribution_margin,
+        "break_even_units": units,
+    }
+
+
+def markup(cost, markup_percent):
+    markup_amount = cost * (markup_percent / 100)
+    return {
+        "cost": cost,
+        "markup_percent": markup_percent,
+        "markup_amount": markup_amount,
+        "selling_price": cost + markup_amount,
+    }
+
+
+def discount(original_price, discount_percent):
+    discount_amount = original_price * (discount_percent / 100)
+    return {
+        "original_price": original_price,
+        "discount_percent": discount_percent,
+        "discount_amount": discount_amount,
+        "final_price": original_price - discount_amount,
+    }
+
+
+def tax(amount, tax_rate):
+    tax_amount = amount * (tax_rate / 100)
+    return {"amount": amount, "tax_rate": tax_rate, "tax_amount": tax_amount, "total_with_tax": amount + tax_amount}
+
+
+def tip(bill_amount, tip_percent):
+    tip_amount = bill_amount * (tip_percent / 100)
+    return {
+        "bill_amount": bill_amount,
+        "tip_percent": tip_percent,
+        "tip_amount": tip_amount,
+        "total_with_tip": bill_amount + tip_amount,
+    }
+
+
+def inventory_days(current_stock, daily_usage):
+    days_remaining = current_stock / daily_usage if daily_usage > 0 else float("inf")
+    return {"current_stock": current_stock, "daily_usage": daily_usage, "days_remaining": days_remaining}
+
+
+def roi(investment, returns):
+    roi_percent = ((returns - investment) / investment) * 100 if investment > 0 else 0
+    return {"investment": investment, "returns": returns, "roi_percent": roi_percent}
+
+
+def what_if(profit_data, cost_changes=None, revenue_change_percent=0.0):
+    """Profit Calculator figures before and after percentage changes.
+
+    ``cost_changes`` maps expense categories (``ledger.EXPENSE_CATEGORIES``)
+    to a percent change, e.g. ``{"cup_cost": 10}`` for cups costing 10%
+    more; ``revenue_change_percent`` scales total and other revenue.
+    """
+    cost_changes = cost_changes or {}
+    unknown = set(cost_changes) - set(ledger.EXPENSE_CATEGORIES)
+    if unknown:
+        raise ValueError(f"Unknown cost categories: {', '.join(sorted(unknown))}")
+    scenario = dict(profit_data)
+    for category, percent in cost_changes.items():
+        scenario[category] = profit_data[category] * (1 + percent / 100)
+    for key in ("total_sales", "other_revenue"):
+        scenario[key] = profit_data[key] * (1 + revenue_change_percent / 100)
+    return {"before": ledger.profit_summary(profit_data), "after": ledger.profit_summary(scenario)}
@@ -0,0 +1,428 @@
+"""Custom chart building for the Live Charts page.
+
+Charts are described by the config dicts stored in
+``st.session_state.custom_charts``. Building one only needs the config
+and a DataFrame, so figures can be rebuilt outside the app (for example
+by the export workers).
+"""
+
+import hashlib
+import json
+import operator
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+CHART_TYPES = ["line", "bar", "pie", "scatter", "histogram"]
+DATA_SOURCES = ["sales_data", "venmo_data", "dashboard_metrics"]
+
+# Above this many points line and scatter charts switch to WebGL traces
+# and are downsampled on the server to about MAX_POINTS
+LARGE_DATA_THRESHOLD = 5000
+MAX_POINTS = 2000
+
+AGG_FUNCS = ["none", "sum", "mean", "count", "quantile"]
+TIME_BUCKETS = {"none": None, "hour": "h", "day": "D", "week": "W-SUN", "month": "M"}
+FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+HISTOGRAM_BINS = 30
+
+# Aggregated frames keyed by (spec, data version); shared by all sessions
+_AGG_CACHE = OrderedDict()
+_AGG_CACHE_SIZE = 128
+_agg_lock = threading.Lock()
+
+
+def source_frames(sales_data, venmo_transactions, dashboard_metrics):
+    """Build the DataFrame behind each chart data source"""
+    metrics_data = [
+        {"metric": "Total Revenue", "value": dashboard_metrics["total_revenue"]},
+        {"metric": "Gross Profit", "value": dashboard_metrics["gross_profit"]},
+        {"metric": "Net Profit", "value": dashboard_metrics["net_profit"]},
+    ]
+    return {
+        "sales_data": pd.DataFrame(sales_data),
+        "venmo_data": pd.DataFrame(venmo_transactions),
+        "dashboard_metrics": pd.DataFrame(metrics_data),
+    }
+
+
+def data_version(df):
+    """Content hash of a DataFrame, stable across processes"""
+    if df.empty:
+        return "empty"
+    hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    header = json.dumps([str(c) for c in df.columns]).encode("utf-8")
+    return hashlib.sha256(header + hashed.tobytes()).hexdigest()[:16]
+
+
+def _as_float(values):
+    """Positions along the x axis as floats (dates as epoch nanoseconds)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` points that keep the shape"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle corner
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas)) if end > start else start
+        selected[i + 1] = previous
+    return np.unique(selected)
+
+
+def minmax_indices(y, n_out):
+    """Indices of the min and max point in each of ``n_out // 2`` equal buckets"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    buckets = pd.Series(y).groupby(np.arange(n) * max(1, n_out // 2) // n)
+    chosen = np.concatenate([buckets.idxmin().to_numpy(), buckets.idxmax().to_numpy(), [0, n - 1]])
+    return np.unique(chosen)
+
+
+def prepare_points(df, x_column, y_column, x_range=None, max_points=MAX_POINTS, method="lttb"):
+    """Sort, clip to ``x_range`` and downsample a frame for a line or scatter.
+
+    Returns ``(frame, total_points)``. Frames at or under the threshold
+    pass through unchanged apart from the range clip.
+    """
+    df = df.dropna(subset=[x_column, y_column])
+    if x_range is not None:
+        df = df[df[x_column].between(*x_range)]
+    total = len(df)
+    if total <= LARGE_DATA_THRESHOLD or not pd.api.types.is_numeric_dtype(df[y_column]):
+        return df, total
+
+    df = df.sort_values(x_column, kind="stable")
+    y = df[y_column].to_numpy(dtype=float)
+    if method == "minmax":
+        keep = minmax_indices(y, max_points)
+    else:
+        keep = lttb_indices(_as_float(df[x_column]), y, max_points)
+    return df.iloc[keep], total
+
+
+def x_bounds(df, x_column):
+    """Min and max of a chart's x column as plain Python values, for zoom controls"""
+    values = df[x_column].dropna()
+    bounds = []
+    for value in (values.min(), values.max()):
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        elif hasattr(value, "item"):
+            value = value.item()
+        bounds.append(value)
+    return tuple(bounds)
+
+
+def time_series(df, x_column, y_column, title):
+    """``px.line`` for app trend charts, downsampled and WebGL when large"""
+    df, total = prepare_points(df, x_column, y_column)
+    render_mode = "webgl" if total > LARGE_DATA_THRESHOLD else "auto"
+    return px.line(df, x=x_column, y=y_column, title=title, render_mode=render_mode)
+
+
+def is_large(chart_config, df):
+    """Whether a chart will be downsampled and drawn with WebGL"""
+    return (
+        df is not None
+        and chart_config["type"] in ("line", "scatter")
+        and len(df) > LARGE_DATA_THRESHOLD
+    )
+
+
+def aggregation_spec(func="sum", bucket="none", quantile=0.5, filters=None):
+    """Build the ``aggregation`` dict stored on a chart config.
+
+    ``filters`` is a list of ``{"column", "op", "value"}`` dicts where
+    ``op`` is one of ``FILTER_OPS`` or ``"in"`` (comma-separated values).
+    """
+    return {
+        "func": func,
+        "bucket": bucket,
+        "quantile": float(quantile),
+        "filters": list(filters or []),
+    }
+
+
+def chart_spec(chart_config):
+    """The aggregation a chart runs on the server, or None for raw rows.
+
+    Bar and pie charts without a spec are summed per x value, which is
+    what Plotly drew from the raw rows anyway.
+    """
+    spec = chart_config.get("aggregation")
+    if spec and (spec.get("func", "none") != "none" or spec.get("filters") or spec.get("bucket", "none") != "none"):
+        return {**aggregation_spec(), **spec}
+    if chart_config["type"] in ("bar", "pie"):
+        return aggregation_spec("sum")
+    return None
+
+
+def _is_date_objects(values):
+    sample = values.dropna()
+    return values.dtype == object and not sample.empty and isinstance(sample.iloc[0], date)
+
+
+def _as_datetime(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.Series(pd.NaT, index=values.index)
+    with warnings.catch_warnings():
+        # Free text falls back to per-element parsing; it just becomes NaT
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(values, errors="coerce")
+
+
+def _filter_mask(df, flt):
+    values = df[flt["column"]]
+    target = flt["value"]
+    if flt["op"] == "in":
+        wanted = [v.strip() for v in str(target).split(",") if v.strip()]
+        return values.astype(str).isin(wanted)
+    if pd.api.types.is_datetime64_any_dtype(values) or _is_date_objects(values):
+        values, target = _as_datetime(values), pd.Timestamp(target)
+    elif pd.api.types.is_numeric_dtype(values):
+        target = float(target)
+    else:
+        values, target = values.astype(str), str(target)
+    return FILTER_OPS[flt["op"]](values, target).fillna(False)
+
+
+def validate(chart_config, df):
+    """Check the chart's columns make sense together; returns an error message or None"""
+    spec = chart_spec(chart_config)
+    func = spec["func"] if spec else "none"
+    x_column, y_column = chart_config["x_column"], chart_config.get("y_column")
+    needs_y = chart_config["type"] != "histogram" and func != "count"
+
+    if x_column not in df:
+        return f"Column '{x_column}' is not in this data source"
+    if needs_y and y_column not in df:
+        return f"Column '{y_column}' is not in this data source"
+    if needs_y and not pd.api.types.is_numeric_dtype(df[y_column]):
+        return f"'{y_column}' is not numeric, so it can't be plotted as a {func if func != 'none' else 'value'}; try count"
+    if needs_y and spec and x_column == y_column:
+        return "Pick different X and Y columns to aggregate"
+    if spec and spec["bucket"] != "none" and _as_datetime(df[x_column].dropna().head(100)).isna().all():
+        return f"'{x_column}' holds no dates, so it can't be bucketed by {spec['bucket']}"
+    if spec and func == "quantile" and not 0 <= spec["quantile"] <= 1:
+        return "Quantile must be between 0 and 1"
+    for flt in spec["filters"] if spec else []:
+        if flt["column"] not in df:
+            return f"Filter column '{flt['column']}' is not in this data source"
+        if flt["op"] != "in" and flt["op"] not in FILTER_OPS:
+            return f"Unknown filter operator: {flt['op']}"
+    return None
+
+
+def aggregate(df, spec, x_column, y_column):
+    """Filter, bucket and aggregate ``df``; returns ``(frame, y column name)``"""
+    if spec["filters"]:
+        mask = np.ones(len(df), dtype=bool)
+        for flt in spec["filters"]:
+            mask &= _filter_mask(df, flt).to_numpy(dtype=bool)
+        df = df[mask]
+
+    keys = df[x_column]
+    period = TIME_BUCKETS.get(spec["bucket"])
+    if period:
+        keys = _as_datetime(keys).dt.to_period(period).dt.start_time
+    keys = keys.rename(x_column)
+
+    func = spec["func"]
+    if func == "count":
+        result = keys.groupby(keys, sort=True).size().rename("count")
+        return result.reset_index(), "count"
+
+    grouped = df[y_column].groupby(keys, sort=True)
+    if func == "quantile":
+        result = grouped.quantile(spec["quantile"])
+    elif func == "none":
+        # Filters or buckets without a function keep one row per point
+        return pd.DataFrame({x_column: keys.to_numpy(), y_column: df[y_column].to_numpy()}), y_column
+    else:
+        result = grouped.agg(func)
+    return result.rename(y_column).reset_index(), y_column
+
+
+def _histogram_frame(values, x_column):
+    """Server-side bins for a histogram: numeric ranges or category counts"""
+    values = values.dropna()
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        counts, edges = np.histogram(values.to_numpy(dtype=float), bins=HISTOGRAM_BINS)
+        centers = (edges[:-1] + edges[1:]) / 2
+        return pd.DataFrame({x_column: centers, "count": counts}), edges[1] - edges[0]
+    counts = values.astype(str).value_counts(sort=False).sort_index()
+    return pd.DataFrame({x_column: counts.index, "count": counts.to_numpy()}), None
+
+
+def _cached(key, build):
+    with _agg_lock:
+        if key in _AGG_CACHE:
+            _AGG_CACHE.move_to_end(key)
+            return _AGG_CACHE[key]
+    value = build()
+    with _agg_lock:
+        _AGG_CACHE[key] = value
+        while len(_AGG_CACHE) > _AGG_CACHE_SIZE:
+            _AGG_CACHE.popitem(last=False)
+    return value
+
+
+def chart_frame(chart_config, df, version=None):
+    """The small frame actually sent to Plotly for a chart.
+
+    Returns ``(frame, y column, histogram bin width or None)``. Results
+    are cached by chart spec and data version (computed here when not
+    given), so reruns don't re-aggregate unchanged data.
+    """
+    spec = chart_spec(chart_config)
+    if spec is None and chart_config["type"] != "histogram":
+        return df, chart_config["y_column"], None
+
+    raw = json.dumps(
+        [chart_config["type"], chart_config["x_column"], chart_config.get("y_column"), spec],
+        sort_keys=True, default=str,
+    )
+    key = (hashlib.sha256(raw.encode("utf-8")).hexdigest(), version or data_version(df))
+
+    def build():
+        frame, y_column = df, chart_config.get("y_column")
+        if spec:
+            frame, y_column = aggregate(df, spec, chart_config["x_column"], y_column)
+        if chart_config["type"] == "histogram":
+            frame, width = _histogram_frame(frame[chart_config["x_column"]], chart_config["x_column"])
+            return frame, "count", width
+        return frame, y_column, None
+
+    return _cached(key, build)
+
+
+def create_chart(chart_config, df, x_range=None, version=None):
+    """Create a chart based on configuration.
+
+    Bar, pie and histogram data (and line or scatter data with an
+    aggregation spec) is aggregated here, so only the aggregated frame
+    reaches Plotly. ``version`` is the data version of ``df`` when the
+    caller already knows it. Large line and scatter charts are
+    downsampled (LTTB for lines, min/max per bucket for scatters) and
+    drawn with WebGL; pass ``x_range`` to resample a zoomed-in window at
+    full resolution. Returns ``(figure, None)`` or ``(None, error message)``.
+    """
+    try:
+        if df is None or df.empty:
+            return None, "No data available"
+        error = validate(chart_config, df)
+        if error:
+            return None, error
+
+        color = chart_config.get("color", "blue")
+        title = chart_config["title"]
+        x_column = chart_config["x_column"]
+        if x_range is not None and _is_date_objects(df[x_column]):
+            x_range = tuple(v.date() if hasattr(v, "date") else v for v in x_range)
+        if x_range is not None and chart_spec(chart_config) is not None:
+            # Zoom before aggregating, so buckets are cut from the window only
+            df = df[df[x_column].between(*x_range)]
+            version, x_range = None, None
+        df, y_column, bin_width = chart_frame(chart_config, df, version)
+        if df.empty:
+            return None, "No rows match this chart's filters"
+
+        render_mode = "auto"
+        if chart_config["type"] in ("line", "scatter"):
+            df, total = prepare_points(
+                df, x_column, y_column, x_range,
+                method="lttb" if chart_config["type"] == "line" else "minmax",
+            )
+            if total > LARGE_DATA_THRESHOLD:
+                render_mode = "webgl"
+                if len(df) < total:
+                    title = f"{title} ({len(df):,} of {total:,} points)"
+
+        if chart_config["type"] == "line":
+            fig = px.line(
+                df,
+                x=x_column,
+                y=y_column,
+                title=title,
+                color_discrete_sequence=[color],
+                render_mode=render_mode
+            )
+        elif chart_config["type"] == "bar":
+            fig = px.bar(
+                df,
+                x=x_column,
+                y=y_column,
+                title=chart_config["title"],
+                color_discrete_sequence=[color]
+            )
+        elif chart_config["type"] == "pie":
+            fig = px.pie(
+                df,
+                values=y_column,
+                names=x_column,
+                title=chart_config["title"],
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+        elif chart_config["type"] == "scatter":
+            fig = px.scatter(
+                df,
+                x=x_column,
+                y=y_column,
+                title=title,
+                color_discrete_sequence=[color],
+                render_mode=render_mode
+            )
+        elif chart_config["type"] == "histogram":
+            # Bins are computed above; draw them as touching bars
+            fig = px.bar(
+                df,
+                x=x_column,
+                y=y_column,
+                title=chart_config["title"],
+                color_discrete_sequence=[color]
+            )
+            fig.update_layout(bargap=0)
+            if bin_width:
+                fig.update_traces(width=bin_width)
+        else:
+            return None, f"Unknown chart type: {chart_config['type']}"
+
+        return fig, None
+
+    except Exception as e:
+        return None, f"Error creating chart: {str(e)}"
@@ -0,0 +1,102 @@
+"""Append-only on-disk chat history.
+
+Every chat message is appended as one JSON line to
+``DATA_DIR/chat/<name>.jsonl``, one log per conversation, so sessions
+never see or clear each other's messages. The Chat Assistant only renders the
+last few messages, and reads older ones from here when asked, so a
+rerun costs the same however long the conversation has run. A byte
+offset per line (built by one scan the first time the log is read, then
+kept up to date on append) lets any slice be read with a single seek.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from cfo import DATA_DIR
+
+
+# Log names end up in file names, so only these characters are allowed
+NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def valid_name(name):
+    return bool(name) and NAME.fullmatch(name) is not None
+
+
+def path(data_dir=None, name="messages"):
+    if not valid_name(name):
+        raise ValueError(f"Invalid chat log name: {name!r}")
+    return os.path.join(data_dir or DATA_DIR, "chat", name + ".jsonl")
+
+
+class ChatLog:
+    """Messages on disk, appended in order and read back by position"""
+
+    def __init__(self, data_dir=None, name="messages"):
+        self.path = path(data_dir, name)
+        self._offsets = None
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _index(self):
+        """Byte offset of every line, scanning the file once"""
+        if self._offsets is None:
+            offsets, position = [], 0
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as handle:
+                    for line in handle:
+                        # A torn last line from a crash is overwritten by the next append
+                        if not line.endswith(b"\n"):
+                            break
+                        offsets.append(position)
+                        position += len(line)
+            self._offsets, self._end = offsets, position
+        return self._offsets
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index())
+
+    def append(self, messages):
+        """Write ``messages`` (dicts with role and content) to the end of the log"""
+        if not messages:
+            return
+        with self._lock:
+            offsets = self._index()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "ab") as handle:
+                handle.truncate(self._end)
+                for message in messages:
+                    record = {"role": message["role"], "content": message["content"]}
+                    record["at"] = message.get("at") or datetime.now().isoformat(timespec="seconds")
+                    line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                    handle.write(line)
+                    offsets.append(self._end)
+                    self._end += len(line)
+
+    def read(self, start, stop=None):
+        """Messages ``start`` (inclusive) to ``stop`` (exclusive), like a list slice"""
+        with self._lock:
+            offsets = self._index()
+            start, stop, _ = slice(start, stop).indices(len(offsets))
+            if start >= stop:
+                return []
+            end = offsets[stop] if stop < len(offsets) else self._end
+            with open(self.path, "rb") as handle:
+                handle.seek(offsets[start])
+                chunk = handle.read(end - offsets[start])
+        return [json.loads(line) for line in chunk.decode("utf-8").splitlines()]
+
+    def tail(self, n):
+        return self.read(-n) if n > 0 else []
+
+    def clear(self):
+        """Start a new, empty log"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._offsets, self._end = [], 0
+
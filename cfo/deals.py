@@ -0,0 +1,89 @@
+"""Supplier deals keyed by stable IDs, with bulk edits.
+
+Deals live in ``st.session_state.deals`` as ``{category: [deal, ...]}``.
+Every deal carries an ``id`` that never changes, so table selections
+and edits point at deals rather than list positions. :func:`bulk_update`
+deletes, re-categorizes or re-rates any set of deals and returns a new
+mapping, so a bulk action is a single assignment.
+"""
+
+import uuid
+from datetime import date
+
+import pandas as pd
+
+from cfo import fx
+
+REPORTING_PRICE = f"Price ({fx.REPORTING_CURRENCY})"
+COLUMNS = ["Item", "Supplier", "Price", "Currency", REPORTING_PRICE, "Was", "Rating", "Added"]
+
+
+def new_id():
+    return uuid.uuid4().hex[:12]
+
+
+def ensure_ids(deals):
+    """Give an ID to any deal without one (saved before IDs existed); returns how many"""
+    assigned = 0
+    for items in deals.values():
+        for deal in items:
+            if not deal.get("id"):
+                deal["id"] = new_id()
+                assigned += 1
+    return assigned
+
+
+def frame(items, rates):
+    """One row per deal, indexed by ID, with the price converted to the reporting currency"""
+    if not items:
+        return pd.DataFrame(columns=COLUMNS, index=pd.Index([], name="id"))
+    raw = pd.DataFrame(items)
+
+    def column(name, default=""):
+        return raw[name] if name in raw else pd.Series(default, index=raw.index)
+
+    table = pd.DataFrame({
+        "Item": column("item"),
+        "Supplier": column("supplier"),
+        "Price": column("price"),
+        "Currency": column("currency", fx.REPORTING_CURRENCY).fillna(fx.REPORTING_CURRENCY),
+        "Price Value": pd.to_numeric(column("price"), errors="coerce"),
+        "Was": column("original"),
+        "Rating": pd.to_numeric(column("rating", None), errors="coerce"),
+        "Added": column("added", None).fillna(date.today()),
+    })
+    table = fx.convert_ledger(table, rates, amount_col="Price Value", currency_col="Currency", date_col="Added")
+    table = table.rename(columns={f"Price Value ({fx.REPORTING_CURRENCY})": REPORTING_PRICE})
+    table.index = pd.Index(raw["id"], name="id")
+    return table[COLUMNS]
+
+
+def bulk_update(deals, ids, delete=False, category=None, rating=None):
+    """A new deals mapping with the deals in ``ids`` deleted, moved to ``category`` or re-rated.
+
+    Deals not named in ``ids`` are carried over as the same objects.
+    Returns ``(deals, categories touched)``.
+    """
+    ids = set(ids)
+    updated, touched = {}, set()
+    moved = []
+    for name, items in deals.items():
+        kept = []
+        for deal in items:
+            if deal.get("id") not in ids:
+                kept.append(deal)
+                continue
+            touched.add(name)
+            if delete:
+                continue
+            if rating is not None:
+                deal = {**deal, "rating": rating}
+            if category is not None and category != name:
+                moved.append(deal)
+            else:
+                kept.append(deal)
+        updated[name] = kept
+    if moved:
+        updated[category] = updated.get(category, []) + moved
+        touched.add(category)
+    return updated, touched
@@ -0,0 +1,88 @@
+"""Change events for the app's datasets.
+
+Every code path that mutates a dataset (sales, expenses, inventory,
+deals, Venmo, the chat command totals, the Profit Calculator inputs)
+emits a :class:`ChangeEvent` on the session's :class:`EventBus`.
+Derived views subscribe to the datasets they read and drop only what a
+change affects: P&L periods containing the changed dates, cached AI
+summaries, chart data versions, unsaved-dataset tracking.
+"""
+
+from collections import Counter, deque, namedtuple
+from itertools import chain
+
+SALES = "sales_data"
+EXPENSES = "expense_data"
+INVENTORY = "inventory_data"
+DEALS = "deals"
+VENMO = "venmo_data"
+COMMANDS = "commands_data"
+PROFIT = "profit_data"
+DATASETS = [SALES, EXPENSES, INVENTORY, DEALS, VENMO, COMMANDS, PROFIT]
+
+# "add" and "update" events name the rows they touched (dates, keys);
+# "replace" means the whole dataset may have changed
+ACTIONS = ["add", "update", "delete", "replace"]
+
+ChangeEvent = namedtuple("ChangeEvent", ["dataset", "action", "source", "dates", "keys"])
+
+
+class EventBus:
+    """Synchronous publish/subscribe for dataset changes within one session"""
+
+    def __init__(self, history=200):
+        self._handlers = {}
+        self.versions = {}
+        self.history = deque(maxlen=history)
+
+    def subscribe(self, datasets, handler):
+        """Call ``handler(event)`` for changes to any of ``datasets`` ("*" for all)"""
+        if isinstance(datasets, str):
+            datasets = [datasets]
+        for dataset in datasets:
+            self._handlers.setdefault(dataset, []).append(handler)
+
+    def emit(self, dataset, action, source, dates=(), keys=()):
+        """Record a change and notify subscribers; returns the event"""
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown change action: {action}")
+        event = ChangeEvent(dataset, action, source, tuple(dates), tuple(keys))
+        self.versions[dataset] = self.versions.get(dataset, 0) + 1
+        self.history.append(event)
+        for handler in self._handlers.get(dataset, []) + self._handlers.get("*", []):
+            handler(event)
+        return event
+
+    def version(self, *datasets):
+        """Change counter for ``datasets``; equal versions mean no events in between"""
+        return tuple(self.versions.get(dataset, 0) for dataset in datasets)
+
+
+def _row_key(record):
+    return tuple(sorted((k, str(v)) for k, v in record.items()))
+
+
+def changed_rows(old_records, new_records):
+    """Rows added, removed or edited (both versions) between two record lists"""
+    rows = {}
+    for record in chain(old_records, new_records):
+        rows.setdefault(_row_key(record), record)
+    old = Counter(map(_row_key, old_records))
+    new = Counter(map(_row_key, new_records))
+    return [rows[key] for key in (old - new) + (new - old)]
+
+
+def changed_dates(old_records, new_records, date_field="Date"):
+    """Dates of rows added, removed or edited between two record lists"""
+    return sorted({row.get(date_field) for row in changed_rows(old_records, new_records)}, key=str)
+
+
+def drop_on_change(cache, dependencies):
+    """Handler that drops ``cache`` entries whose ``dependencies`` include the changed dataset"""
+    def handler(event):
+        for entry, datasets in dependencies.items():
+            if event.dataset in datasets:
+                cache.pop(entry, None)
+    return handler
@@ -0,0 +1,171 @@
+"""Batch export of chart folders to standalone HTML/PNG report archives.
+
+Every chart is rendered once per (config, data version) pair and kept in
+an on-disk cache; a re-export only renders charts whose config or data
+changed. PNGs need kaleido. Without it charts are exported as HTML
+alone, and a small manifest beside each cached chart records why it has
+no PNG, so the chart still counts as cached. Rendering runs on a process pool (the caller's long-lived one,
+when given), and the cached files are bundled into a zip with an index
+page.
+"""
+
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+
+from cfo import DATA_DIR
+from cfo.charts import create_chart, data_version
+from cfo.marketing import worker_pool
+
+# Bump when rendering changes so cached exports are rebuilt
+EXPORT_VERSION = 2
+
+
+def chart_key(chart_config, version):
+    raw = json.dumps(chart_config, sort_keys=True, default=str) + f"|{version}|v{EXPORT_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "chart"
+
+
+PNG_UNAVAILABLE = "PNG skipped: install kaleido for PNG export"
+
+
+def png_available():
+    """Whether charts can be written as PNG"""
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _manifest_path(png_path):
+    return os.path.splitext(png_path)[0] + ".json"
+
+
+def _png_note(png_path):
+    """Why a cached chart has no PNG, from its manifest, or None"""
+    try:
+        with open(_manifest_path(png_path), encoding="utf-8") as handle:
+            return json.load(handle).get("png_error")
+    except (OSError, ValueError):
+        return None
+
+
+def _render_chart(job):
+    """Worker: write one chart's HTML and, when ``png`` is set, its PNG into the cache.
+
+    Returns an error message, or None on success. A chart left without
+    a PNG is not an error for the HTML; the reason goes in its manifest.
+    """
+    chart_config, df, html_path, png_path, png = job
+    fig, error = create_chart(chart_config, df)
+    if fig is None:
+        return error
+
+    # Charts reference a shared plotly.min.js bundled once per folder
+    fig.write_html(html_path, include_plotlyjs="directory", full_html=True)
+    png_error = None if png else PNG_UNAVAILABLE
+    if png:
+        try:
+            fig.write_image(png_path, width=1200, height=700, scale=1)
+        except Exception as e:
+            png_error = f"PNG skipped: {e}"
+    manifest = _manifest_path(png_path)
+    with open(manifest + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump({"png_error": png_error}, handle)
+    os.replace(manifest + ".tmp", manifest)
+    return png_error
+
+
+def export_folders(folders, sources, folder_names=None, cache_dir=None, workers=None, pool=None, png=None):
+    """Render every chart in ``folder_names`` (all folders by default).
+
+    ``folders`` is ``custom_charts["folders"]`` and ``sources`` maps each
+    data source name to its DataFrame. PNGs are written when ``png`` is
+    true, or by default when kaleido is installed; a cached chart missing
+    its PNG is only rendered again when PNGs are wanted. Charts render on
+    ``pool`` when given, or else on a pool of ``workers`` processes
+    started for this export. Returns a list of result dicts with
+    ``folder``, ``chart``, ``key``, ``rendered`` and ``error``.
+    """
+    cache_dir = cache_dir or os.path.join(DATA_DIR, "chart_exports")
+    os.makedirs(cache_dir, exist_ok=True)
+    versions = {name: data_version(df) for name, df in sources.items()}
+    png = png_available() if png is None else png
+
+    results, jobs = [], {}
+    for folder in folder_names or list(folders):
+        for chart_name, chart_config in folders[folder]["charts"].items():
+            source = chart_config["data_source"]
+            key = chart_key(chart_config, versions.get(source, "missing"))
+            html_path = os.path.join(cache_dir, f"{key}.html")
+            png_path = os.path.join(cache_dir, f"{key}.png")
+            stale = not os.path.exists(html_path) or (png and not os.path.exists(png_path))
+            if stale and key not in jobs:
+                jobs[key] = (chart_config, sources.get(source), html_path, png_path, png)
+            results.append({"folder": folder, "chart": chart_name, "key": key,
+                            "rendered": stale, "error": None if stale else _png_note(png_path)})
+
+    errors = {}
+    if len(jobs) == 1:
+        errors = {key: _render_chart(job) for key, job in jobs.items()}
+    elif pool is not None:
+        errors = dict(zip(jobs, pool.map(_render_chart, jobs.values(), chunksize=4)))
+    elif jobs:
+        with worker_pool(workers or min(len(jobs), os.cpu_count() or 1)) as export_pool:
+            errors = dict(zip(jobs, export_pool.map(_render_chart, jobs.values(), chunksize=4)))
+
+    for result in results:
+        if result["key"] in errors:
+            result["error"] = errors[result["key"]]
+    return results
+
+
+def build_archive(results, cache_dir=None, title="Slushie Chart Report"):
+    """Bundle exported charts into a zip (bytes) with an index page"""
+    import plotly.offline
+
+    cache_dir = cache_dir or os.path.join(DATA_DIR, "chart_exports")
+    plotly_js = plotly.offline.get_plotlyjs()
+    buffer = io.BytesIO()
+    index_rows = []
+
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for folder in dict.fromkeys(r["folder"] for r in results):
+            folder_dir = _slug(folder)
+            archive.writestr(f"{folder_dir}/plotly.min.js", plotly_js)
+            index_rows.append(f"<h2>{html.escape(folder)}</h2><ul>")
+            for result in (r for r in results if r["folder"] == folder):
+                html_path = os.path.join(cache_dir, f"{result['key']}.html")
+                png_path = os.path.join(cache_dir, f"{result['key']}.png")
+                name = _slug(result["chart"])
+                if not os.path.exists(html_path):
+                    index_rows.append(f"<li>{html.escape(result['chart'])}: {html.escape(result['error'] or 'not rendered')}</li>")
+                    continue
+                archive.write(html_path, f"{folder_dir}/{name}.html")
+                links = f'<a href="{folder_dir}/{name}.html">{html.escape(result["chart"])}</a>'
+                if os.path.exists(png_path):
+                    archive.write(png_path, f"{folder_dir}/{name}.png")
+                    links += f' (<a href="{folder_dir}/{name}.png">PNG</a>)'
+                elif result["error"]:
+                    links += f" ({html.escape(result['error'])})"
+                index_rows.append(f"<li>{links}</li>")
+            index_rows.append("</ul>")
+
+        generated = datetime.now().strftime("%Y-%m-%d %H:%M")
+        archive.writestr(
+            "index.html",
+            f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>"
+            f"<body><h1>🍧 {html.escape(title)}</h1><p>Generated {generated}</p>"
+            + "".join(index_rows) + "</body></html>",
+        )
+    return buffer.getvalue()
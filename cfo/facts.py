@@ -0,0 +1,172 @@
+"""Short text facts about the business, retrieved to ground chat answers.
+
+Each ledger is summarized into one-line facts ("July 2026 sales:
+$1,240.00 from 310 slushies, top flavor Cherry"). The facts go into a
+BM25 index (:class:`cfo.search.SearchIndex`), and each chat turn adds
+only the few facts that best match the question to the prompt. No
+network calls or embeddings are involved.
+
+Facts are grouped by source; a change event marks the sources built
+from that dataset stale, and only those are rebuilt before the next
+retrieval.
+"""
+
+import pandas as pd
+
+from cfo import events, ledger
+from cfo.search import SearchIndex, tokenize
+
+TOP_K = 8
+
+# Fact sources and the datasets each one is built from
+SOURCES = {
+    "sales": [events.SALES],
+    "pnl": [events.SALES, events.EXPENSES],
+    "inventory": [events.INVENTORY, events.SALES],
+    "deals": [events.DEALS],
+    "notes": [events.COMMANDS],
+    "totals": [events.COMMANDS],
+    "venmo": [events.VENMO],
+}
+
+# Question words that match too many facts to help ranking
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "could", "did", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "should", "so",
+    "the", "to", "was", "we", "what", "when", "which", "who", "why", "will", "with", "you",
+}
+
+
+def _money(value):
+    return f"${value:,.2f}"
+
+
+def _long_date(day):
+    return f"{day:%A %B} {day.day} {day.year}"
+
+
+def sales_facts(sales):
+    """Facts from a :func:`cfo.ledger.sales_frame`: per day, month, flavor and flavor-month"""
+    if sales.empty:
+        return []
+    facts = []
+    months = sales["Date"].dt.to_period("M")
+    by_flavor = sales.groupby("Flavor")[["Revenue", "Quantity"]].sum().sort_values("Revenue", ascending=False)
+    total = by_flavor["Revenue"].sum()
+    for flavor, row in by_flavor.iterrows():
+        share = row["Revenue"] / total * 100 if total else 0
+        facts.append(
+            f"{flavor} all-time sales: {_money(row['Revenue'])} from {row['Quantity']:,.0f} slushies "
+            f"({share:.1f}% of revenue)"
+        )
+    for month, group in sales.groupby(months):
+        flavors = group.groupby("Flavor")["Revenue"].sum()
+        facts.append(
+            f"{month.strftime('%B %Y')} sales ({month}): {_money(group['Revenue'].sum())} from "
+            f"{group['Quantity'].sum():,.0f} slushies, top flavor {flavors.idxmax()}"
+        )
+    for (month, flavor), row in sales.groupby([months, "Flavor"])[["Revenue", "Quantity"]].sum().iterrows():
+        facts.append(
+            f"{flavor} sales in {month.strftime('%B %Y')}: {_money(row['Revenue'])} from {row['Quantity']:,.0f} slushies"
+        )
+    daily = sales.groupby(sales["Date"].dt.normalize())[["Revenue", "Quantity"]].sum()
+    for day, row in daily.iterrows():
+        facts.append(
+            f"Sales on {_long_date(day)} ({day.date()}): {_money(row['Revenue'])} "
+            f"from {row['Quantity']:,.0f} slushies"
+        )
+    best = daily["Revenue"].idxmax()
+    facts.append(f"Best sales day: {_long_date(best)} with {_money(daily.loc[best, 'Revenue'])}")
+    return facts
+
+
+def pnl_facts(statements):
+    """Facts from monthly :meth:`cfo.ledger.PnLEngine.statements`"""
+    facts = []
+    for period, row in statements.iterrows():
+        facts.append(
+            f"{period.strftime('%B %Y')} profit and loss (P&L): revenue {_money(row['total_revenue'])}, "
+            f"COGS {_money(row['total_cogs'])}, expenses {_money(row['total_expenses'])}, "
+            f"gross profit {_money(row['gross_profit'])}, net profit {_money(row['net_profit'])} "
+            f"({row['net_margin']:.1f}% net margin)"
+        )
+    return facts
+
+
+def inventory_facts(inventory_data, sales):
+    """Syrup on hand per flavor, with days of stock at recent usage"""
+    facts = []
+    table = ledger.days_of_stock(inventory_data, sales)
+    for flavor, row in table.iterrows():
+        days = "no recent sales" if row["Days of Stock"] == float("inf") else f"about {row['Days of Stock']:.0f} days of stock"
+        facts.append(f"{flavor} syrup inventory on hand: {row['Gallons']:g} gallons ({days})")
+    return facts
+
+
+def deal_facts(deals):
+    """One fact per saved supplier deal"""
+    facts = []
+    for category, items in deals.items():
+        for deal in items:
+            was = f" (was {deal['original']})" if deal.get("original") else ""
+            facts.append(
+                f"Deal on {category}: {deal.get('item', '')} from {deal.get('supplier') or 'unknown supplier'} "
+                f"at {deal.get('price', '')} {deal.get('currency', 'USD')}{was}, rated {deal.get('rating', '')} stars"
+            )
+    return facts
+
+
+def note_facts(notes):
+    return [f"Note saved by the owner: {note}" for note in notes]
+
+
+def totals_facts(commands_data):
+    """The running totals kept by the chat commands"""
+    return [
+        f"Net profits tracked in chat: {_money(commands_data.get('net_profits', 0.0))}",
+        f"Total sales tracked in chat: {commands_data.get('total_sales', 0):,} units",
+        f"Best day recorded in chat: {commands_data.get('best_day', 'None')}",
+    ]
+
+
+def venmo_facts(venmo_data):
+    """Venmo connection status and payment totals"""
+    transactions = venmo_data.get("transactions", [])
+    facts = [
+        f"Venmo is {'connected' if venmo_data.get('connected') else 'not connected'}; "
+        f"today's Venmo payments total {_money(venmo_data.get('daily_total', 0.0))}",
+    ]
+    if transactions:
+        amounts = pd.to_numeric(pd.Series([t.get("amount") for t in transactions]), errors="coerce")
+        facts.append(
+            f"Venmo payments synced: {len(transactions):,} totaling {_money(amounts.sum())}, "
+            f"average {_money(amounts.mean())}"
+        )
+    return facts
+
+
+class FactIndex:
+    """BM25 index of business facts, rebuilt per source when its data changes"""
+
+    def __init__(self):
+        self.index = SearchIndex()
+        self.stale = set(SOURCES)
+
+    def mark_changed(self, event):
+        """Change-event handler: mark the sources built from ``event.dataset`` stale"""
+        self.stale.update(source for source, datasets in SOURCES.items() if event.dataset in datasets)
+
+    def refresh(self, builders):
+        """Rebuild stale sources; ``builders`` maps source name to a function returning its facts"""
+        for source in list(self.stale):
+            if source not in builders:
+                continue
+            self.index.reset(source)
+            for position, fact in enumerate(builders[source]()):
+                self.index.add((source, position), source, fact, fact)
+            self.stale.discard(source)
+
+    def top(self, question, k=TOP_K):
+        """The ``k`` facts most relevant to ``question``"""
+        query = " ".join(word for word in tokenize(question) if word not in STOP_WORDS)
+        return [hit.ref for hit in self.index.search(query, limit=k)]
@@ -0,0 +1,169 @@
+"""Hourly demand forecast from the sales ledger, Venmo payment times and weather.
+
+Demand is modelled in two parts:
+
+- drinks per day, a ridge regression on weekday, high temperature and
+  precipitation. One model per stand, all solved together by
+  :func:`fit_batched`. Sales without a ``Stand`` column count as one
+  stand.
+- each hour's share of the day's drinks, per weekday, from the times of
+  Venmo payments. Every weekday's profile is shrunk toward the
+  all-week profile, so days with few timed payments still get a
+  sensible shape.
+
+The hourly forecast is the daily forecast times the hour's share.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cfo import notes
+
+DEFAULT_GROUP = "All"
+# Opening hours assumed until payment times show otherwise
+DEFAULT_HOURS = (11, 19)
+# Pseudo-drinks pulling each weekday's hourly profile toward the all-week one
+PROFILE_PRIOR = 24
+# Share of the all-week drinks an hour needs to count as open
+OPEN_SHARE = 0.01
+RIDGE = 1.0
+DEFAULT_TEMP = 25.0
+
+FEATURES = ["intercept"] + [f"weekday_{day}" for day in range(1, 7)] + ["temp_max", "precipitation"]
+
+
+def fit_batched(X, y, groups, ridge=RIDGE, penalize=None):
+    """Ridge coefficients for every group in one batched solve.
+
+    ``X`` is (rows, features), ``y`` and ``groups`` are per row, and
+    ``penalize`` masks the features the ridge applies to (all by
+    default). Returns ``(group labels, coefficients)`` with one row of
+    coefficients per label.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    labels, codes = np.unique(np.asarray(groups), return_inverse=True)
+    count, k = len(labels), X.shape[1]
+    # Every group's normal equations, built with one weighted count per feature pair
+    gram = np.empty((count, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            gram[:, i, j] = gram[:, j, i] = np.bincount(codes, weights=X[:, i] * X[:, j], minlength=count)
+    moment = np.stack([np.bincount(codes, weights=X[:, i] * y, minlength=count) for i in range(k)], axis=1)
+    mask = np.ones(k, dtype=bool) if penalize is None else np.asarray(penalize, dtype=bool)
+    penalty = np.diag(np.where(mask, ridge, 0.0))
+    return labels, np.linalg.solve(gram + penalty, moment[..., None])[..., 0]
+
+
+def design(dates, temp_max, precipitation, temp_center=DEFAULT_TEMP):
+    """Feature matrix (see ``FEATURES``) for days and their weather"""
+    weekday = pd.DatetimeIndex(dates).weekday.to_numpy()
+    X = np.zeros((len(weekday), len(FEATURES)))
+    X[:, 0] = 1.0
+    X[:, 1:7] = weekday[:, None] == np.arange(1, 7)
+    X[:, 7] = np.asarray(temp_max, dtype=float) - temp_center
+    X[:, 8] = np.asarray(precipitation, dtype=float)
+    return X
+
+
+def daily_demand(sales, weather=None):
+    """Drinks sold per stand and day, with that day's high temperature and precipitation"""
+    stand = sales["Stand"].astype(str) if "Stand" in sales else DEFAULT_GROUP
+    daily = (
+        sales.assign(Date=pd.to_datetime(sales["Date"]).dt.normalize(), group=stand)
+        .groupby(["group", "Date"], as_index=False)["Quantity"].sum()
+    )
+    if weather is not None and not weather.empty:
+        daily = daily.merge(
+            weather[["Date", "temp_max", "precipitation"]].assign(Date=pd.to_datetime(weather["Date"]).dt.normalize()),
+            on="Date", how="left"
+        )
+    else:
+        daily["temp_max"] = np.nan
+        daily["precipitation"] = np.nan
+    # Days without weather get typical weather, so they still inform the weekday levels
+    temp = pd.to_numeric(daily["temp_max"], errors="coerce")
+    daily["temp_max"] = temp.fillna(temp.mean() if temp.notna().any() else DEFAULT_TEMP)
+    daily["precipitation"] = pd.to_numeric(daily["precipitation"], errors="coerce").fillna(0.0)
+    return daily
+
+
+def payment_hours(payments):
+    """Drinks per payment with the payment's weekday and hour; payments without a time are left out"""
+    orders = notes.orders_frame(payments)
+    times = orders["time"].astype("string").str.strip()
+    clock = pd.to_datetime(times, format="%H:%M", errors="coerce")
+    clock = clock.fillna(pd.to_datetime(times, format="%I:%M %p", errors="coerce"))
+    days = pd.to_datetime(orders["date"].astype("string").str[:10], errors="coerce")
+    timed = clock.notna() & days.notna()
+    return pd.DataFrame({
+        "weekday": days[timed].dt.weekday.to_numpy(),
+        "hour": clock[timed].dt.hour.to_numpy(),
+        "drinks": orders.loc[timed, "quantity"].to_numpy(dtype=float),
+    })
+
+
+def hourly_profiles(payments=None):
+    """Share of each weekday's drinks per hour, a (7, 24) array whose rows sum to 1"""
+    counts = np.zeros((7, 24))
+    if payments is not None and len(payments):
+        timed = payment_hours(payments)
+        np.add.at(counts, (timed["weekday"].to_numpy(), timed["hour"].to_numpy()), timed["drinks"].to_numpy())
+    overall = counts.sum(axis=0)
+    if overall.sum() == 0:
+        overall = np.zeros(24)
+        overall[DEFAULT_HOURS[0]:DEFAULT_HOURS[1]] = 1.0
+    overall = overall / overall.sum()
+    return (counts + PROFILE_PRIOR * overall) / (counts.sum(axis=1, keepdims=True) + PROFILE_PRIOR)
+
+
+class DemandModel:
+    """Daily demand coefficients per stand plus hourly profiles per weekday"""
+
+    def __init__(self, groups, coefficients, temp_center, profiles, observations=0):
+        self.groups = list(groups)
+        self.coefficients = coefficients
+        self.temp_center = temp_center
+        self.profiles = profiles
+        self.observations = observations
+
+    @classmethod
+    def fit(cls, sales, payments=None, weather=None):
+        """Fit from a sales frame (Date, Quantity, optional Stand), Venmo payments and daily weather"""
+        profiles = hourly_profiles(payments)
+        if sales.empty:
+            return cls([DEFAULT_GROUP], np.zeros((1, len(FEATURES))), DEFAULT_TEMP, profiles)
+        daily = daily_demand(sales, weather)
+        temp_center = float(daily["temp_max"].mean())
+        X = design(daily["Date"], daily["temp_max"], daily["precipitation"], temp_center)
+        groups, coefficients = fit_batched(
+            X, daily["Quantity"], daily["group"],
+            penalize=[name != "intercept" for name in FEATURES]
+        )
+        return cls(groups, coefficients, temp_center, profiles, observations=len(daily))
+
+    def open_hours(self):
+        """(first hour, hour after the last) with a meaningful share of drinks"""
+        busy = np.flatnonzero(self.profiles.mean(axis=0) >= OPEN_SHARE)
+        if not len(busy):
+            return DEFAULT_HOURS
+        return int(busy[0]), int(busy[-1]) + 1
+
+    def daily(self, dates, temp_max, precipitation, group=DEFAULT_GROUP):
+        """Expected drinks on each day (never negative)"""
+        coefficients = self.coefficients[self.groups.index(group) if group in self.groups else 0]
+        dates = pd.DatetimeIndex(dates)
+        temp_max = np.broadcast_to(np.asarray(temp_max, dtype=float), (len(dates),))
+        precipitation = np.broadcast_to(np.asarray(precipitation, dtype=float), (len(dates),))
+        return np.clip(design(dates, temp_max, precipitation, self.temp_center) @ coefficients, 0.0, None)
+
+    def hourly(self, dates, temp_max, precipitation, group=DEFAULT_GROUP):
+        """Expected drinks per day and hour: a frame of Date, hour and drinks"""
+        dates = pd.DatetimeIndex(dates).normalize()
+        per_day = self.daily(dates, temp_max, precipitation, group)
+        drinks = per_day[:, None] * self.profiles[dates.weekday]
+        return pd.DataFrame({
+            "Date": np.repeat(dates, 24),
+            "hour": np.tile(np.arange(24), len(dates)),
+            "drinks": drinks.ravel(),
+        })
@@ -0,0 +1,114 @@
+"""Dated FX rate table and vectorized ledger conversion.
+
+Rates are stored as US dollars per one unit of each currency, one row per
+day. Converting a ledger looks up every row's rate as of its transaction
+date in a single NumPy pass, so whole ledgers convert at once.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+REPORTING_CURRENCY = "USD"
+CURRENCIES = ["USD", "EUR", "GBP", "CAD"]
+
+# Used when no rate file is configured: the rates the app has always shown
+STAND_IN_RATES = {"USD": 1.0, "EUR": 1.18, "GBP": 1.37, "CAD": 0.80}
+
+
+class RateTable:
+    """Daily USD-per-unit rates for a set of currencies.
+
+    Dates missing from the source are filled forward, so a lookup returns
+    the latest rate on or before the requested date. Dates before the
+    first row use the first row.
+    """
+
+    def __init__(self, frame):
+        frame = frame.copy()
+        frame.index = pd.to_datetime(frame.index).normalize()
+        frame = frame.sort_index()
+        frame = frame[~frame.index.duplicated(keep="last")]
+        if REPORTING_CURRENCY not in frame:
+            frame[REPORTING_CURRENCY] = 1.0
+        frame = frame.ffill().bfill()
+
+        self.currencies = pd.Index(frame.columns)
+        self._dates = frame.index.values.astype("datetime64[ns]")
+        self._rates = frame.to_numpy(dtype=float)
+
+    @property
+    def latest_date(self):
+        return pd.Timestamp(self._dates[-1])
+
+    def rate(self, from_currency, to_currency, on=None):
+        """Units of ``to_currency`` per one ``from_currency`` on a date"""
+        on = pd.Timestamp(on) if on is not None else self.latest_date
+        factors = self.factors([from_currency], [on], to_currency)
+        return float(factors[0])
+
+    def factors(self, currencies, dates, to_currency=REPORTING_CURRENCY):
+        """Vectorized conversion factors into ``to_currency``.
+
+        ``currencies`` and ``dates`` are equal-length array-likes; blank
+        currencies are treated as the reporting currency.
+        """
+        # Ledgers hold few distinct currencies and days: resolve each once,
+        # then broadcast back to the rows by code
+        if not hasattr(currencies, "dtype"):
+            currencies = np.asarray(currencies, dtype=object)
+        codes, uniques = pd.factorize(currencies, use_na_sentinel=False)
+        uniques = pd.Index(uniques).fillna(REPORTING_CURRENCY)
+        lookup = self.currencies.get_indexer(uniques)
+        if (lookup < 0).any():
+            unknown = sorted(map(str, uniques[lookup < 0]))
+            raise KeyError(f"No FX rates for: {', '.join(unknown)}")
+        columns = lookup[codes]
+        target = self.currencies.get_loc(to_currency)
+
+        day_codes, days = pd.factorize(pd.to_datetime(np.asarray(dates)).normalize())
+        rows = np.searchsorted(self._dates, days.values.astype("datetime64[ns]"), side="right") - 1
+        np.clip(rows, 0, len(self._dates) - 1, out=rows)
+        rows = rows[day_codes]
+
+        return self._rates[rows, columns] / self._rates[rows, target]
+
+
+def convert_ledger(df, rates, amount_col="Amount", currency_col="Currency", date_col="Date",
+                   to_currency=REPORTING_CURRENCY):
+    """Return ``df`` with a ``<amount_col> (<to_currency>)`` column added.
+
+    Rows with no currency column or a blank currency are taken to be in
+    the reporting currency already.
+    """
+    if df.empty:
+        return df.assign(**{f"{amount_col} ({to_currency})": pd.Series(dtype=float)})
+    currencies = df[currency_col] if currency_col in df else pd.Series(REPORTING_CURRENCY, index=df.index)
+    factors = rates.factors(currencies.values, df[date_col].values, to_currency)
+    amounts = pd.to_numeric(df[amount_col], errors="coerce").to_numpy(dtype=float)
+    return df.assign(**{f"{amount_col} ({to_currency})": amounts * factors})
+
+
+def stand_in_rates():
+    """A flat rate table built from :data:`STAND_IN_RATES`"""
+    frame = pd.DataFrame([STAND_IN_RATES], index=[pd.Timestamp("2000-01-01")])
+    return RateTable(frame)
+
+
+@lru_cache(maxsize=4)
+def _load_rate_file(path, mtime):
+    frame = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+    return RateTable(frame)
+
+
+def load_rates(path=None):
+    """Load a rate file (``Date`` plus one USD-per-unit column per currency).
+
+    Results are cached until the file changes on disk. Without a usable
+    file the stand-in table is returned.
+    """
+    if path and os.path.exists(path):
+        return _load_rate_file(path, os.path.getmtime(path))
+    return stand_in_rates()
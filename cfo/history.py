@@ -0,0 +1,228 @@
+"""Undo, redo and time travel for a list of records.
+
+:class:`ChangeLog` keeps an append-only log of changes to a record list
+(the sales ledger). An entry holds only the rows a change removed and
+inserted, with their positions, so memory grows with the edits rather
+than with copies of the table. Undo and redo append the inverse (or the
+original) change instead of rewinding, so the log stays a faithful
+timeline of what the data looked like at any moment.
+
+The table itself is held as a list of immutable chunks of rows. A
+change rebuilds only the chunks it touches, and every ``SNAPSHOT_EVERY``
+entries the log keeps a snapshot: a tuple of the current chunks, shared
+with the live table and earlier snapshots. Viewing the data as of a
+past time starts from the nearest snapshot (or from the present, if
+that is closer) and replays only the entries in between.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime
+from itertools import chain
+
+CHUNK_SIZE = 256
+SNAPSHOT_EVERY = 32
+
+_BLOCK = 512
+
+# ``splices`` are (position, removed rows, inserted rows), ascending and
+# non-overlapping, with positions in the table as it was before the change
+Change = namedtuple("Change", ["at", "source", "splices"])
+
+
+def _same(a, b):
+    return a is b or a == b
+
+
+def diff(old, new):
+    """Splices turning ``old`` into ``new``.
+
+    One linear pass that recognizes what a table editor does: rows
+    edited in place, deleted, or added at the end. Any other reordering
+    still yields a correct (if larger) set of splices.
+    """
+    splices = []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        # Unchanged stretches are compared a block at a time
+        block = old[i:i + _BLOCK]
+        if block == new[j:j + _BLOCK]:
+            i += len(block)
+            j += len(block)
+            continue
+        while i < len(old) and j < len(new) and _same(old[i], new[j]):
+            i += 1
+            j += 1
+        if i == len(old) or j == len(new):
+            break
+        # More rows left in old than new: try reading this as a deleted run
+        deficit = (len(old) - i) - (len(new) - j)
+        run = next((k for k in range(1, deficit + 1) if _same(old[i + k], new[j])), 0)
+        if run:
+            removed, inserted = old[i:i + run], []
+            i += run
+        else:
+            removed, inserted = [old[i]], [new[j]]
+            i += 1
+            j += 1
+        # Merge with the previous splice when adjacent
+        if splices and splices[-1][0] + len(splices[-1][1]) == i - len(removed):
+            splices[-1] = (splices[-1][0], splices[-1][1] + removed, splices[-1][2] + inserted)
+        else:
+            splices.append((i - len(removed), removed, inserted))
+    if i < len(old) or j < len(new):
+        if splices and splices[-1][0] + len(splices[-1][1]) == i:
+            splices[-1] = (splices[-1][0], splices[-1][1] + old[i:], splices[-1][2] + new[j:])
+        else:
+            splices.append((i, old[i:], new[j:]))
+    return tuple((position, tuple(removed), tuple(inserted)) for position, removed, inserted in splices)
+
+
+def inverse(splices):
+    """Splices that undo ``splices``, in the coordinates of the table after them"""
+    undone, shift = [], 0
+    for position, removed, inserted in splices:
+        undone.append((position + shift, inserted, removed))
+        shift += len(inserted) - len(removed)
+    return tuple(undone)
+
+
+def changed_rows(change):
+    """Every row a change removed or inserted"""
+    return [row for _, removed, inserted in change.splices for row in chain(removed, inserted)]
+
+
+class _Chunks:
+    """A row sequence stored as immutable chunks; editing one range rebuilds only its chunks"""
+
+    def __init__(self, chunks=()):
+        self.chunks = list(chunks)
+        self._reindex(0)
+
+    @classmethod
+    def of(cls, rows):
+        rows = tuple(rows)
+        return cls(rows[k:k + CHUNK_SIZE] for k in range(0, len(rows), CHUNK_SIZE))
+
+    def _reindex(self, first):
+        starts = self.starts[:first] if first else []
+        total = starts[-1] + len(self.chunks[first - 1]) if first else 0
+        for chunk in self.chunks[first:]:
+            starts.append(total)
+            total += len(chunk)
+        self.starts, self.length = starts, total
+
+    def __len__(self):
+        return self.length
+
+    def rows(self):
+        return list(chain.from_iterable(self.chunks))
+
+    def splice(self, position, count, inserted):
+        """Replace ``count`` rows at ``position`` with ``inserted``"""
+        if not self.chunks:
+            self.chunks = _Chunks.of(inserted).chunks
+            self._reindex(0)
+            return
+        first = max(bisect_right(self.starts, position) - 1, 0)
+        last = max(bisect_right(self.starts, position + count - 1) - 1, first) if count else first
+        merged = (
+            self.chunks[first][:position - self.starts[first]]
+            + tuple(inserted)
+            + self.chunks[last][position + count - self.starts[last]:]
+        )
+        self.chunks[first:last + 1] = [merged[k:k + CHUNK_SIZE] for k in range(0, len(merged), CHUNK_SIZE)]
+        self._reindex(first)
+
+    def apply(self, splices):
+        # Right to left, so earlier positions stay valid
+        for position, removed, inserted in reversed(splices):
+            self.splice(position, len(removed), inserted)
+
+
+class ChangeLog:
+    """Append-only change history of a record list, with undo, redo and as-of views"""
+
+    def __init__(self, records=(), clock=datetime.now):
+        self.clock = clock
+        self.entries = []
+        self._table = _Chunks.of(records)
+        # (entries applied, time, chunks); the first is the starting table
+        self._snapshots = [(0, None, tuple(self._table.chunks))]
+        self._undo = []
+        self._redo = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def records(self):
+        """A new list of the current rows (the row dicts themselves are shared)"""
+        return self._table.rows()
+
+    def _append(self, source, splices):
+        change = Change(self.clock(), source, splices)
+        self._table.apply(splices)
+        self.entries.append(change)
+        if len(self.entries) % SNAPSHOT_EVERY == 0:
+            self._snapshots.append((len(self.entries), change.at, tuple(self._table.chunks)))
+        return change
+
+    def commit(self, records, source):
+        """Record the difference between the logged table and ``records``; returns the change, if any"""
+        splices = diff(self._table.rows(), list(records))
+        if not splices:
+            return None
+        self._redo.clear()
+        change = self._append(source, splices)
+        self._undo.append(len(self.entries) - 1)
+        return change
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """Revert the latest change not yet undone; returns the change appended to do it"""
+        if not self._undo:
+            return None
+        original = self.entries[self._undo.pop()]
+        self._redo.append(original)
+        return self._append(f"Undo: {original.source.removeprefix('Redo: ')}", inverse(original.splices))
+
+    def redo(self):
+        """Re-apply the latest undone change; returns the change appended to do it"""
+        if not self._redo:
+            return None
+        original = self._redo.pop()
+        change = self._append(f"Redo: {original.source}", original.splices)
+        self._undo.append(len(self.entries) - 1)
+        return change
+
+    def as_of(self, when):
+        """The rows as they were at ``when`` (a datetime)"""
+        applied = bisect_right([change.at for change in self.entries], when)
+        if applied == len(self.entries):
+            return self.records()
+        snapshot = max(
+            (s for s in self._snapshots if s[0] <= applied),
+            key=lambda s: s[0],
+        )
+        if len(self.entries) - applied < applied - snapshot[0]:
+            # Closer to the present: step back from the live table
+            table = _Chunks(self._table.chunks)
+            for change in reversed(self.entries[applied:]):
+                table.apply(inverse(change.splices))
+        else:
+            table = _Chunks(snapshot[2])
+            for change in self.entries[snapshot[0]:applied]:
+                table.apply(change.splices)
+        return table.rows()
+
+    def timeline(self):
+        """(time, source, rows removed, rows added) per entry, oldest first"""
+        return [
+            (change.at, change.source, sum(len(s[1]) for s in change.splices), sum(len(s[2]) for s in change.splices))
+            for change in self.entries
+        ]
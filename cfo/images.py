@@ -0,0 +1,188 @@
+"""Background image generation with a prompt-hash result cache.
+
+Jobs are keyed by a hash of the generator, size and normalized prompt.
+Finished images and their thumbnails are written to disk under that key,
+so a prompt is only ever generated once, and a prompt already queued or
+running is joined rather than submitted again.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import textwrap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from cfo import DATA_DIR
+
+THUMBNAIL_SIZE = (256, 256)
+
+# Tried in order; the first one PIL can open wins
+FONT_CANDIDATES = ["arial.ttf", "Arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"]
+
+
+@lru_cache(maxsize=None)
+def load_font(size=20, bold=False):
+    """Return a TrueType font, resolved once per size"""
+    candidates = FONT_CANDIDATES
+    if bold:
+        candidates = ["arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf"] + candidates
+    for name in candidates:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+class ImageGenerator:
+    """Interface for anything that turns a prompt into PNG bytes"""
+
+    name = "base"
+
+    def generate(self, prompt, size):
+        raise NotImplementedError
+
+
+class PlaceholderGenerator(ImageGenerator):
+    """Local stand-in that draws the prompt onto a tinted card"""
+
+    name = "placeholder"
+
+    def generate(self, prompt, size):
+        width, height = size
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        background = (150 + digest[0] % 100, 180 + digest[1] % 70, 200 + digest[2] % 55)
+
+        image = Image.new("RGB", size, color=background)
+        draw = ImageDraw.Draw(image)
+        draw.text((20, 20), "AI Generated Image", fill="black", font=load_font(28, bold=True))
+        body = load_font(18)
+        for line_number, line in enumerate(textwrap.wrap(prompt, width=max(20, width // 11))[:12]):
+            draw.text((20, 70 + line_number * 24), line, fill="black", font=body)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+class OpenAIImageGenerator(ImageGenerator):
+    """Generates images with the OpenAI Images API"""
+
+    name = "openai"
+
+    def __init__(self, client, model="dall-e-3"):
+        self.client = client
+        self.model = model
+
+    def generate(self, prompt, size):
+        response = self.client.images.generate(
+            model=self.model,
+            prompt=prompt,
+            size=f"{size[0]}x{size[1]}",
+            response_format="b64_json",
+            n=1,
+        )
+        return base64.b64decode(response.data[0].b64_json)
+
+
+class ImageJob:
+    """State of one generation request"""
+
+    def __init__(self, key, prompt, size):
+        self.key = key
+        self.prompt = prompt
+        self.size = size
+        self.status = "queued"
+        self.error = None
+        self.image_path = None
+        self.thumbnail_path = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+
+class ImageJobQueue:
+    """Runs image jobs on a small thread pool, caching results on disk.
+
+    One queue is meant to be shared by every session in the process.
+    """
+
+    def __init__(self, generator, cache_dir=None, workers=2):
+        self.generator = generator
+        self.cache_dir = cache_dir or os.path.join(DATA_DIR, "images")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def job_key(self, prompt, size):
+        normalized = " ".join(prompt.lower().split())
+        raw = f"{self.generator.name}|{size[0]}x{size[1]}|{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def submit(self, prompt, size=(1024, 1024)):
+        """Queue a prompt and return its job key.
+
+        Cached prompts complete immediately; prompts already in flight
+        return the existing job.
+        """
+        key = self.job_key(prompt, size)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed":
+                return key
+
+            job = ImageJob(key, prompt, size)
+            image_path, thumbnail_path = self._paths(key)
+            if os.path.exists(image_path) and os.path.exists(thumbnail_path):
+                job.status = "done"
+                job.image_path, job.thumbnail_path = image_path, thumbnail_path
+                job.finished_at = time.time()
+                self._jobs[key] = job
+                return key
+
+            self._jobs[key] = job
+        self._executor.submit(self._run, job)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _paths(self, key):
+        return (
+            os.path.join(self.cache_dir, f"{key}.png"),
+            os.path.join(self.cache_dir, f"{key}_thumb.png"),
+        )
+
+    def _run(self, job):
+        job.status = "running"
+        try:
+            data = self.generator.generate(job.prompt, job.size)
+            image_path, thumbnail_path = self._paths(job.key)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Write to temporary names first so readers never see half a file
+            with open(image_path + ".tmp", "wb") as handle:
+                handle.write(data)
+            thumbnail = Image.open(io.BytesIO(data))
+            thumbnail.thumbnail(THUMBNAIL_SIZE)
+            thumbnail.save(thumbnail_path + ".tmp", format="PNG")
+            os.replace(image_path + ".tmp", image_path)
+            os.replace(thumbnail_path + ".tmp", thumbnail_path)
+
+            job.image_path, job.thumbnail_path = image_path, thumbnail_path
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
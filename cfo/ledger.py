@@ -0,0 +1,308 @@
+"""Expense ledger and period-close P&L engine.
+
+Sales rows use the app's ``{"Date", "Flavor", "Quantity", "Revenue"}``
+shape, plus an ``id`` (:func:`assign_ids`) that tells two identical
+sales apart. Expense rows carry one of the Profit Calculator
+categories, and a recurrence so rent, labor and similar items only
+need entering once.
+"""
+
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+from cfo import fx
+
+COGS_CATEGORIES = ["syrup_cost", "cup_cost", "ice_cost", "other_cogs"]
+OPEX_CATEGORIES = ["rent", "utilities", "labor", "marketing", "other_expenses"]
+EXPENSE_CATEGORIES = COGS_CATEGORIES + OPEX_CATEGORIES
+
+# Same labels the Profit Calculator uses for its inputs
+CATEGORY_LABELS = {
+    "syrup_cost": "Syrup Cost",
+    "cup_cost": "Cup & Straw Cost",
+    "ice_cost": "Ice Cost",
+    "other_cogs": "Other COGS",
+    "rent": "Rent",
+    "utilities": "Utilities",
+    "labor": "Labor",
+    "marketing": "Marketing",
+    "other_expenses": "Other Expenses",
+}
+
+RECURRENCES = {"One-time": None, "Daily": "D", "Weekly": "7D", "Monthly": "MS"}
+
+# Syrup used per slushie sold: one fluid ounce
+SYRUP_GALLONS_PER_SERVING = 1 / 128
+
+# A season is the calendar year the stand operates in
+PERIODS = {"day": "D", "week": "W-SUN", "month": "M", "season": "Y"}
+
+
+def empty_profit_data():
+    """Return a blank Profit Calculator input dict"""
+    data = {"total_sales": 0.0, "other_revenue": 0.0}
+    data.update({category: 0.0 for category in EXPENSE_CATEGORIES})
+    return data
+
+
+def profit_summary(profit_data):
+    """Apply the Profit Calculator formulas to a profit_data dict"""
+    total_revenue = profit_data["total_sales"] + profit_data["other_revenue"]
+    total_cogs = sum(profit_data[c] for c in COGS_CATEGORIES)
+    total_expenses = sum(profit_data[c] for c in OPEX_CATEGORIES)
+
+    gross_profit = total_revenue - total_cogs
+    net_profit = gross_profit - total_expenses
+
+    return {
+        "total_revenue": total_revenue,
+        "total_cogs": total_cogs,
+        "total_expenses": total_expenses,
+        "gross_profit": gross_profit,
+        "net_profit": net_profit,
+        "gross_margin": (gross_profit / total_revenue) * 100 if total_revenue > 0 else 0,
+        "net_margin": (net_profit / total_revenue) * 100 if total_revenue > 0 else 0,
+    }
+
+
+def assign_ids(sales_data):
+    """Give every sales record without an ``id`` a new one, in place; returns how many got one"""
+    assigned = 0
+    for record in sales_data:
+        value = record.get("id")
+        if value is None or value != value or value == "":
+            record["id"] = uuid.uuid4().hex[:16]
+            assigned += 1
+        elif not isinstance(value, str):
+            record["id"] = str(value)
+    return assigned
+
+
+def sales_frame(sales_data):
+    """Normalize sales records into a typed DataFrame, dropping undated rows"""
+    df = pd.DataFrame(sales_data, columns=["Date", "Flavor", "Quantity", "Revenue"])
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0)
+    df["Revenue"] = pd.to_numeric(df["Revenue"], errors="coerce").fillna(0.0)
+    return df.dropna(subset=["Date"])
+
+
+def average_unit_prices(sales):
+    """Revenue per unit sold for each flavor in a :func:`sales_frame`"""
+    totals = sales.groupby("Flavor")[["Revenue", "Quantity"]].sum()
+    totals = totals[totals["Quantity"] > 0]
+    return (totals["Revenue"] / totals["Quantity"]).to_dict()
+
+
+def days_of_stock(inventory_data, sales, as_of=None, window_days=14):
+    """Days each flavor's syrup lasts at its recent daily usage.
+
+    Usage is the average units sold per day over the trailing window,
+    converted to gallons. Flavors with no recent sales report infinity.
+    """
+    as_of = pd.Timestamp(as_of or date.today()).normalize()
+    recent = sales[(sales["Date"] > as_of - pd.Timedelta(days=window_days)) & (sales["Date"] <= as_of)]
+    daily_units = recent.groupby("Flavor")["Quantity"].sum() / window_days
+
+    table = pd.DataFrame({"Gallons": pd.Series(inventory_data, dtype=float)})
+    table["Daily Usage (gal)"] = (daily_units * SYRUP_GALLONS_PER_SERVING).reindex(table.index, fill_value=0.0)
+    table["Days of Stock"] = (table["Gallons"] / table["Daily Usage (gal)"]).where(
+        table["Daily Usage (gal)"] > 0, float("inf")
+    )
+    table.index.name = "Flavor"
+    return table
+
+
+def expense_frame(expense_data, through=None, rates=None):
+    """Expand expense records into one row per occurrence up to ``through``.
+
+    Recurring items repeat from their start date until their optional
+    ``Until`` date or ``through``, whichever comes first. With a
+    :class:`cfo.fx.RateTable`, amounts are converted to the reporting
+    currency at each occurrence's date.
+    """
+    columns = ["Date", "Category", "Amount", "Currency"]
+    if not expense_data:
+        return pd.DataFrame(columns=columns).astype({"Date": "datetime64[ns]", "Amount": float})
+
+    through = pd.Timestamp(through or date.today())
+    rows = []
+    for expense in expense_data:
+        start = pd.to_datetime(expense.get("Date"), errors="coerce")
+        if pd.isna(start):
+            continue
+        amount = float(expense.get("Amount") or 0.0)
+        currency = expense.get("Currency") or fx.REPORTING_CURRENCY
+        freq = RECURRENCES.get(expense.get("Recurrence") or "One-time")
+        if freq is None:
+            rows.append((start, expense["Category"], amount, currency))
+            continue
+
+        until = pd.to_datetime(expense.get("Until"), errors="coerce")
+        end = through if pd.isna(until) else min(until, through)
+        if freq == "MS":
+            # Bill on the same day each month, clamped to short months
+            months = pd.period_range(start.to_period("M"), end.to_period("M"), freq="M")
+            dates = [
+                m.to_timestamp() + pd.Timedelta(days=min(start.day, m.days_in_month) - 1)
+                for m in months
+            ]
+            dates = [d for d in dates if start <= d <= end]
+        else:
+            dates = pd.date_range(start, end, freq=freq)
+        rows.extend((d, expense["Category"], amount, currency) for d in dates)
+
+    df = pd.DataFrame(rows, columns=columns)
+    df["Date"] = pd.to_datetime(df["Date"])
+    if rates is not None:
+        df["Amount"] = fx.convert_ledger(df, rates)[f"Amount ({fx.REPORTING_CURRENCY})"]
+        df["Currency"] = fx.REPORTING_CURRENCY
+    return df
+
+
+class PnLEngine:
+    """Computes day, week, month and season P&L statements.
+
+    Statements for closed periods (those that ended before ``as_of``) are
+    cached, so a refresh only recomputes the open period plus any period
+    that has never been seen. Call :meth:`invalidate` when a row dated in
+    a closed period is added or edited.
+    """
+
+    def __init__(self):
+        self._closed = {kind: {} for kind in PERIODS}
+
+    def reset(self):
+        """Drop every cached statement"""
+        for cache in self._closed.values():
+            cache.clear()
+
+    def invalidate(self, *dates):
+        """Drop cached statements for the periods containing ``dates``"""
+        for value in dates:
+            stamp = pd.to_datetime(value, errors="coerce")
+            if pd.isna(stamp):
+                self.reset()
+                return
+            for kind, freq in PERIODS.items():
+                self._closed[kind].pop(stamp.to_period(freq), None)
+
+    def statements(self, sales, expenses, kind="month", as_of=None):
+        """Return one statement row per period, indexed by period.
+
+        ``sales`` and ``expenses`` are the frames built by
+        :func:`sales_frame` and :func:`expense_frame`.
+        """
+        freq = PERIODS[kind]
+        cache = self._closed[kind]
+        as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+
+        sales_periods = sales["Date"].dt.to_period(freq)
+        expense_periods = expenses["Date"].dt.to_period(freq)
+        periods = pd.Index(sales_periods.unique()).union(pd.Index(expense_periods.unique()))
+
+        stale = [p for p in periods if p not in cache]
+        if stale:
+            fresh = _compute_statements(
+                sales[sales_periods.isin(stale)],
+                sales_periods[sales_periods.isin(stale)],
+                expenses[expense_periods.isin(stale)],
+                expense_periods[expense_periods.isin(stale)],
+            )
+            for period, row in fresh.iterrows():
+                if period.end_time < as_of:
+                    cache[period] = row
+
+        closed = [cache[p] for p in periods if p in cache]
+        open_rows = fresh.loc[[p for p in stale if p not in cache]] if stale else None
+        result = pd.DataFrame(closed)
+        if open_rows is not None and not open_rows.empty:
+            result = pd.concat([result, open_rows]) if closed else open_rows
+        if result.empty:
+            return _empty_statements()
+        result.index.name = "Period"
+        return result.sort_index()
+
+    def current(self, sales, expenses, kind="season", as_of=None):
+        """Return the statement for the period containing ``as_of`` as a dict"""
+        as_of = pd.Timestamp(as_of or datetime.now())
+        table = self.statements(sales, expenses, kind, as_of)
+        period = as_of.to_period(PERIODS[kind])
+        if period in table.index:
+            return table.loc[period].to_dict()
+        blank = dict.fromkeys(STATEMENT_COLUMNS, 0.0)
+        blank["top_flavor"] = "None"
+        return blank
+
+
+def dashboard_metrics(statement):
+    """Map a statement row onto the Dashboard's ``dashboard_metrics`` keys"""
+    return {
+        "total_revenue": float(statement["total_revenue"]),
+        "gross_profit": float(statement["gross_profit"]),
+        "net_profit": float(statement["net_profit"]),
+        "top_flavor": statement["top_flavor"],
+        "top_flavor_percentage": float(statement["top_flavor_percentage"]),
+    }
+
+
+def statement_profit_data(statement):
+    """Map a statement row onto the Profit Calculator's ``profit_data`` keys"""
+    data = empty_profit_data()
+    for key in data:
+        data[key] = float(statement.get(key, 0.0))
+    return data
+
+
+STATEMENT_COLUMNS = (
+    ["total_sales", "other_revenue", "units"]
+    + EXPENSE_CATEGORIES
+    + ["total_revenue", "total_cogs", "total_expenses", "gross_profit", "net_profit",
+       "gross_margin", "net_margin", "top_flavor", "top_flavor_percentage"]
+)
+
+
+def _empty_statements():
+    return pd.DataFrame(columns=STATEMENT_COLUMNS)
+
+
+def _compute_statements(sales, sales_periods, expenses, expense_periods):
+    """Vectorized statements for the given rows, one per period"""
+    revenue = sales.groupby(sales_periods)["Revenue"].sum()
+    units = sales.groupby(sales_periods)["Quantity"].sum()
+    costs = (
+        expenses.groupby([expense_periods, expenses["Category"]])["Amount"].sum()
+        .unstack(fill_value=0.0)
+        .reindex(columns=EXPENSE_CATEGORIES, fill_value=0.0)
+    )
+    index = revenue.index.union(costs.index)
+
+    table = costs.reindex(index, fill_value=0.0)
+    table["total_sales"] = revenue.reindex(index, fill_value=0.0)
+    table["other_revenue"] = 0.0
+    table["units"] = units.reindex(index, fill_value=0)
+    table["total_revenue"] = table["total_sales"] + table["other_revenue"]
+    table["total_cogs"] = table[COGS_CATEGORIES].sum(axis=1)
+    table["total_expenses"] = table[OPEX_CATEGORIES].sum(axis=1)
+    table["gross_profit"] = table["total_revenue"] - table["total_cogs"]
+    table["net_profit"] = table["gross_profit"] - table["total_expenses"]
+    has_revenue = table["total_revenue"] > 0
+    table["gross_margin"] = (table["gross_profit"] / table["total_revenue"] * 100).where(has_revenue, 0.0)
+    table["net_margin"] = (table["net_profit"] / table["total_revenue"] * 100).where(has_revenue, 0.0)
+
+    by_flavor = sales.groupby([sales_periods, sales["Flavor"]])["Revenue"].sum()
+    if by_flavor.empty:
+        table["top_flavor"] = "None"
+        table["top_flavor_percentage"] = 0.0
+    else:
+        top = by_flavor.loc[by_flavor.groupby(level=0).idxmax()]
+        top_flavor = pd.Series(top.index.get_level_values(1), index=top.index.get_level_values(0))
+        table["top_flavor"] = top_flavor.reindex(index).fillna("None")
+        share = pd.Series(top.values, index=top_flavor.index).reindex(index, fill_value=0.0)
+        table["top_flavor_percentage"] = (share / table["total_sales"] * 100).where(table["total_sales"] > 0, 0.0)
+
+    table.index.name = "Period"
+    table.columns.name = None
+    return table[STATEMENT_COLUMNS]
@@ -0,0 +1,111 @@
+"""Rolling buffers behind the auto-updating charts on the Live Charts page.
+
+A feed tails one of the saved datasets (see :mod:`cfo.store`). Each tick
+checks the file's modification time; when it changed, only the part of
+the file past the last record read is parsed (:func:`cfo.store.tail`),
+and only those records are turned into chart points. The whole file is
+read again only when earlier rows were edited or removed. Points live in a
+bounded deque, so a long-running page holds at most ``window`` of them.
+"""
+
+from collections import deque
+from datetime import date, datetime
+
+import pandas as pd
+
+from cfo import store
+
+POINT_COLUMNS = ["time", "value", "label"]
+
+
+def sales_point(record):
+    """Chart point for a sales row: (date, revenue, flavor)"""
+    when = record.get("Date")
+    if not isinstance(when, date):
+        return None
+    return pd.Timestamp(when), float(record.get("Revenue", 0) or 0), record.get("Flavor", "")
+
+
+def _clock(text):
+    for fmt in ("%H:%M", "%I:%M %p", "%H:%M:%S"):
+        try:
+            return datetime.strptime(text.strip(), fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def venmo_point(record):
+    """Chart point for a Venmo payment: (date and time, amount, note)"""
+    day = record.get("date")
+    clock = _clock(str(record.get("time", "")))
+    if not isinstance(day, date):
+        return None
+    when = datetime.combine(day, clock) if clock else datetime.combine(day, datetime.min.time())
+    return pd.Timestamp(when), float(record.get("amount", 0) or 0), record.get("note", "")
+
+
+class StoreFeed:
+    """Tail of a saved record list, kept as a bounded rolling window"""
+
+    def __init__(self, name, to_point, window=500, records_key=None, data_dir=None):
+        self.name = name
+        self.to_point = to_point
+        self.records_key = records_key
+        self.data_dir = data_dir
+        self.points = deque(maxlen=window)
+        self.cursor = 0
+        self.last_record = None
+        self.seen_mtime = None
+        # Where the last read stopped in the saved file (see store.tail)
+        self.position = None
+
+    @property
+    def window(self):
+        return self.points.maxlen
+
+    def poll(self):
+        """Append points for records saved since the last poll; returns how many"""
+        mtime = store.modified(self.name, self.data_dir)
+        if mtime is None or mtime == self.seen_mtime:
+            return 0
+        self.seen_mtime = mtime
+        if self.position is not None:
+            appended = store.tail(self.name, self.position, self.records_key, self.data_dir)
+            if appended is not None:
+                new, self.position = appended
+                return self.append(new)
+        loaded = store.tail(self.name, None, self.records_key, self.data_dir)
+        if loaded is None:
+            return 0
+        records, self.position = loaded
+        return self.update(records)
+
+    def update(self, records):
+        """Consume ``records`` past the cursor; rebuild from the tail if history changed"""
+        if self.cursor > len(records) or (self.cursor and records[self.cursor - 1] != self.last_record):
+            # Rows were edited or removed, not appended: start again from the tail
+            self.points.clear()
+            self.cursor = max(0, len(records) - self.window)
+        added = self.append(records[self.cursor:])
+        self.last_record = records[-1] if records else None
+        return added
+
+    def append(self, new):
+        """Consume records saved after the ones already seen"""
+        self.points.extend(point for point in map(self.to_point, new) if point is not None)
+        self.cursor += len(new)
+        if new:
+            self.last_record = new[-1]
+        return len(new)
+
+    def frame(self):
+        return pd.DataFrame(list(self.points), columns=POINT_COLUMNS)
+
+
+def live_feeds(window=500, data_dir=None):
+    """The feeds shown on the Live Charts page"""
+    return {
+        "sales_data": StoreFeed("sales_data", sales_point, window, data_dir=data_dir),
+        "venmo_data": StoreFeed("venmo_data", venmo_point, window, records_key="transactions", data_dir=data_dir),
+    }
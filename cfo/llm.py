@@ -0,0 +1,269 @@
+"""One gateway for every chat-completion call the app makes.
+
+The gateway owns a single OpenAI client, so requests from every page
+and session share one pool of keep-alive connections. Each request
+
+- is routed to a model by task and prompt size (``ROUTES``, ``MODELS``),
+- carries a timeout, and
+- passes through a per-model circuit breaker: after
+  ``failure_threshold`` consecutive connection errors, timeouts or
+  server errors the model is skipped for ``reset_after`` seconds, and
+  the next model for the task is tried instead (or
+  :class:`LLMUnavailable` is raised straight away).
+
+With a :class:`cfo.usage.UsageLedger` attached, every request is logged
+with its tokens, latency and cost, tagged with the page and button
+that asked. Requests past a budget raise
+:class:`cfo.usage.BudgetExceeded`. :meth:`LLMGateway.complete` answers
+a repeated prompt from its cache instead of failing.
+
+Point ``base_url`` at ``python -m cfo.llm_stub`` to run without network.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import openai
+
+from cfo import usage as usage_log
+
+# Model tiers; override any of them with the LLM_<TIER>_MODEL secrets
+MODELS = {
+    "fast": "gpt-4o-mini",
+    "standard": "gpt-3.5-turbo",
+    "long": "gpt-4o-mini",
+}
+
+# Preferred tier per task, then fallbacks when a tier's breaker is open
+ROUTES = {
+    "chat": ["standard", "fast"],
+    "deal_analysis": ["fast", "standard"],
+    "sales_patterns": ["fast", "standard"],
+    "inventory": ["fast", "standard"],
+    "financial_insights": ["fast", "standard"],
+}
+
+# Prompts past these sizes (estimated tokens) move up a tier
+STANDARD_PROMPT_TOKENS = 2000
+LONG_PROMPT_TOKENS = 12000
+
+TIMEOUTS = {"fast": 20.0, "standard": 45.0, "long": 90.0}
+
+# Recent answers kept for when the budget is spent or the service is down
+ANSWER_CACHE_SIZE = 256
+
+# Errors that say the service (not the request) is in trouble
+_TRANSIENT = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError, openai.RateLimitError)
+
+
+class LLMUnavailable(Exception):
+    """Every model that could serve the request is behind an open circuit breaker"""
+
+
+def estimate_tokens(messages):
+    """Rough prompt size: about four characters per token"""
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4 + 4 * len(messages)
+
+
+class CircuitBreaker:
+    """Closed until ``failure_threshold`` consecutive failures, then open for ``reset_after`` seconds.
+
+    After that one trial request is let through (half-open); its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class LLMGateway:
+    """Routes, times out and guards chat completions over one pooled client"""
+
+    def __init__(self, api_key, base_url=None, models=None, timeouts=None, max_retries=1,
+                 failure_threshold=3, reset_after=30.0, usage=None):
+        self.client = openai.OpenAI(
+            api_key=api_key, base_url=base_url, max_retries=max_retries, timeout=max((timeouts or TIMEOUTS).values())
+        )
+        self.models = {**MODELS, **(models or {})}
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.breakers = {}
+        self._failure_threshold = failure_threshold
+        self._reset_after = reset_after
+        self._lock = threading.Lock()
+        self.usage = usage
+        self._answers = OrderedDict()
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(self._failure_threshold, self._reset_after)
+            return self.breakers[model]
+
+    def route(self, task, messages):
+        """Tiers to try for ``task``, in order, given the prompt size"""
+        tiers = list(ROUTES.get(task, ROUTES["chat"]))
+        size = estimate_tokens(messages)
+        if size > LONG_PROMPT_TOKENS:
+            tiers = ["long"] + [tier for tier in tiers if tier != "long"]
+        elif size > STANDARD_PROMPT_TOKENS and tiers[0] == "fast":
+            tiers.remove("standard")
+            tiers.insert(0, "standard")
+        return tiers
+
+    def _record(self, page, action, task, model, started, prompt_tokens=0, completion_tokens=0, status=usage_log.OK):
+        if self.usage is not None:
+            latency_ms = (time.monotonic() - started) * 1000 if started is not None else 0
+            self.usage.record(page, action, task, model, prompt_tokens, completion_tokens, latency_ms, status)
+
+    def create(self, task, messages, stream=False, page=None, action=None, **kwargs):
+        """``chat.completions.create`` for ``task``; returns the response (or stream) and its model.
+
+        ``page`` and ``action`` tag the request in the usage log. Raises
+        :class:`cfo.usage.BudgetExceeded` when the page's budget is spent
+        and :class:`LLMUnavailable` when no routed model's breaker lets
+        the request through; other API errors propagate.
+        """
+        if self.usage is not None:
+            self.usage.check(page)
+        if stream:
+            # Streams only report token counts when asked to
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        tried = []
+        last_error = None
+        for tier in self.route(task, messages):
+            model = self.models[tier]
+            if model in tried:
+                continue
+            tried.append(model)
+            breaker = self.breaker(model)
+            if not breaker.allow():
+                continue
+            started = time.monotonic()
+            try:
+                response = self.client.chat.completions.create(
+                    model=model, messages=messages, stream=stream, timeout=self.timeouts[tier], **kwargs
+                )
+            except _TRANSIENT as e:
+                breaker.record_failure()
+                self._record(page, action, task, model, started, status=usage_log.ERROR)
+                last_error = e
+                continue
+            except Exception:
+                # A bad request says nothing about the service's health
+                breaker.record_success()
+                self._record(page, action, task, model, started, status=usage_log.ERROR)
+                raise
+            if stream:
+                def finish(completion_text, reported, failed, model=model, started=started):
+                    prompt_tokens, completion_tokens = reported or (estimate_tokens(messages), len(completion_text) // 4)
+                    status = usage_log.ERROR if failed else usage_log.OK
+                    self._record(page, action, task, model, started, prompt_tokens, completion_tokens, status)
+                return _GuardedStream(response, breaker, finish), model
+            breaker.record_success()
+            reported = getattr(response, "usage", None)
+            if reported is not None:
+                self._record(page, action, task, model, started, reported.prompt_tokens, reported.completion_tokens)
+            else:
+                content = response.choices[0].message.content or ""
+                self._record(page, action, task, model, started, estimate_tokens(messages), len(content) // 4)
+            return response, model
+        if last_error is not None:
+            raise last_error
+        raise LLMUnavailable(f"AI service unavailable for {task} (tried {', '.join(tried)}); try again shortly")
+
+    def complete(self, task, messages, page=None, action=None, **kwargs):
+        """Text of a non-streamed completion.
+
+        When the budget is spent or the service is unavailable, the last
+        answer to the same prompt is returned instead, if there is one.
+        """
+        key = hashlib.sha256(json.dumps([task, messages, kwargs], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        try:
+            response, _ = self.create(task, messages, page=page, action=action, **kwargs)
+        except (usage_log.BudgetExceeded, LLMUnavailable):
+            with self._lock:
+                answer = self._answers.get(key)
+            if answer is None:
+                raise
+            self._record(page, action, task, "", None, status=usage_log.CACHED)
+            return answer
+        answer = response.choices[0].message.content
+        with self._lock:
+            self._answers[key] = answer
+            self._answers.move_to_end(key)
+            while len(self._answers) > ANSWER_CACHE_SIZE:
+                self._answers.popitem(last=False)
+        return answer
+
+    def record_fallback(self, task, page=None, action=None):
+        """Log an answer a page worked out locally instead of asking the model"""
+        self._record(page, action, task, "", None, status=usage_log.LOCAL)
+
+
+class _GuardedStream:
+    """Iterates a streamed response, reporting how it ended to the breaker and usage log"""
+
+    def __init__(self, stream, breaker, finish):
+        self.stream = stream
+        self.breaker = breaker
+        self.finish = finish
+
+    def __iter__(self):
+        failed = False
+        text, reported = [], None
+        try:
+            for chunk in self.stream:
+                if getattr(chunk, "usage", None) is not None:
+                    reported = (chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text.append(chunk.choices[0].delta.content)
+                yield chunk
+        except openai.APIError:
+            # Once the request was accepted, any error (a dropped connection or an
+            # error event in the stream) means the service failed to answer
+            failed = True
+            self.breaker.record_failure()
+            raise
+        finally:
+            # Also reached when the reader stops early: the service did answer
+            if not failed:
+                self.breaker.record_success()
+            self.finish("".join(text), reported, failed)
@@ -0,0 +1,175 @@
+"""A local stand-in for the OpenAI chat completions API.
+
+Serves ``/v1/chat/completions`` (plain and streamed) and ``/v1/models``
+with canned answers, so the app and :mod:`cfo.llm` can be exercised
+without a network or an API key::
+
+    python -m cfo.llm_stub --port 8787
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1   # or the secret of the same name
+
+The reply echoes the model and the last user message. A user message
+containing ``call_tool:<name> {json}`` gets a tool call back instead,
+and ``--delay`` / ``--fail`` / ``--fail-model`` / ``--fail-stream`` slow
+down or fail requests for trying out timeouts, fallbacks and the
+circuit breaker.
+"""
+
+import argparse
+import json
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TOOL_DIRECTIVE = re.compile(r"call_tool:(\w+)\s*(\{.*\})?", re.S)
+
+
+def _reply(messages):
+    """Canned answer text, or a ``(name, arguments)`` tool call"""
+    last_user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+    text = str(last_user.get("content") or "")
+    match = _TOOL_DIRECTIVE.search(text)
+    if match and not any(m.get("role") == "tool" for m in messages):
+        return None, (match.group(1), match.group(2) or "{}")
+    tool_results = [m["content"] for m in messages if m.get("role") == "tool"]
+    if tool_results:
+        return f"Tool results: {' '.join(tool_results)}", None
+    return f"Stub answer to: {text[:200]}", None
+
+
+def _usage(messages, answer):
+    prompt = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion = len(answer) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    fail_every = 0
+    fail_models = ()
+    fail_stream = False
+    requests_seen = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+        else:
+            self._json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "Not found"}})
+            return
+        cls = type(self)
+        cls.requests_seen += 1
+        if cls.delay:
+            time.sleep(cls.delay)
+        model = request.get("model", "stub")
+        if (cls.fail_every and cls.requests_seen % cls.fail_every == 0) or model in cls.fail_models:
+            self._json(503, {"error": {"message": "Stub failure", "type": "server_error"}})
+            return
+        messages = request.get("messages", [])
+        answer, tool_call = _reply(messages)
+        if tool_call and not request.get("tools"):
+            answer, tool_call = f"Stub answer without tools to: {tool_call[0]}", None
+        if request.get("stream"):
+            self._stream(model, messages, answer, tool_call)
+        else:
+            self._json(200, self._completion(model, messages, answer, tool_call))
+
+    def _completion(self, model, messages, answer, tool_call):
+        message = {"role": "assistant", "content": answer}
+        if tool_call:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool_call[0], "arguments": tool_call[1]},
+            }]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+            "usage": _usage(messages, answer or ""),
+        }
+
+    def _stream(self, model, messages, answer, tool_call):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+
+        def send(delta, finish_reason=None, usage=None):
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if usage is not None:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        if type(self).fail_stream:
+            # Part of an answer, then the error event the API sends when it fails mid-stream
+            send({"content": "Stub "})
+            error = {"error": {"message": "Stub failure mid-stream", "type": "server_error"}}
+            self.wfile.write(f"data: {json.dumps(error)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        if tool_call:
+            send({"tool_calls": [{"index": 0, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                                  "function": {"name": tool_call[0], "arguments": ""}}]})
+            send({"tool_calls": [{"index": 0, "function": {"arguments": tool_call[1]}}]})
+            send({}, "tool_calls", _usage(messages, ""))
+        else:
+            for word in re.findall(r"\S+\s*", answer):
+                send({"content": word})
+            send({}, "stop", _usage(messages, answer))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def serve(host="127.0.0.1", port=8787, delay=0.0, fail_every=0, fail_models=(), fail_stream=False):
+    """Run the stand-in until interrupted"""
+    StubHandler.delay = delay
+    StubHandler.fail_every = fail_every
+    StubHandler.fail_models = tuple(fail_models)
+    StubHandler.fail_stream = fail_stream
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"LLM stand-in listening on http://{host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail", type=int, default=0, metavar="N", help="Answer every Nth request with a 503")
+    parser.add_argument("--fail-model", action="append", default=[], metavar="MODEL",
+                        help="Answer every request for MODEL with a 503 (repeatable)")
+    parser.add_argument("--fail-stream", action="store_true", help="Break off every streamed answer with an error")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.delay, args.fail, args.fail_model, args.fail_stream)
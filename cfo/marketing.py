@@ -0,0 +1,170 @@
+"""Menu, flyer, social post and business card rendering.
+
+An asset is described by a plain dict (template, stand, flavors with
+prices, tagline, contact) and rendered to a PNG named after a hash of
+that dict. Re-rendering unchanged inputs is skipped, and batches render
+in parallel on a process pool. Fonts and base layouts are built once per
+worker process, so callers that render often pass one long-lived pool
+(see :func:`worker_pool`) rather than starting workers for each batch.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from cfo import DATA_DIR
+from cfo.images import load_font
+
+# Bump when the drawing code changes so cached assets are re-rendered
+RENDERER_VERSION = 1
+
+TEMPLATES = {
+    "Menu Layout": {"size": (1200, 1600), "scale": 1.0},
+    "Flyer Design": {"size": (1275, 1650), "scale": 1.1},
+    "Social Media Post": {"size": (1080, 1080), "scale": 0.9},
+    "Business Card": {"size": (1050, 600), "scale": 0.7},
+}
+
+HEADER_COLOR = (231, 76, 60)
+ACCENT_COLOR = (52, 152, 219)
+TEXT_COLOR = (44, 62, 80)
+
+
+def asset_spec(template, stand, flavors, tagline="", contact=""):
+    """Build the dict an asset is rendered (and cached) from.
+
+    ``flavors`` is a list of ``(name, price)`` pairs.
+    """
+    return {
+        "template": template,
+        "stand": stand,
+        "flavors": [[name, round(float(price), 2)] for name, price in flavors],
+        "tagline": tagline,
+        "contact": contact,
+    }
+
+
+def asset_key(spec):
+    raw = json.dumps(spec, sort_keys=True) + f"|v{RENDERER_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+@lru_cache(maxsize=None)
+def _base_layout(template):
+    """Background, header band and border for a template, drawn once"""
+    layout = TEMPLATES[template]
+    width, height = layout["size"]
+    header = int(height * (0.3 if template == "Business Card" else 0.16))
+
+    image = Image.new("RGB", (width, height), color="white")
+    draw = ImageDraw.Draw(image)
+    for y in range(header):
+        # Same red-to-blue feel as the app header
+        blend = y / max(1, header - 1)
+        color = tuple(int(HEADER_COLOR[i] * (1 - blend) + ACCENT_COLOR[i] * blend) for i in range(3))
+        draw.line([(0, y), (width, y)], fill=color)
+    draw.rectangle([8, 8, width - 9, height - 9], outline=ACCENT_COLOR, width=6)
+    return image, header
+
+
+def render_asset(spec):
+    """Render one asset spec to PNG bytes"""
+    template = spec["template"]
+    scale = TEMPLATES[template]["scale"]
+    base, header = _base_layout(template)
+    image = base.copy()
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+
+    title_font = load_font(int(72 * scale), bold=True)
+    item_font = load_font(int(44 * scale))
+    small_font = load_font(int(30 * scale))
+
+    draw.text((width // 2, header // 2), spec["stand"], fill="white", font=title_font, anchor="mm")
+
+    flavors = spec["flavors"]
+    if template == "Business Card":
+        flavors = flavors[:3]
+        heading = None
+    elif template == "Social Media Post":
+        flavors = flavors[:6]
+        heading = "Today's Flavors"
+    else:
+        heading = "Menu" if template == "Menu Layout" else "Cool Down With Us!"
+
+    y = header + int(50 * scale)
+    if heading:
+        draw.text((width // 2, y), heading, fill=HEADER_COLOR, font=title_font, anchor="mt")
+        y += int(120 * scale)
+
+    margin = int(90 * scale)
+    row_height = int(72 * scale)
+    for name, price in flavors:
+        draw.text((margin, y), name, fill=TEXT_COLOR, font=item_font)
+        price_text = f"${price:,.2f}"
+        draw.text((width - margin, y), price_text, fill=TEXT_COLOR, font=item_font, anchor="ra")
+        name_end = margin + draw.textlength(name, font=item_font) + 15
+        price_start = width - margin - draw.textlength(price_text, font=item_font) - 15
+        if price_start > name_end:
+            leader_y = y + int(34 * scale)
+            draw.line([(name_end, leader_y), (price_start, leader_y)], fill=(189, 195, 199), width=2)
+        y += row_height
+
+    footer_y = height - int(60 * scale)
+    if spec.get("contact"):
+        draw.text((width // 2, footer_y), spec["contact"], fill=TEXT_COLOR, font=small_font, anchor="mb")
+        footer_y -= int(50 * scale)
+    if spec.get("tagline"):
+        draw.text((width // 2, footer_y), spec["tagline"], fill=ACCENT_COLOR, font=small_font, anchor="mb")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def worker_pool(workers=None):
+    """A process pool for rendering, safe to start from a threaded server"""
+    # Spawn, not fork: the parent may be a threaded Streamlit server
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=context)
+
+
+def render_batch(specs, output_dir=None, workers=None, pool=None):
+    """Render every spec whose inputs changed since it was last rendered.
+
+    Batches run on ``pool`` when given, or else on a pool of ``workers``
+    processes started for this batch alone. Returns ``(spec, path,
+    rendered)`` tuples in input order, where ``rendered`` is False for
+    assets served from a previous render.
+    """
+    output_dir = output_dir or os.path.join(DATA_DIR, "marketing")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f"{asset_key(spec)}.png") for spec in specs]
+
+    pending = {}
+    for spec, path in zip(specs, paths):
+        if not os.path.exists(path):
+            pending.setdefault(path, spec)
+
+    if len(pending) == 1:
+        rendered = {path: render_asset(spec) for path, spec in pending.items()}
+    elif pool is not None:
+        rendered = dict(zip(pending, pool.map(render_asset, pending.values())))
+    elif pending:
+        with worker_pool(workers or min(len(pending), os.cpu_count() or 1)) as batch_pool:
+            rendered = dict(zip(pending, batch_pool.map(render_asset, pending.values())))
+    else:
+        rendered = {}
+
+    for path, data in rendered.items():
+        with open(path + ".tmp", "wb") as handle:
+            handle.write(data)
+        os.replace(path + ".tmp", path)
+
+    return [(spec, path, path in rendered) for spec, path in zip(specs, paths)]
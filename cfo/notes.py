@@ -0,0 +1,259 @@
+"""Structured orders from free-text Venmo notes.
+
+Notes like "Blue Raspberry Slushie", "2x large strawbery 🍓" or
+"cherry slushy" are tokenized and run through a compiled trie of
+flavor, size and quantity phrases. The trie is built once from the
+flavor catalog, aliases and emoji, plus single-edit typo variants of
+every word (a dropped, doubled, swapped or mistyped letter), so matching a note
+is a few dict lookups per token.
+
+Payment notes repeat a lot, so :func:`parse_notes` parses each distinct
+note once and spreads the result back over the column with a hash
+factorize; a million notes cost a million hash lookups plus one trie
+walk per distinct note.
+"""
+
+import re
+import string
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from cfo.ledger import SYRUP_GALLONS_PER_SERVING
+
+UNKNOWN_FLAVOR = "Unknown"
+DEFAULT_SIZE = "Regular"
+
+# Servings of syrup in each cup size (Regular is one serving)
+SIZE_SERVINGS = {"Small": 0.75, "Regular": 1.0, "Large": 1.5}
+
+FLAVOR_ALIASES = {
+    "Blue Raspberry": ["blue raspberry", "blue razz", "blue raz", "blue rasp", "blueraspberry", "blue razzberry"],
+    "Cherry": ["cherry", "cherries"],
+    "Lime": ["lime", "limes"],
+    "Orange": ["orange", "oranges"],
+    "Strawberry": ["strawberry", "strawberries", "strawb", "straw berry"],
+    "Grape": ["grape", "grapes"],
+}
+FLAVOR_EMOJI = {
+    "🫐": "Blue Raspberry",
+    "🍒": "Cherry",
+    "🍋‍🟩": "Lime",
+    "🍊": "Orange",
+    "🍓": "Strawberry",
+    "🍇": "Grape",
+}
+SIZE_ALIASES = {
+    "Small": ["small", "sm", "kids", "kid size", "mini"],
+    "Regular": ["regular", "reg", "medium", "med", "normal"],
+    "Large": ["large", "lg", "lrg", "big", "jumbo", "extra large", "xl"],
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "couple": 2, "pair": 2,
+}
+MAX_QUANTITY = 50
+
+# Real words one edit away from a catalog word, never read as typos
+_REAL_WORDS = {"range", "gape", "gapes", "graces", "grades", "graphs", "grates", "gripes", "cheery", "mall"}
+
+# Words, numbers, and any other single non-space character (emoji, "$", "x" after a digit)
+_TOKENS = re.compile(r"\d+(?:\.\d+)?|[a-z]+|\S", re.UNICODE)
+_TERMINAL = "\0"
+_VARIATION_SELECTOR = "\ufe0f"
+
+
+def _emoji_token(flavor):
+    return "emoji" + flavor.lower().replace(" ", "")
+
+
+# Longest first, so 🍋‍🟩 (lime) is replaced before anything sharing its lead character
+_EMOJI_TOKENS = {
+    emoji.replace(_VARIATION_SELECTOR, ""): _emoji_token(flavor)
+    for emoji, flavor in sorted(FLAVOR_EMOJI.items(), key=lambda item: len(item[0]), reverse=True)
+}
+
+
+def _typos(word, substitutions=False):
+    """Single-edit variants: dropped, doubled, swapped and (optionally) mistyped letters"""
+    variants = set()
+    if len(word) >= 5:
+        variants.update(word[:i] + word[i + 1:] for i in range(len(word)))
+    if substitutions and len(word) >= 6:
+        # The first letter is rarely the one mistyped
+        variants.update(
+            word[:i] + letter + word[i + 1:] for i in range(1, len(word)) for letter in string.ascii_lowercase
+        )
+    if len(word) >= 4:
+        variants.add(word[:-1])
+        variants.update(word[:i] + word[i] + word[i:] for i in range(len(word)))
+        variants.update(
+            word[:i] + word[i + 1] + word[i] + word[i + 2:] for i in range(len(word) - 1)
+        )
+    variants.discard(word)
+    return variants - _REAL_WORDS
+
+
+def tokenize(note):
+    """Lowercase word, number and symbol tokens, with emoji kept whole"""
+    text = unicodedata.normalize("NFKC", str(note)).lower().replace(_VARIATION_SELECTOR, "")
+    # Multi-codepoint emoji (🍋‍🟩) become one placeholder token each
+    for emoji, flavor in _EMOJI_TOKENS.items():
+        if emoji in text:
+            text = text.replace(emoji, f" {flavor} ")
+    return _TOKENS.findall(text)
+
+
+class NoteParser:
+    """Compiled trie over note tokens.
+
+    Each node is a dict from token to child node; a node that completes
+    a phrase holds ``(kind, value)`` under the ``_TERMINAL`` key. Kinds
+    are "flavor", "size" and "quantity".
+    """
+
+    def __init__(self, flavors=FLAVOR_ALIASES, sizes=SIZE_ALIASES, typos=True):
+        self.root = {}
+        self.memo = {}
+        exact = {}
+        for flavor, aliases in flavors.items():
+            for alias in [flavor.lower()] + list(aliases):
+                exact[tuple(alias.split())] = ("flavor", flavor)
+        emoji = {(_emoji_token(flavor),): ("flavor", flavor) for flavor in FLAVOR_EMOJI.values()}
+        for size, aliases in sizes.items():
+            for alias in [size.lower()] + list(aliases):
+                exact[tuple(alias.split())] = ("size", size)
+        for word, number in NUMBER_WORDS.items():
+            exact[(word,)] = ("quantity", number)
+
+        phrases = dict(exact)
+        if typos:
+            vocabulary = {word for phrase in exact for word in phrase}
+            for phrase, match in exact.items():
+                if match[0] == "quantity":
+                    continue
+                for i, word in enumerate(phrase):
+                    for typo in _typos(word, substitutions=match[0] == "flavor"):
+                        # A typo that spells another known word is that word
+                        if typo in vocabulary:
+                            continue
+                        phrases.setdefault(phrase[:i] + (typo,) + phrase[i + 1:], match)
+        phrases.update(emoji)
+        for phrase, match in phrases.items():
+            node = self.root
+            for token in phrase:
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = match
+
+    def _walk(self, tokens, start):
+        """Longest phrase starting at ``tokens[start]``: (match, tokens consumed)"""
+        node, best, length = self.root, None, 0
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if _TERMINAL in node:
+                best, length = node[_TERMINAL], i - start + 1
+        return best, length
+
+    def parse(self, note):
+        """(flavor, size, quantity) for one note.
+
+        The first flavor named wins. Quantity is the first count in the
+        note ("2", "2x", "x2", "two"); prices ("$5.50"), order numbers
+        ("#12"), sizes in ounces and counts over ``MAX_QUANTITY`` are
+        ignored. Defaults are
+        ``UNKNOWN_FLAVOR``, ``DEFAULT_SIZE`` and 1.
+        """
+        if not note:
+            return UNKNOWN_FLAVOR, DEFAULT_SIZE, 1
+        key = note if isinstance(note, str) else str(note)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
+        tokens = tokenize(key)
+        flavor = size = quantity = None
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.isdigit():
+                previous = tokens[i - 1] if i else ""
+                following = tokens[i + 1] if i + 1 < len(tokens) else ""
+                if quantity is None and previous not in ("$", "#") and following not in ("oz", "%", "$"):
+                    if 0 < int(token) <= MAX_QUANTITY:
+                        quantity = int(token)
+                i += 1
+                continue
+            match, length = self._walk(tokens, i)
+            if match is None:
+                i += 1
+                continue
+            kind, value = match
+            if kind == "flavor" and flavor is None:
+                flavor = value
+            elif kind == "size" and size is None:
+                size = value
+            elif kind == "quantity" and quantity is None:
+                quantity = value
+            i += length
+
+        result = (flavor or UNKNOWN_FLAVOR, size or DEFAULT_SIZE, quantity or 1)
+        if len(self.memo) < 100_000:
+            self.memo[key] = result
+        return result
+
+    def parse_many(self, notes):
+        """Frame of flavor, size and quantity columns, one row per note"""
+        notes = pd.Series(notes, dtype=object).fillna("")
+        codes, uniques = pd.factorize(notes, use_na_sentinel=False)
+        parsed = [self.parse(note) for note in uniques]
+        if not parsed:
+            return pd.DataFrame({"flavor": [], "size": [], "quantity": pd.Series(dtype="int64")})
+        flavors, sizes, quantities = zip(*parsed)
+        return pd.DataFrame({
+            "flavor": np.asarray(flavors, dtype=object)[codes],
+            "size": np.asarray(sizes, dtype=object)[codes],
+            "quantity": np.asarray(quantities, dtype="int64")[codes],
+        }, index=notes.index)
+
+
+_PARSER = None
+
+
+def parser():
+    """Shared parser, built on first use"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = NoteParser()
+    return _PARSER
+
+
+def parse_notes(notes):
+    """Flavor, size and quantity columns for a sequence of notes"""
+    return parser().parse_many(notes)
+
+
+def orders_frame(transactions):
+    """Venmo payments (records or a frame) with their parsed flavor, size, quantity and syrup servings"""
+    if isinstance(transactions, pd.DataFrame):
+        df = transactions.reindex(columns=["date", "time", "amount", "note"]).reset_index(drop=True)
+    else:
+        df = pd.DataFrame(list(transactions), columns=["date", "time", "amount", "note"])
+    parsed = parse_notes(df["note"])
+    df = pd.concat([df, parsed], axis=1)
+    df["servings"] = df["quantity"] * df["size"].map(SIZE_SERVINGS).fillna(1.0)
+    return df
+
+
+def flavor_usage(orders):
+    """Drinks, servings and syrup gallons per flavor from an :func:`orders_frame`"""
+    usage = orders.groupby("flavor").agg(
+        Drinks=("quantity", "sum"),
+        Servings=("servings", "sum"),
+        Revenue=("amount", "sum"),
+    )
+    usage["Syrup (gal)"] = usage["Servings"] * SYRUP_GALLONS_PER_SERVING
+    usage.index.name = "Flavor"
+    return usage.sort_values("Drinks", ascending=False)
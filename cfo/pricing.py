@@ -0,0 +1,218 @@
+"""Price elasticity per flavor from the sales ledger, and profit-maximizing prices.
+
+Unit prices come from the ledger itself, as each flavor's Revenue /
+Quantity per day. Demand is modelled with constant elasticity::
+
+    log(drinks) = a + e * log(price) + b * weekend
+
+The model is fitted for every flavor (and stand, where sales carry one)
+in one batched solve with :func:`cfo.forecast.fit_batched`. A shared
+elasticity is first fitted across flavors, within each flavor. Each
+flavor's own elasticity is a ridge-shrunk deviation from it, so a
+flavor whose price never moved falls back to the shared estimate.
+
+With elasticity e < -1 and unit cost c, profit (p - c) * q(p) peaks at
+p = c * e / (1 + e). Recommendations stay within ``MAX_CHANGE`` of
+today's price, since the model has only seen prices near it. Inelastic
+demand (e >= -1) has no peak, so the cap applies.
+
+:class:`PriceModel` keeps the per-day aggregates between refreshes.
+Like :class:`cfo.ledger.PnLEngine`, it is told which dates changed, and
+it re-aggregates only those days before refitting.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cfo import notes
+from cfo.forecast import DEFAULT_GROUP, fit_batched
+
+DEFAULT_ELASTICITY = -1.5
+MAX_CHANGE = 0.25
+# Pull toward the shared elasticity, against the sum of squared log-price moves;
+# larger means a flavor needs more price history to differ from the rest
+RIDGE = 0.5
+# Days of sales and expenses used to work out unit costs
+COST_WINDOW_DAYS = 90
+DEFAULT_CUP_COST = 0.15
+DEFAULT_SYRUP_COST = 0.20  # per serving
+# Days averaged for today's price and demand
+RECENT_DAYS = 28
+
+ESTIMATE_COLUMNS = ["Stand", "Flavor", "Elasticity", "Source", "Price", "Drinks/Day", "Days", "Price Points"]
+
+
+def daily_prices(sales):
+    """Drinks and average unit price per stand, flavor and day; days without units or revenue are left out"""
+    stand = sales["Stand"].astype(str) if "Stand" in sales else DEFAULT_GROUP
+    daily = (
+        sales.assign(Date=sales["Date"].dt.normalize(), Stand=stand)
+        .groupby(["Stand", "Flavor", "Date"], as_index=False)[["Quantity", "Revenue"]].sum()
+    )
+    daily = daily[(daily["Quantity"] > 0) & (daily["Revenue"] > 0)]
+    return daily.assign(Price=daily["Revenue"] / daily["Quantity"]).reset_index(drop=True)
+
+
+def fit_elasticities(daily, as_of=None, recent_days=RECENT_DAYS):
+    """One row per stand and flavor: elasticity, where it came from, and today's price and demand.
+
+    Price and Drinks/Day cover the ``recent_days`` up to ``as_of``
+    (today by default); flavors not sold in that window are left out.
+    Every day of history still informs the elasticities.
+    """
+    if daily.empty:
+        return pd.DataFrame(columns=ESTIMATE_COLUMNS)
+    codes, keys = pd.factorize(pd.MultiIndex.from_frame(daily[["Stand", "Flavor"]]))
+    log_q = np.log(daily["Quantity"].to_numpy(dtype=float))
+    log_p = np.log(daily["Price"].to_numpy(dtype=float))
+    weekend = (daily["Date"].dt.weekday >= 5).to_numpy(dtype=float)
+
+    # Shared elasticity: the within-flavor slope, pooled over every flavor
+    def within(values):
+        return values - (np.bincount(codes, weights=values) / np.bincount(codes))[codes]
+
+    price_moves = within(log_p)
+    if np.square(price_moves).sum() > 1e-9:
+        _, pooled = fit_batched(np.column_stack([price_moves, within(weekend)]), within(log_q), np.zeros(len(codes)), ridge=1e-9)
+        shared, source = float(pooled[0, 0]), "estimated"
+    else:
+        shared, source = DEFAULT_ELASTICITY, "assumed"
+
+    # Each flavor's deviation from the shared elasticity, all flavors in one solve
+    X = np.column_stack([np.ones(len(codes)), log_p, weekend])
+    labels, coefficients = fit_batched(X, log_q - shared * log_p, codes, ridge=RIDGE, penalize=[False, True, True])
+    deviation = pd.Series(coefficients[:, 1], index=labels)
+
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    start = as_of - pd.Timedelta(days=recent_days)
+    in_window = ((daily["Date"] > start) & (daily["Date"] <= as_of)).to_numpy()
+    window = np.arange(len(keys))
+    recent_revenue = np.bincount(codes, weights=np.where(in_window, daily["Revenue"], 0.0), minlength=len(keys))
+    recent_drinks = np.bincount(codes, weights=np.where(in_window, daily["Quantity"], 0.0), minlength=len(keys))
+    # Calendar days in the window, counted from a flavor's first sale when that came later
+    first_sale = daily.groupby(codes)["Date"].min().reindex(window).to_numpy()
+    days_open = np.clip((as_of - pd.DatetimeIndex(first_sale)).days.to_numpy() + 1, 1, recent_days)
+    grouped = pd.DataFrame({"code": codes, "Price": daily["Price"].round(2)}).groupby("code")
+    table = pd.DataFrame({
+        "Stand": keys.get_level_values(0),
+        "Flavor": keys.get_level_values(1),
+        "Elasticity": shared + deviation.reindex(window, fill_value=0.0).to_numpy(),
+        # A flavor sold at one price only has the shared (or assumed) elasticity
+        "Source": np.where(grouped["Price"].nunique().to_numpy() >= 2, source, "shared" if source == "estimated" else source),
+        "Price": recent_revenue / np.where(recent_drinks > 0, recent_drinks, np.nan),
+        "Drinks/Day": recent_drinks / days_open,
+        "Days": grouped.size().to_numpy(),
+        "Price Points": grouped["Price"].nunique().to_numpy(),
+    })
+    return table[recent_drinks > 0].reset_index(drop=True)[ESTIMATE_COLUMNS]
+
+
+def unit_costs(sales, expenses, as_of=None, days=COST_WINDOW_DAYS):
+    """Cup cost per drink and syrup cost per serving over the last ``days`` days.
+
+    Either is ``None`` when the ledgers hold no such expense or no sales
+    in the window.
+    """
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    start = as_of - pd.Timedelta(days=days)
+    drinks = sales.loc[(sales["Date"] > start) & (sales["Date"] <= as_of), "Quantity"].sum()
+    spent = expenses[(expenses["Date"] > start) & (expenses["Date"] <= as_of)].groupby("Category")["Amount"].sum()
+    if drinks <= 0:
+        return None, None
+    cup = spent.get("cup_cost")
+    syrup = spent.get("syrup_cost")
+    return (float(cup) / drinks if cup else None), (float(syrup) / drinks if syrup else None)
+
+
+def size_mix(payments):
+    """Share of drinks and average price per drink by flavor and size, from Venmo payment notes"""
+    orders = notes.orders_frame(payments)
+    orders = orders[(orders["quantity"] > 0) & pd.to_numeric(orders["amount"], errors="coerce").gt(0)]
+    if orders.empty:
+        return pd.DataFrame(columns=["Flavor", "Size", "Share", "Price"])
+    mix = orders.groupby(["flavor", "size"], as_index=False).agg(
+        drinks=("quantity", "sum"), amount=("amount", lambda a: pd.to_numeric(a).sum())
+    )
+    mix["Share"] = mix["drinks"] / mix.groupby("flavor")["drinks"].transform("sum")
+    mix["Price"] = mix["amount"] / mix["drinks"]
+    return mix.rename(columns={"flavor": "Flavor", "size": "Size"})[["Flavor", "Size", "Share", "Price"]]
+
+
+def recommend(estimates, cup_cost, syrup_cost, sizes=None, max_change=MAX_CHANGE):
+    """Profit-maximizing price per stand, flavor and size.
+
+    ``sizes`` is a :func:`size_mix` frame. Flavors it doesn't cover are
+    priced as a single Regular size at the ledger price.
+    """
+    columns = ["Stand", "Flavor", "Size", "Elasticity", "Unit Cost", "Current Price", "Recommended Price",
+               "Drinks/Day", "New Drinks/Day", "Profit/Day", "New Profit/Day"]
+    if estimates.empty:
+        return pd.DataFrame(columns=columns)
+    sizes = sizes if sizes is not None else pd.DataFrame(columns=["Flavor", "Size", "Share", "Price"])
+    regular = pd.DataFrame({"Flavor": estimates["Flavor"].unique(), "Size": "Regular", "Share": 1.0, "Price": np.nan})
+    sizes = pd.concat([sizes, regular[~regular["Flavor"].isin(sizes["Flavor"])]], ignore_index=True)
+    rows = estimates.merge(sizes.rename(columns={"Price": "Size Price"}), on="Flavor", how="left")
+    # The ledger price is per drink across sizes; a size without its own price scales by syrup
+    servings = rows["Size"].map(notes.SIZE_SERVINGS).fillna(1.0)
+    current = rows["Size Price"].fillna(rows["Price"] * servings)
+    cost = cup_cost + syrup_cost * servings
+    e = rows["Elasticity"]
+    optimum = (cost * e / (1 + e)).where(e < -1, np.inf)
+    price = optimum.clip(lower=current * (1 - max_change), upper=current * (1 + max_change))
+    drinks = rows["Drinks/Day"] * rows["Share"]
+    new_drinks = drinks * (price / current) ** e
+    return pd.DataFrame({
+        "Stand": rows["Stand"],
+        "Flavor": rows["Flavor"],
+        "Size": rows["Size"],
+        "Elasticity": e.round(2),
+        "Unit Cost": cost.round(2),
+        "Current Price": current.round(2),
+        "Recommended Price": price.round(2),
+        "Drinks/Day": drinks.round(1),
+        "New Drinks/Day": new_drinks.round(1),
+        "Profit/Day": ((current - cost) * drinks).round(2),
+        "New Profit/Day": ((price - cost) * new_drinks).round(2),
+    })[columns]
+
+
+class PriceModel:
+    """Elasticity estimates kept current as sales change; only changed days are re-aggregated"""
+
+    def __init__(self):
+        self._daily = None
+        self._dirty = set()
+        self._estimates = None
+        self._as_of = None
+
+    def reset(self):
+        """Drop every cached aggregate and estimate"""
+        self._daily = None
+        self._dirty.clear()
+        self._estimates = None
+
+    def invalidate(self, *dates):
+        """Re-aggregate the days in ``dates`` on the next refresh"""
+        for value in dates:
+            stamp = pd.to_datetime(value, errors="coerce")
+            if pd.isna(stamp):
+                self.reset()
+                return
+            self._dirty.add(stamp.normalize())
+        self._estimates = None
+
+    def elasticities(self, sales, as_of=None):
+        """Estimates for a sales frame (see :func:`cfo.ledger.sales_frame`), refitting only after changes"""
+        as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+        if self._daily is None:
+            self._daily = daily_prices(sales)
+        elif self._dirty:
+            days = sales["Date"].dt.normalize()
+            changed = daily_prices(sales[days.isin(self._dirty)])
+            kept = self._daily[~self._daily["Date"].isin(self._dirty)]
+            self._daily = pd.concat([kept, changed], ignore_index=True)
+        self._dirty.clear()
+        if self._estimates is None or self._as_of != as_of:
+            self._estimates = fit_elasticities(self._daily, as_of)
+            self._as_of = as_of
+        return self._estimates
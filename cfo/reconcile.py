@@ -0,0 +1,189 @@
+"""Reconcile Venmo payments against the sales ledger.
+
+Payments are matched to sales rows by amount, flavor (parsed from the
+payment note) and time. Sales rows only carry a date, so they are placed
+at noon of that day. Matching runs in passes, each fully vectorized:
+
+1. exact: same amount, flavor and day, pairing the n-th payment with the
+   n-th sale of that key (a hash join),
+2. nearest: same amount and flavor within ``tolerance`` (sorted as-of
+   join), for payments logged a day early or late,
+3. amount only within ``tolerance``, for payments whose note names no
+   flavor.
+
+Each sale is used at most once. Payments and sales without a usable
+date never match. Whatever is left over is reported as unmatched,
+alongside likely duplicate payments and sales.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cfo.notes import UNKNOWN_FLAVOR, parse_notes
+
+SALE_TIME = pd.Timedelta(hours=12)
+
+
+def payments_frame(transactions):
+    """Venmo payments (records or a frame) as a frame with id, when, cents and flavor columns"""
+    df = pd.DataFrame(transactions if isinstance(transactions, pd.DataFrame) else list(transactions))
+    if df.empty:
+        return pd.DataFrame(columns=["payment", "id", "when", "cents", "flavor", "note", "amount"])
+    for column, default in (("note", ""), ("time", ""), ("date", None), ("id", None)):
+        if column not in df:
+            df[column] = default
+    day = pd.to_datetime(df["date"].astype("string"), errors="coerce")
+    # Synced times are "14:05" or "2:30 PM"; payments without one sit at noon
+    times = df["time"].astype("string").str.strip()
+    clock = pd.to_datetime(times, format="%H:%M", errors="coerce")
+    clock = clock.fillna(pd.to_datetime(times, format="%I:%M %p", errors="coerce"))
+    offset = (clock - clock.dt.normalize()).fillna(SALE_TIME)
+    return pd.DataFrame({
+        "payment": np.arange(len(df)),
+        "id": df["id"],
+        "when": day + offset,
+        "cents": (pd.to_numeric(df["amount"], errors="coerce").fillna(0) * 100).round().astype("int64"),
+        "flavor": parse_notes(df["note"])["flavor"].to_numpy(),
+        "note": df["note"],
+        "amount": pd.to_numeric(df["amount"], errors="coerce"),
+    })
+
+
+def sales_frame(records):
+    """Sales rows (records or a frame) as a frame with when, cents and flavor columns"""
+    df = pd.DataFrame(records if isinstance(records, pd.DataFrame) else list(records))
+    if df.empty:
+        return pd.DataFrame(columns=["sale", "when", "cents", "flavor", "Date", "Revenue", "Quantity"])
+    return pd.DataFrame({
+        "sale": np.arange(len(df)),
+        "when": pd.to_datetime(df["Date"], errors="coerce").dt.normalize() + SALE_TIME,
+        "cents": (pd.to_numeric(df["Revenue"], errors="coerce").fillna(0) * 100).round().astype("int64"),
+        "flavor": df["Flavor"].astype(str),
+        "Date": df["Date"],
+        "Revenue": df["Revenue"],
+        "Quantity": df.get("Quantity", pd.Series(1, index=df.index)),
+    })
+
+
+def _exact_pass(payments, sales):
+    keys = ["cents", "flavor", "day"]
+    # Undated rows would pair up with each other, since merge treats NaT keys as equal
+    left = payments.dropna(subset=["when"]).assign(day=lambda frame: frame["when"].dt.normalize())
+    right = sales.dropna(subset=["when"]).assign(day=lambda frame: frame["when"].dt.normalize())
+    left["nth"] = left.groupby(keys, sort=False).cumcount()
+    right["nth"] = right.groupby(keys, sort=False).cumcount()
+    pairs = left[keys + ["nth", "payment"]].merge(right[keys + ["nth", "sale"]], on=keys + ["nth"])
+    return pairs[["payment", "sale"]]
+
+
+def _nearest_pass(payments, sales, by, tolerance, rounds=4):
+    """One-to-one nearest matches.
+
+    A sale picked by several payments goes to the closest one; the others
+    try again against the remaining sales, for up to ``rounds`` rounds.
+    """
+    matched = []
+    for _ in range(rounds):
+        if payments.empty or sales.empty:
+            break
+        left = payments[["payment", "when"] + by].dropna(subset=["when"]).sort_values("when", kind="stable")
+        right = sales[["sale", "when"] + by].dropna(subset=["when"]).rename(columns={"when": "sale_when"})
+        right = right.sort_values("sale_when", kind="stable")
+        joined = pd.merge_asof(
+            left, right, left_on="when", right_on="sale_when", by=by,
+            direction="nearest", tolerance=tolerance,
+        ).dropna(subset=["sale"])
+        if joined.empty:
+            break
+        # Several payments may pick the same sale; the closest one keeps it
+        joined["gap"] = (joined["when"] - joined["sale_when"]).abs()
+        joined = joined.sort_values(["gap", "payment"], kind="stable").drop_duplicates("sale")
+        pairs = joined[["payment", "sale"]].astype("int64")
+        matched.append(pairs)
+        payments = payments[~payments["payment"].isin(pairs["payment"])]
+        sales = sales[~sales["sale"].isin(pairs["sale"])]
+    if not matched:
+        return pd.DataFrame({"payment": pd.Series(dtype="int64"), "sale": pd.Series(dtype="int64")})
+    return pd.concat(matched, ignore_index=True)
+
+
+def _duplicate_payments(payments, unmatched, window):
+    """Unmatched payments repeating the previous payment's amount and note within ``window``.
+
+    The first of a double charge usually matches a sale; the repeat is
+    what's left over.
+    """
+    ordered = payments.assign(note_key=payments["note"].fillna("").astype(str).str.lower().str.strip())
+    ordered = ordered.dropna(subset=["when"]).sort_values(["cents", "note_key", "when"], kind="stable")
+    same = (ordered["cents"] == ordered["cents"].shift()) & (ordered["note_key"] == ordered["note_key"].shift())
+    close = (ordered["when"] - ordered["when"].shift()) <= window
+    flagged = ordered[same & close & ordered["payment"].isin(unmatched["payment"])]
+    return flagged[["payment", "id", "when", "amount", "note"]]
+
+
+def _duplicate_sales(sales, unmatched, matched_ids):
+    """Unmatched sales identical (day, flavor, amount) to a sale a payment matched"""
+    keys = ["day", "flavor", "cents"]
+    sales = sales.assign(day=sales["when"].dt.normalize())
+    matched_keys = sales[sales["sale"].isin(matched_ids)][keys].drop_duplicates()
+    leftover = sales[sales["sale"].isin(unmatched["sale"])]
+    flagged = leftover.merge(matched_keys, on=keys)
+    return flagged[["sale", "Date", "flavor", "Quantity", "Revenue"]]
+
+
+def reconcile(transactions, sales_records, tolerance_days=1, duplicate_minutes=5):
+    """Match payments to sales.
+
+    Returns a dict of frames: ``matched`` (payment and sale side by side,
+    with the pass that matched them), ``unmatched_payments``,
+    ``unmatched_sales``, ``duplicate_payments`` and ``duplicate_sales``,
+    plus a ``summary`` dict of counts and amounts.
+    """
+    payments = payments_frame(transactions)
+    sales = sales_frame(sales_records)
+    tolerance = pd.Timedelta(days=tolerance_days)
+
+    passes = []
+    exact = _exact_pass(payments, sales)
+    passes.append(exact.assign(method="exact"))
+    remaining_payments = payments[~payments["payment"].isin(exact["payment"])]
+    remaining_sales = sales[~sales["sale"].isin(exact["sale"])]
+
+    nearest = _nearest_pass(remaining_payments, remaining_sales, ["cents", "flavor"], tolerance)
+    passes.append(nearest.assign(method="nearest"))
+    remaining_payments = remaining_payments[~remaining_payments["payment"].isin(nearest["payment"])]
+    remaining_sales = remaining_sales[~remaining_sales["sale"].isin(nearest["sale"])]
+
+    unflavored = remaining_payments[remaining_payments["flavor"] == UNKNOWN_FLAVOR]
+    by_amount = _nearest_pass(unflavored, remaining_sales, ["cents"], tolerance)
+    passes.append(by_amount.assign(method="amount only"))
+    remaining_payments = remaining_payments[~remaining_payments["payment"].isin(by_amount["payment"])]
+    remaining_sales = remaining_sales[~remaining_sales["sale"].isin(by_amount["sale"])]
+
+    pairs = pd.concat(passes, ignore_index=True)
+    matched = (
+        pairs.merge(payments[["payment", "id", "when", "amount", "note", "flavor"]], on="payment")
+        .merge(sales[["sale", "Date", "flavor", "Revenue"]].rename(columns={"flavor": "sale_flavor"}), on="sale")
+    )
+
+    result = {
+        "matched": matched,
+        "unmatched_payments": remaining_payments[["payment", "id", "when", "amount", "note", "flavor"]],
+        "unmatched_sales": remaining_sales[["sale", "Date", "flavor", "Quantity", "Revenue"]],
+        "duplicate_payments": _duplicate_payments(
+            payments, remaining_payments, pd.Timedelta(minutes=duplicate_minutes)),
+        "duplicate_sales": _duplicate_sales(sales, remaining_sales, pairs["sale"]),
+    }
+    result["summary"] = {
+        "payments": len(payments),
+        "sales": len(sales),
+        "matched": len(matched),
+        "matched_amount": float(matched["amount"].sum()) if len(matched) else 0.0,
+        "unmatched_payments": len(result["unmatched_payments"]),
+        "unmatched_payment_amount": float(result["unmatched_payments"]["amount"].sum()),
+        "unmatched_sales": len(result["unmatched_sales"]),
+        "unmatched_sales_amount": float(pd.to_numeric(result["unmatched_sales"]["Revenue"], errors="coerce").sum()),
+        "duplicate_payments": len(result["duplicate_payments"]),
+        "duplicate_sales": len(result["duplicate_sales"]),
+    }
+    return result
@@ -0,0 +1,296 @@
+"""Headless daily CFO pack.
+
+Builds the Dashboard metrics, flavor performance, P&L statements,
+inventory days-of-stock and Venmo daily totals from the datasets the app
+saves (see :mod:`cfo.store`, plus closed months in :mod:`cfo.archive`)
+into a single HTML file, plus a PDF when WeasyPrint is installed. No
+Streamlit session is needed::
+
+    python -m cfo.report                 # today's pack
+    python -m cfo.report --as-of 2026-07-04 --pdf
+
+Between runs the job keeps a small state file. A section is only rebuilt
+when a dataset it reads changed on disk or the report date moved, and
+P&L statements for closed periods are reused unless a row in that
+period changed.
+"""
+
+import argparse
+import html
+import os
+import pickle
+import sys
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+from cfo import DATA_DIR, archive, ledger, store
+from cfo.fx import load_rates
+
+# Bump when a section's output changes so cached fragments are rebuilt
+REPORT_VERSION = 1
+
+SECTIONS = {
+    "metrics": ("Dashboard Metrics", ["sales_data", "expense_data"]),
+    "flavors": ("Flavor Performance", ["sales_data"]),
+    "pnl": ("Profit & Loss", ["sales_data", "expense_data", "profit_data"]),
+    "inventory": ("Inventory Days of Stock", ["inventory_data", "sales_data"]),
+    "venmo": ("Venmo Daily Totals", ["venmo_data"]),
+}
+
+STYLE = """
+body { font-family: -apple-system, Segoe UI, Helvetica, Arial, sans-serif; color: #2C3E50; margin: 2rem; }
+.header { background: linear-gradient(90deg, #E74C3C, #3498DB); color: white; padding: 1rem;
+          border-radius: 10px; text-align: center; }
+.metrics { display: flex; gap: 1rem; flex-wrap: wrap; }
+.metric { background: #f8f9fa; border-left: 4px solid #3498DB; border-radius: 10px; padding: 1rem; min-width: 10rem; }
+.metric .value { font-size: 1.6rem; font-weight: 600; }
+table { border-collapse: collapse; margin: 0.5rem 0 1.5rem; }
+th, td { border-bottom: 1px solid #E8F4F8; padding: 4px 10px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+"""
+
+
+class ReportState:
+    """What the previous run saw, so the next run can skip unchanged work"""
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.fragments = {}
+        self.day_digests = pd.Series(dtype="uint64")
+        self.engine = ledger.PnLEngine()
+
+    @classmethod
+    def load(cls, path):
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as handle:
+                    return pickle.load(handle)
+            except Exception:
+                pass
+        return cls()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as handle:
+            pickle.dump(self, handle)
+        os.replace(path + ".tmp", path)
+
+
+def _money(value):
+    return f"${value:,.2f}"
+
+
+def _table(df, **kwargs):
+    return df.to_html(border=0, float_format=lambda v: f"{v:,.2f}", **kwargs)
+
+
+def _figure(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def _section_metrics(data, as_of):
+    statement = data["engine"].current(data["sales"], data["expenses"], "season", as_of)
+    metrics = ledger.dashboard_metrics(statement)
+    cards = [
+        ("Total Revenue", _money(metrics["total_revenue"])),
+        ("Gross Profit", _money(metrics["gross_profit"])),
+        ("Net Profit", _money(metrics["net_profit"])),
+        ("Top Flavor", f"{html.escape(str(metrics['top_flavor']))} ({metrics['top_flavor_percentage']:.1f}%)"),
+    ]
+    return '<div class="metrics">' + "".join(
+        f'<div class="metric"><div>{label}</div><div class="value">{value}</div></div>' for label, value in cards
+    ) + "</div>"
+
+
+def _section_flavors(data, as_of):
+    import plotly.express as px
+
+    sales = data["sales"]
+    season = sales[sales["Date"].dt.year == as_of.year]
+    last_week = season[season["Date"] > as_of - pd.Timedelta(days=7)]
+    table = season.groupby("Flavor").agg(Revenue=("Revenue", "sum"), Units=("Quantity", "sum"))
+    table["Share %"] = table["Revenue"] / table["Revenue"].sum() * 100 if not table.empty else 0.0
+    table["Last 7 Days"] = last_week.groupby("Flavor")["Revenue"].sum().reindex(table.index, fill_value=0.0)
+    table = table.sort_values("Revenue", ascending=False)
+    if table.empty:
+        return "<p>No sales recorded this season.</p>"
+    fig = px.pie(table.reset_index(), values="Revenue", names="Flavor", title="Season Revenue by Flavor")
+    return _table(table) + _figure(fig)
+
+
+def _section_pnl(data, as_of):
+    import plotly.graph_objects as go
+
+    monthly = data["engine"].statements(data["sales"], data["expenses"], "month", as_of)
+    parts = []
+    if monthly.empty:
+        parts.append("<p>No ledger activity yet.</p>")
+    else:
+        monthly = monthly[monthly.index.year == as_of.year]
+        shown = monthly[["total_revenue", "total_cogs", "total_expenses", "gross_profit", "net_profit", "net_margin"]]
+        shown.index = shown.index.astype(str)
+        parts.append("<h3>Monthly statements (this season)</h3>" + _table(shown))
+        fig = go.Figure([
+            go.Bar(name="Revenue", x=shown.index, y=shown["total_revenue"], marker_color="green"),
+            go.Bar(name="COGS", x=shown.index, y=shown["total_cogs"], marker_color="red"),
+            go.Bar(name="Expenses", x=shown.index, y=shown["total_expenses"], marker_color="orange"),
+        ])
+        fig.update_layout(title="Revenue vs Costs by Month", barmode="group")
+        parts.append(_figure(fig))
+
+    if data["profit_data"]:
+        summary = ledger.profit_summary({**ledger.empty_profit_data(), **data["profit_data"]})
+        rows = pd.Series(summary).rename("Profit Calculator").to_frame()
+        parts.append("<h3>Profit Calculator inputs</h3>" + _table(rows))
+    return "".join(parts)
+
+
+def _section_inventory(data, as_of):
+    table = ledger.days_of_stock(data["inventory"], data["sales"], as_of)
+    if table.empty:
+        return "<p>No inventory recorded.</p>"
+    table = table.sort_values("Days of Stock")
+    table["Days of Stock"] = table["Days of Stock"].map(lambda d: "no recent sales" if d == float("inf") else f"{d:,.1f}")
+    return _table(table)
+
+
+def _section_venmo(data, as_of):
+    transactions = pd.DataFrame(data["venmo"].get("transactions", []))
+    if transactions.empty:
+        return "<p>No Venmo transactions synced.</p>"
+    if "date" not in transactions:
+        transactions["date"] = None
+    transactions["date"] = pd.to_datetime(transactions["date"], errors="coerce")
+    daily = transactions.groupby(transactions["date"].dt.date, dropna=False)["amount"].agg(["count", "sum"])
+    daily.columns = ["Transactions", "Total"]
+    daily.index = [str(d) if pd.notna(d) else "Undated" for d in daily.index]
+    return _table(daily.sort_index(ascending=False).head(30))
+
+
+RENDERERS = {
+    "metrics": _section_metrics,
+    "flavors": _section_flavors,
+    "pnl": _section_pnl,
+    "inventory": _section_inventory,
+    "venmo": _section_venmo,
+}
+
+
+def _day_digests(sales, expenses):
+    """One order-independent hash per calendar day of ledger rows"""
+    frames = []
+    for df in (sales, expenses):
+        if not df.empty:
+            hashes = pd.util.hash_pandas_object(df, index=False)
+            frames.append(hashes.groupby(df["Date"].dt.normalize()).sum())
+    if not frames:
+        return pd.Series(dtype="uint64")
+    return pd.concat(frames).groupby(level=0).sum()
+
+
+def build_report(as_of=None, data_dir=None, output_dir=None, pdf=False, force=False):
+    """Build the pack and return ``(html_path, pdf_path_or_None, rebuilt_sections)``"""
+    data_dir = data_dir or DATA_DIR
+    output_dir = output_dir or os.path.join(data_dir, "reports")
+    as_of = pd.Timestamp(as_of or date.today()).normalize()
+    state_path = os.path.join(output_dir, "state.pkl")
+    state = ReportState() if force else ReportState.load(state_path)
+    # Closed months of sales and Venmo payments live in the archive, not the store
+    closed = archive.Archive(data_dir) if archive.available() else None
+
+    def modified(name):
+        if closed is not None and name in archive.KEYS:
+            return store.modified(name, data_dir), closed.modified(name)
+        return store.modified(name, data_dir)
+
+    fingerprints = {
+        key: (REPORT_VERSION, str(as_of.date()), [modified(name) for name in deps])
+        for key, (_, deps) in SECTIONS.items()
+    }
+    stale = [key for key in SECTIONS if state.fingerprints.get(key) != fingerprints[key] or key not in state.fragments]
+
+    if stale:
+        sales = store.load("sales_data", [], data_dir)
+        venmo_data = store.load("venmo_data", {}, data_dir)
+        if closed is not None:
+            # Raw records, so open rows keep the IDs the archive matches on
+            sales = closed.with_open(archive.SALES, sales)
+            venmo_data = {**venmo_data, "transactions": closed.with_open(archive.VENMO, venmo_data.get("transactions", []))}
+        sales = ledger.sales_frame(sales)
+        expenses = ledger.expense_frame(
+            store.load("expense_data", [], data_dir), through=as_of,
+            rates=load_rates(os.environ.get("FX_RATES_FILE", "sample_data/fx_rates.csv")),
+        )
+
+        # Only periods containing a changed day lose their cached statement
+        digests = _day_digests(sales, expenses)
+        previous = state.day_digests
+        days = digests.index.union(previous.index)
+        changed = days[digests.reindex(days, fill_value=0).values != previous.reindex(days, fill_value=0).values]
+        if len(changed):
+            state.engine.invalidate(*changed)
+        state.day_digests = digests
+
+        data = {
+            "sales": sales,
+            "expenses": expenses,
+            "engine": state.engine,
+            "profit_data": store.load("profit_data", {}, data_dir),
+            "inventory": store.load("inventory_data", {}, data_dir),
+            "venmo": venmo_data,
+        }
+        for key in stale:
+            state.fragments[key] = RENDERERS[key](data, as_of)
+            state.fingerprints[key] = fingerprints[key]
+
+    import plotly.offline
+
+    body = "".join(
+        f"<h2>{title}</h2>{state.fragments[key]}" for key, (title, _) in SECTIONS.items()
+    )
+    page = (
+        "<html><head><meta charset='utf-8'><title>Daily CFO Pack</title>"
+        f"<style>{STYLE}</style><script>{plotly.offline.get_plotlyjs()}</script></head><body>"
+        f"<div class='header'><h1>🍧 Daily CFO Pack</h1><p>{as_of:%A, %B %d, %Y}</p></div>"
+        f"{body}<p><small>Generated {datetime.now():%Y-%m-%d %H:%M}</small></p></body></html>"
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    html_path = os.path.join(output_dir, f"cfo_pack_{as_of:%Y-%m-%d}.html")
+    with open(html_path, "w", encoding="utf-8") as handle:
+        handle.write(page)
+
+    pdf_path = None
+    if pdf:
+        try:
+            from weasyprint import HTML
+        except ImportError:
+            print("PDF skipped: install weasyprint to enable PDF output.", file=sys.stderr)
+        else:
+            pdf_path = html_path[:-5] + ".pdf"
+            HTML(string=page).write_pdf(pdf_path)
+
+    state.save(state_path)
+    return html_path, pdf_path, stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the daily CFO pack without starting Streamlit.")
+    parser.add_argument("--as-of", help="Report date (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--data-dir", help=f"Directory the app saves its data to (default: {DATA_DIR})")
+    parser.add_argument("--output-dir", help="Where to write the pack (default: <data-dir>/reports)")
+    parser.add_argument("--pdf", action="store_true", help="Also write a PDF (requires weasyprint)")
+    parser.add_argument("--force", action="store_true", help="Ignore the previous run and rebuild everything")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    html_path, pdf_path, rebuilt = build_report(args.as_of, args.data_dir, args.output_dir, args.pdf, args.force)
+    print(f"Wrote {html_path}" + (f" and {pdf_path}" if pdf_path else ""))
+    print(f"Rebuilt {len(rebuilt)} of {len(SECTIONS)} sections in {time.perf_counter() - started:.2f}s"
+          + (f": {', '.join(rebuilt)}" if rebuilt else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Full-text search over chat messages, notes and deals.
+
+An inverted index maps each term to the documents containing it (with
+term counts), so a query only touches the postings of its own terms and
+stays fast however much history has piled up. Results are ranked with
+BM25; the last query word also matches as a prefix, so partial words
+work in the sidebar box.
+
+Sources are append-mostly lists. :meth:`SearchIndex.sync` indexes only
+the records added since its last call, and rebuilds a source from
+scratch when records were removed or edited.
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, namedtuple
+
+Hit = namedtuple("Hit", ["key", "kind", "score", "text", "ref"])
+
+_WORDS = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SNIPPET_CHARS = 160
+MAX_COMPLETIONS = 20
+
+
+def tokenize(text):
+    """Lowercase word and number tokens"""
+    return _WORDS.findall(str(text).lower())
+
+
+def snippet(text, terms, width=SNIPPET_CHARS):
+    """Up to ``width`` characters of ``text`` around the first matching term"""
+    text = " ".join(str(text).split())
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    hits = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(0, min(hits) - width // 4) if hits else 0
+    return ("…" if start else "") + text[start:start + width] + ("…" if start + width < len(text) else "")
+
+
+class SearchIndex:
+    """Incrementally updated inverted index with BM25 ranking.
+
+    Documents are keyed by any hashable (``("message", 12)``) and carry
+    a ``kind`` used to filter results and a ``ref`` pointing back at the
+    source record.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.docs = {}
+        self.kinds = {}
+        self.total_length = 0
+        self.cursors = {}
+        self._vocabulary = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, key, kind, text, ref=None):
+        """Index ``text`` under ``key``, replacing any earlier version"""
+        if key in self.docs:
+            self.remove(key)
+        terms = tokenize(text)
+        counts = Counter(terms)
+        for term, count in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary = None
+            postings[key] = count
+        self.docs[key] = (kind, text, ref, len(terms), tuple(counts))
+        self.kinds.setdefault(kind, set()).add(key)
+        self.total_length += len(terms)
+
+    def remove(self, key):
+        kind, _, _, length, terms = self.docs.pop(key)
+        for term in terms:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+        self.kinds[kind].discard(key)
+        self.total_length -= length
+
+    def reset(self, kind):
+        """Drop every document of ``kind`` so the next sync rebuilds it"""
+        for key in list(self.kinds.get(kind, ())):
+            self.remove(key)
+        self.cursors.pop(kind, None)
+
+    def sync(self, kind, records, to_text, to_ref=None):
+        """Index records appended to ``records`` since the last sync; returns how many.
+
+        ``to_text(record)`` gives the searchable text and ``to_ref``
+        (default: the position) what hits point back to. If records
+        were removed or the last one seen changed, the kind is rebuilt.
+        """
+        cursor, last = self.cursors.get(kind, (0, None))
+        if cursor > len(records) or (cursor and records[cursor - 1] != last):
+            self.reset(kind)
+            cursor = 0
+        for position in range(cursor, len(records)):
+            record = records[position]
+            ref = to_ref(position, record) if to_ref else position
+            self.add((kind, position), kind, to_text(record), ref)
+        self.cursors[kind] = (len(records), records[-1] if records else None)
+        return len(records) - cursor
+
+    def _expand(self, term):
+        """``term`` itself if indexed, else the most common indexed terms it begins"""
+        if term in self.postings:
+            return [term]
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff")
+        completions = self._vocabulary[start:end]
+        if len(completions) > MAX_COMPLETIONS:
+            completions = heapq.nlargest(MAX_COMPLETIONS, completions, key=lambda t: len(self.postings[t]))
+        return completions
+
+    def search(self, query, limit=20, kinds=None):
+        """Best ``limit`` hits for ``query``, highest BM25 score first"""
+        terms = tokenize(query)
+        if not terms or not self.docs:
+            return []
+        n_docs = len(self.docs)
+        average_length = self.total_length / n_docs or 1
+        query_terms = [[term] for term in terms[:-1]] + [self._expand(terms[-1])]
+
+        scores = {}
+        for alternatives in query_terms:
+            for term in alternatives:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                # Completions of a partial last word count a little less than whole words
+                weight = 1.0 if term in terms else 0.8
+                for key, count in postings.items():
+                    length = self.docs[key][3]
+                    norm = count + self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[key] = scores.get(key, 0.0) + weight * idf * count * (self.k1 + 1) / norm
+
+        if kinds is not None:
+            scores = {key: score for key, score in scores.items() if self.docs[key][0] in kinds}
+        # Ties go to the newest document
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], _recency(item[0])))
+        highlight = [term for alternatives in query_terms for term in alternatives]
+        return [
+            Hit(key, self.docs[key][0], score, snippet(self.docs[key][1], highlight), self.docs[key][2])
+            for key, score in ranked
+        ]
+
+
+def _recency(key):
+    position = key[-1] if isinstance(key, tuple) else 0
+    return -position if isinstance(position, int) else 0
@@ -0,0 +1,136 @@
+"""Staff needed per hour for a demand forecast, and the cheapest shifts that provide it.
+
+Drinks ordered in an hour are taken as Poisson around the forecast. An
+hour needs enough staff to serve the ``service_level`` quantile of that
+demand, and at least one person while the stand is open.
+
+Shifts are contiguous blocks between a minimum and a maximum length.
+Covering the hourly requirements at the fewest paid hours is an integer
+program. Its covering constraints have the consecutive-ones property,
+so it turns into a min-cost flow over the day's hour boundaries, and
+:func:`day_shifts` solves that exactly by successive shortest paths.
+Each day is independent, and a week takes a few milliseconds.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Above this many expected drinks the Poisson quantile uses its normal approximation
+_NORMAL_ABOVE = 50
+# Among schedules with the same paid hours, prefer fewer shifts
+_SHIFT_COST = 1
+_HOUR_COST = 1000
+
+
+def required_staff(drinks, service_level=0.9, drinks_per_staff_hour=30, minimum=1):
+    """Staff per hour so that demand is served with probability ``service_level``"""
+    drinks = np.asarray(drinks, dtype=float)
+    peak = int(drinks.max(initial=0.0) + 10 * math.sqrt(drinks.max(initial=0.0)) + 10)
+    # Poisson CDFs for every hour at once, up to a count well past the largest forecast
+    small = np.minimum(drinks, _NORMAL_ABOVE)
+    k = np.arange(peak + 1)
+    log_pmf = k[:, None] * np.log(np.maximum(small, 1e-12)) - small - np.cumsum(np.log(np.maximum(k, 1)))[:, None]
+    cdf = np.cumsum(np.exp(log_pmf), axis=0)
+    quantile = np.argmax(cdf >= service_level, axis=0).astype(float)
+    z = NormalDist().inv_cdf(service_level)
+    large = drinks > _NORMAL_ABOVE
+    quantile[large] = np.ceil(drinks[large] + z * np.sqrt(drinks[large]))
+    quantile[drinks <= 0] = 0.0
+    return np.maximum(np.ceil(quantile / drinks_per_staff_hour), minimum).astype(int)
+
+
+def day_shifts(required, min_hours=3, max_hours=8):
+    """Cheapest shifts covering ``required`` (staff per open hour, in order).
+
+    Returns ``[(start, end, staff), ...]`` with ``start`` and ``end`` as
+    offsets into ``required``.
+    """
+    required = [int(r) for r in required]
+    hours = len(required)
+    if not hours or not any(required):
+        return []
+    min_hours = min(min_hours, hours)
+    max_hours = max(min(max_hours, hours), min_hours)
+    # Nodes 0..hours are hour boundaries. A shift [i, j) is an arc i -> j; an
+    # arc h + 1 -> h lets staff on hand exceed what hour h needs
+    arcs = []  # [tail, head, capacity, cost]; each arc's reverse is stored next to it
+    graph = [[] for _ in range(hours + 3)]
+    source, sink = hours + 1, hours + 2
+
+    def add(tail, head, capacity, cost):
+        graph[tail].append(len(arcs))
+        arcs.append([tail, head, capacity, cost])
+        graph[head].append(len(arcs))
+        arcs.append([head, tail, 0, -cost])
+
+    unlimited = sum(required) + 1
+    shift_arcs = []
+    for start in range(hours):
+        for end in range(start + min_hours, min(start + max_hours, hours) + 1):
+            shift_arcs.append((len(arcs), start, end))
+            add(start, end, unlimited, (end - start) * _HOUR_COST + _SHIFT_COST)
+    for hour in range(hours):
+        add(hour + 1, hour, unlimited, 0)
+    padded = [0] + required + [0]
+    demand = 0
+    for node in range(hours + 1):
+        supply = padded[node + 1] - padded[node]
+        if supply > 0:
+            add(source, node, supply, 0)
+            demand += supply
+        elif supply < 0:
+            add(node, sink, -supply, 0)
+
+    # Successive shortest paths (Bellman-Ford, since residual costs go negative)
+    while demand:
+        distance = [math.inf] * len(graph)
+        via = [None] * len(graph)
+        distance[source] = 0
+        for _ in range(len(graph) - 1):
+            updated = False
+            for index, (tail, head, capacity, cost) in enumerate(arcs):
+                if capacity > 0 and distance[tail] + cost < distance[head]:
+                    distance[head] = distance[tail] + cost
+                    via[head] = index
+                    updated = True
+            if not updated:
+                break
+        if via[sink] is None:
+            raise ValueError("No shift pattern covers these hours")
+        path, node = [], sink
+        while node != source:
+            path.append(via[node])
+            node = arcs[via[node]][0]
+        amount = min(min(arcs[index][2] for index in path), demand)
+        for index in path:
+            arcs[index][2] -= amount
+            arcs[index ^ 1][2] += amount
+        demand -= amount
+
+    return [(start, end, arcs[index ^ 1][2]) for index, start, end in shift_arcs if arcs[index ^ 1][2]]
+
+
+def schedule(hourly, open_hours, service_level=0.9, drinks_per_staff_hour=30, wage=15.0, min_hours=3, max_hours=8):
+    """Staffing plan for an hourly forecast (Date, hour, drinks).
+
+    Returns ``(hours, shifts)``: ``hours`` adds the staff each open hour
+    needs and gets, and ``shifts`` lists each shift's Date, Start, End,
+    Staff, Hours and Cost.
+    """
+    first, last = open_hours
+    hours = hourly[(hourly["hour"] >= first) & (hourly["hour"] < last)].sort_values(["Date", "hour"]).reset_index(drop=True)
+    hours["needed"] = required_staff(hours["drinks"], service_level, drinks_per_staff_hour)
+    hours["scheduled"] = 0
+    rows = []
+    for day, needed in hours.groupby("Date", sort=True)["needed"]:
+        for start, end, staff in day_shifts(needed.to_numpy(), min_hours, max_hours):
+            hours.loc[needed.index[start:end], "scheduled"] += staff
+            rows.append({
+                "Date": day.date(), "Start": f"{first + start:02d}:00", "End": f"{first + end:02d}:00",
+                "Staff": staff, "Hours": (end - start) * staff, "Cost": (end - start) * staff * wage,
+            })
+    shifts = pd.DataFrame(rows, columns=["Date", "Start", "End", "Staff", "Hours", "Cost"])
+    return hours, shifts
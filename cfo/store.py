@@ -0,0 +1,164 @@
+"""On-disk copies of the app's ledgers.
+
+The app saves a dataset whenever its contents change, so offline jobs
+(like the nightly report) can read the same data without a Streamlit
+session. Each dataset is one JSON file under ``DATA_DIR/store``.
+"""
+
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from cfo import DATA_DIR
+
+DATASETS = ["sales_data", "expense_data", "inventory_data", "profit_data", "venmo_data"]
+
+# Record fields holding dates, restored to ``date`` objects on load
+DATE_FIELDS = {"Date", "Until", "added", "date"}
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value):
+    return json.dumps(value, default=_default, sort_keys=True)
+
+
+def fingerprint(value):
+    """Content hash used to skip saving unchanged datasets"""
+    return hashlib.sha256(_dumps(value).encode("utf-8")).hexdigest()
+
+
+def path(name, data_dir=None):
+    return os.path.join(data_dir or DATA_DIR, "store", f"{name}.json")
+
+
+def save(name, value, data_dir=None):
+    target = path(name, data_dir)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target + ".tmp", "w", encoding="utf-8") as handle:
+        handle.write(_dumps(value))
+    os.replace(target + ".tmp", target)
+
+
+def load(name, default=None, data_dir=None):
+    """Load a dataset, restoring ISO dates in record lists (top level or one dict deep)"""
+    target = path(name, data_dir)
+    if not os.path.exists(target):
+        return default
+    with open(target, encoding="utf-8") as handle:
+        value = json.load(handle)
+    lists = [value] if isinstance(value, list) else []
+    if isinstance(value, dict):
+        lists = [v for v in value.values() if isinstance(v, list)]
+    for records in lists:
+        for record in records:
+            if isinstance(record, dict):
+                _restore_dates(record)
+    return value
+
+
+def modified(name, data_dir=None):
+    """Modification time of a stored dataset, or None"""
+    target = path(name, data_dir)
+    return os.path.getmtime(target) if os.path.exists(target) else None
+
+
+def _restore_dates(record):
+    for field in DATE_FIELDS & record.keys():
+        value = record[field]
+        if isinstance(value, str) and len(value) >= 10:
+            try:
+                record[field] = date.fromisoformat(value[:10])
+            except ValueError:
+                pass
+
+
+
+def _list_start(handle, records_key):
+    """Offset of the ``[`` opening a stored record list, reading only up to it"""
+    if records_key is None:
+        return 0
+    # Keys are sorted and other values are small, so the list opens near the top
+    marker = (json.dumps(records_key) + ": [").encode("ascii")
+    head = b""
+    while True:
+        chunk = handle.read(4096)
+        head += chunk
+        found = head.find(marker)
+        if found >= 0:
+            return found + len(marker) - 1
+        if not chunk:
+            return None
+
+
+def tail(name, after=None, records_key=None, data_dir=None):
+    """Records of a stored list saved past an earlier read.
+
+    ``after`` is the position returned by the previous call: where the
+    last record read ends, counted from the start of the list, and that
+    record's text. Only the file from there on (and any small fields
+    ahead of the list) is read and parsed. With ``after=None`` the whole
+    list is read. ``records_key`` picks the list out of a dict dataset.
+    Returns ``(records, position)``, or None when the dataset is missing
+    or no longer continues from ``after`` (rows were edited or removed);
+    callers then read it whole.
+    """
+    target = path(name, data_dir)
+    if not os.path.exists(target):
+        return None
+    # Saved JSON is ASCII, so character and byte offsets agree
+    with open(target, "rb") as handle:
+        if after is None:
+            text = handle.read().decode("ascii")
+            value = json.loads(text)
+            records = value.get(records_key) if isinstance(value, dict) else value
+            records = records if isinstance(records, list) else []
+            position = None
+            handle.seek(0)
+            start = _list_start(handle, records_key)
+            if records and start is not None:
+                last = _dumps(records[-1])
+                found = text.rfind(last, start)
+                if found >= 0:
+                    position = (found + len(last) - start, last)
+        else:
+            offset, last = after
+            start = _list_start(handle, records_key)
+            if start is None or offset < len(last):
+                return None
+            handle.seek(start + offset - len(last))
+            text = handle.read().decode("ascii")
+            if not text.startswith(last):
+                return None
+            records, end, decoder = [], len(last), json.JSONDecoder()
+            position = after
+            while True:
+                while end < len(text) and text[end].isspace():
+                    end += 1
+                if end == len(text) or text[end] != ",":
+                    break
+                end += 1
+                while end < len(text) and text[end].isspace():
+                    end += 1
+                begin = end
+                try:
+                    record, end = decoder.raw_decode(text, begin)
+                except ValueError:
+                    return None
+                records.append(record)
+                position = (offset - len(last) + end, text[begin:end])
+            if end == len(text) or text[end] != "]":
+                return None
+    for record in records:
+        if isinstance(record, dict):
+            _restore_dates(record)
+    return records, position
@@ -0,0 +1,246 @@
+"""Tools the chat model can call instead of doing arithmetic in prose.
+
+``TOOLS`` is the OpenAI ``tools`` list: the calculators behind
+``/calculate`` plus queries over the sales, expense and P&L ledgers.
+:func:`stream_with_tools` runs a chat completion, executes any tool
+calls locally, feeds the exact results back and streams the model's
+final answer.
+
+Tools receive a context dict with ``sales`` (:func:`cfo.ledger.sales_frame`),
+``expenses`` (:func:`cfo.ledger.expense_frame`), ``profit_data`` (the
+Profit Calculator inputs) and ``pnl_engine``.
+"""
+
+import json
+import math
+
+import pandas as pd
+
+from cfo import calculators, ledger
+
+MAX_TOOL_ROUNDS = 4
+
+
+def _number(description):
+    return {"type": "number", "description": description}
+
+
+def _date(description):
+    return {"type": "string", "description": f"{description} (YYYY-MM-DD)"}
+
+
+def _function(name, description, properties, required=()):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": list(required)},
+        },
+    }
+
+
+TOOLS = [
+    _function("profit_margin", "Profit and margin percent from revenue and costs.",
+              {"revenue": _number("Revenue in dollars"), "costs": _number("Costs in dollars")},
+              ["revenue", "costs"]),
+    _function("break_even", "Units needed to cover fixed costs.",
+              {"fixed_costs": _number("Fixed costs in dollars"), "price": _number("Price per unit"),
+               "variable_cost": _number("Variable cost per unit")},
+              ["fixed_costs", "price", "variable_cost"]),
+    _function("markup", "Selling price from a cost and markup percent.",
+              {"cost": _number("Unit cost"), "markup_percent": _number("Markup percent")},
+              ["cost", "markup_percent"]),
+    _function("discount", "Price after a percent discount.",
+              {"original_price": _number("Original price"), "discount_percent": _number("Discount percent")},
+              ["original_price", "discount_percent"]),
+    _function("tax", "Tax owed and total for an amount.",
+              {"amount": _number("Amount before tax"), "tax_rate": _number("Tax rate percent")},
+              ["amount", "tax_rate"]),
+    _function("tip", "Tip and total for a bill.",
+              {"bill_amount": _number("Bill amount"), "tip_percent": _number("Tip percent")},
+              ["bill_amount", "tip_percent"]),
+    _function("inventory_days", "Days current stock lasts at a daily usage rate.",
+              {"current_stock": _number("Units or gallons on hand"), "daily_usage": _number("Units used per day")},
+              ["current_stock", "daily_usage"]),
+    _function("roi", "Return on investment percent.",
+              {"investment": _number("Amount invested"), "returns": _number("Amount returned")},
+              ["investment", "returns"]),
+    _function("what_if", "Revenue, costs, profit and margins from the Profit Calculator, before and after "
+                         "percent changes to cost categories or revenue (e.g. cups cost 10% more).",
+              {"cost_changes": {"type": "object", "description": "Percent change per cost category: "
+                                + ", ".join(ledger.EXPENSE_CATEGORIES),
+                                "additionalProperties": {"type": "number"}},
+               "revenue_change_percent": _number("Percent change in revenue")}),
+    _function("revenue_by_flavor", "Revenue and slushies sold per flavor, optionally within a date range.",
+              {"start_date": _date("First day included"), "end_date": _date("Last day included")}),
+    _function("sales_over_time", "Revenue and slushies sold per day, week or month within a date range.",
+              {"period": {"type": "string", "enum": ["day", "week", "month"]},
+               "start_date": _date("First day included"), "end_date": _date("Last day included")},
+              ["period"]),
+    _function("expenses_by_category", "Expense totals per category, optionally within a date range.",
+              {"start_date": _date("First day included"), "end_date": _date("Last day included")}),
+    _function("profit_and_loss", "P&L statements (revenue, COGS, expenses, profit, margins) per period.",
+              {"period": {"type": "string", "enum": ["day", "week", "month", "season"]},
+               "start_date": _date("First day included"), "end_date": _date("Last day included")},
+              ["period"]),
+]
+
+
+def _between(frame, start_date=None, end_date=None, column="Date"):
+    mask = pd.Series(True, index=frame.index)
+    for bound, op in ((start_date, "ge"), (end_date, "le")):
+        if bound:
+            stamp = pd.to_datetime(bound, errors="coerce")
+            if pd.isna(stamp):
+                raise ValueError(f"Invalid date: {bound}")
+            mask &= getattr(frame[column].dt.normalize(), op)(stamp.normalize())
+    return frame[mask]
+
+
+def revenue_by_flavor(context, start_date=None, end_date=None):
+    sales = _between(context["sales"], start_date, end_date)
+    totals = sales.groupby("Flavor")[["Revenue", "Quantity"]].sum().sort_values("Revenue", ascending=False)
+    return {
+        "flavors": [
+            {"flavor": flavor, "revenue": row["Revenue"], "slushies": row["Quantity"]}
+            for flavor, row in totals.iterrows()
+        ],
+        "total_revenue": totals["Revenue"].sum(),
+        "total_slushies": totals["Quantity"].sum(),
+    }
+
+
+def sales_over_time(context, period="day", start_date=None, end_date=None):
+    sales = _between(context["sales"], start_date, end_date)
+    freq = {"day": "D", "week": "W-SUN", "month": "M"}[period]
+    totals = sales.groupby(sales["Date"].dt.to_period(freq))[["Revenue", "Quantity"]].sum()
+    return {
+        "periods": [
+            {"period": str(label), "revenue": row["Revenue"], "slushies": row["Quantity"]}
+            for label, row in totals.iterrows()
+        ],
+        "total_revenue": totals["Revenue"].sum(),
+    }
+
+
+def expenses_by_category(context, start_date=None, end_date=None):
+    expenses = _between(context["expenses"], start_date, end_date)
+    totals = expenses.groupby("Category")["Amount"].sum()
+    return {
+        "categories": {ledger.CATEGORY_LABELS.get(c, c): amount for c, amount in totals.items()},
+        "total": totals.sum(),
+    }
+
+
+def profit_and_loss(context, period="month", start_date=None, end_date=None):
+    table = context["pnl_engine"].statements(context["sales"], context["expenses"], period)
+    if start_date or end_date:
+        ends = pd.Series(table.index.map(lambda p: p.end_time), index=table.index)
+        starts = pd.Series(table.index.map(lambda p: p.start_time), index=table.index)
+        keep = pd.Series(True, index=table.index)
+        if start_date:
+            keep &= ends >= pd.Timestamp(start_date)
+        if end_date:
+            keep &= starts <= pd.Timestamp(end_date)
+        table = table[keep]
+    columns = ["total_revenue", "total_cogs", "total_expenses", "gross_profit", "net_profit",
+               "gross_margin", "net_margin", "top_flavor"]
+    return {"statements": [{"period": str(p), **row[columns].to_dict()} for p, row in table.iterrows()]}
+
+
+def _what_if(context, cost_changes=None, revenue_change_percent=0.0):
+    return calculators.what_if(context["profit_data"], cost_changes, revenue_change_percent)
+
+
+_HANDLERS = {
+    "profit_margin": lambda context, **args: calculators.profit_margin(**args),
+    "break_even": lambda context, **args: calculators.break_even(**args),
+    "markup": lambda context, **args: calculators.markup(**args),
+    "discount": lambda context, **args: calculators.discount(**args),
+    "tax": lambda context, **args: calculators.tax(**args),
+    "tip": lambda context, **args: calculators.tip(**args),
+    "inventory_days": lambda context, **args: calculators.inventory_days(**args),
+    "roi": lambda context, **args: calculators.roi(**args),
+    "what_if": _what_if,
+    "revenue_by_flavor": revenue_by_flavor,
+    "sales_over_time": sales_over_time,
+    "expenses_by_category": expenses_by_category,
+    "profit_and_loss": profit_and_loss,
+}
+
+
+def _plain(value):
+    """JSON-safe copy: numpy scalars to Python, money rounded, infinity spelled out"""
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float):
+        return "unlimited" if math.isinf(value) else round(value, 2)
+    return value
+
+
+def run_tool(name, arguments, context):
+    """Run tool ``name`` with JSON ``arguments``; returns a JSON string (an error object on failure)"""
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return json.dumps({"error": f"Unknown tool: {name}"})
+    try:
+        args = json.loads(arguments or "{}")
+        return json.dumps(_plain(handler(context, **args)))
+    except (TypeError, ValueError, KeyError) as e:
+        return json.dumps({"error": str(e)})
+
+
+def stream_with_tools(gateway, task, messages, context, used=None, max_rounds=MAX_TOOL_ROUNDS, page=None, action=None):
+    """Stream a chat answer through ``gateway`` (:class:`cfo.llm.LLMGateway`), running tool calls locally between rounds.
+
+    Yields text chunks (for ``st.write_stream``). Each tool call made is
+    appended to ``used`` as ``(name, arguments, result)``. After
+    ``max_rounds`` rounds of tool calls the model must answer in text.
+    ``page`` and ``action`` tag every round in the usage log.
+    """
+    messages = list(messages)
+    for round_number in range(max_rounds + 1):
+        offer_tools = round_number < max_rounds
+        stream, _ = gateway.create(
+            task,
+            messages,
+            stream=True,
+            page=page,
+            action=action,
+            **({"tools": TOOLS} if offer_tools else {}),
+        )
+        text, calls = [], {}
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                text.append(delta.content)
+                yield delta.content
+            for call in delta.tool_calls or []:
+                # Tool calls arrive in fragments keyed by index
+                entry = calls.setdefault(call.index, {"id": "", "name": "", "arguments": ""})
+                entry["id"] = call.id or entry["id"]
+                if call.function is not None:
+                    entry["name"] += call.function.name or ""
+                    entry["arguments"] += call.function.arguments or ""
+        if not calls:
+            return
+        messages.append({
+            "role": "assistant",
+            "content": "".join(text) or None,
+            "tool_calls": [
+                {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                for _, c in sorted(calls.items())
+            ],
+        })
+        for _, call in sorted(calls.items()):
+            result = run_tool(call["name"], call["arguments"], context)
+            if used is not None:
+                used.append((call["name"], call["arguments"], result))
+            messages.append({"role": "tool", "tool_call_id": call["id"], "content": result})
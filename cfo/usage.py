@@ -0,0 +1,170 @@
+"""Token, latency and cost accounting for AI requests, with daily budgets.
+
+The LLM gateway (:mod:`cfo.llm`) records every request it makes as one
+CSV row in ``DATA_DIR/usage/YYYY-MM.csv``. Each row holds the time, the
+page and button that asked, the task and model, the prompt and
+completion tokens, the latency, the cost and the outcome. Before each
+request the gateway calls :meth:`UsageLedger.check`, which raises
+:class:`BudgetExceeded` once today's spend reaches the daily budget or
+the page's own budget. The pages then fall back to cached or locally
+computed answers.
+
+Today's spend is kept in memory: the log is scanned once per day, then
+updated as requests are recorded.
+"""
+
+import csv
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from cfo import DATA_DIR
+
+# Dollars per million tokens: (prompt, completion)
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+COLUMNS = ["at", "page", "action", "task", "model", "prompt_tokens", "completion_tokens", "latency_ms", "cost", "status"]
+
+# Row outcomes
+OK, ERROR, CACHED, LOCAL = "ok", "error", "cached", "local"
+
+
+class BudgetExceeded(Exception):
+    """Today's AI spend has reached the daily or page budget"""
+
+
+def cost(model, prompt_tokens, completion_tokens):
+    """Dollar cost of a request; dated snapshots (gpt-4o-mini-2024-07-18) use their base model's price"""
+    base = max((name for name in PRICES if model == name or model.startswith(name + "-")), key=len, default=None)
+    if base is None:
+        return 0.0
+    prompt_rate, completion_rate = PRICES[base]
+    return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1_000_000
+
+
+def directory(data_dir=None):
+    return os.path.join(data_dir or DATA_DIR, "usage")
+
+
+class UsageLedger:
+    """Append-only request log plus today's spend per page, checked against budgets"""
+
+    def __init__(self, data_dir=None, daily_budget=None, page_budgets=None, clock=datetime.now):
+        self.directory = directory(data_dir)
+        self.clock = clock
+        self._budgets_path = os.path.join(self.directory, "budgets.json")
+        saved = self._load_budgets()
+        self.daily_budget = saved.get("daily", daily_budget)
+        self.page_budgets = saved.get("pages", dict(page_budgets or {}))
+        self._day = None
+        self._spent = {}
+        self._lock = threading.Lock()
+
+    def _load_budgets(self):
+        if not os.path.exists(self._budgets_path):
+            return {}
+        with open(self._budgets_path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def set_budgets(self, daily_budget, page_budgets):
+        """Change the budgets (``None`` means unlimited) and keep them for the next start"""
+        with self._lock:
+            self.daily_budget = daily_budget
+            self.page_budgets = {page: limit for page, limit in page_budgets.items() if limit is not None}
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._budgets_path + ".tmp", "w", encoding="utf-8") as handle:
+                json.dump({"daily": self.daily_budget, "pages": self.page_budgets}, handle)
+            os.replace(self._budgets_path + ".tmp", self._budgets_path)
+
+    def _month_path(self, when):
+        return os.path.join(self.directory, f"{when:%Y-%m}.csv")
+
+    def _today(self):
+        """Today's spend per page, rescanning the log when the day changes"""
+        today = self.clock().date()
+        if self._day != today:
+            spent = {}
+            month_path = self._month_path(today)
+            if os.path.exists(month_path):
+                prefix = today.isoformat()
+                with open(month_path, newline="", encoding="utf-8") as handle:
+                    for row in csv.DictReader(handle):
+                        if row["at"].startswith(prefix):
+                            spent[row["page"]] = spent.get(row["page"], 0.0) + float(row["cost"] or 0)
+            self._day, self._spent = today, spent
+        return self._spent
+
+    def spent_today(self, page=None):
+        with self._lock:
+            spent = self._today()
+            return spent.get(page, 0.0) if page is not None else sum(spent.values())
+
+    def check(self, page):
+        """Raise :class:`BudgetExceeded` if ``page`` may not spend any more today"""
+        with self._lock:
+            spent = self._today()
+            if self.daily_budget is not None and sum(spent.values()) >= self.daily_budget:
+                raise BudgetExceeded(f"Today's AI budget (${self.daily_budget:,.2f}) is used up")
+            limit = self.page_budgets.get(page)
+            if limit is not None and spent.get(page, 0.0) >= limit:
+                raise BudgetExceeded(f"Today's AI budget for {page} (${limit:,.2f}) is used up")
+
+    def record(self, page, action, task, model, prompt_tokens=0, completion_tokens=0, latency_ms=0, status=OK):
+        """Append one request to the log; returns its cost"""
+        when = self.clock()
+        amount = cost(model, prompt_tokens, completion_tokens) if status == OK else 0.0
+        row = [
+            when.isoformat(timespec="seconds"), page or "", action or "", task, model or "",
+            int(prompt_tokens), int(completion_tokens), int(latency_ms), f"{amount:.6f}", status,
+        ]
+        with self._lock:
+            spent = self._today()
+            month_path = self._month_path(when)
+            os.makedirs(self.directory, exist_ok=True)
+            new_file = not os.path.exists(month_path)
+            with open(month_path, "a", newline="", encoding="utf-8") as handle:
+                writer = csv.writer(handle)
+                if new_file:
+                    writer.writerow(COLUMNS)
+                writer.writerow(row)
+            if when.date() == self._day:
+                spent[row[1]] = spent.get(row[1], 0.0) + amount
+        return amount
+
+    def frame(self, months=None):
+        """The log as a DataFrame, for the last ``months`` monthly files (all of them by default)"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".csv")) if os.path.isdir(self.directory) else []
+        if months:
+            names = names[-months:]
+        if not names:
+            return pd.DataFrame(columns=COLUMNS)
+        frame = pd.concat(
+            [pd.read_csv(os.path.join(self.directory, name), keep_default_na=False) for name in names],
+            ignore_index=True,
+        )
+        frame["at"] = pd.to_datetime(frame["at"])
+        return frame
+
+
+def summary(frame, by):
+    """Requests, tokens, cost and latency grouped by ``by`` (a column name or list of them)"""
+    if frame.empty:
+        return pd.DataFrame(columns=["Requests", "Prompt Tokens", "Completion Tokens", "Cost ($)", "Avg Latency (s)"])
+    # Cached and local answers never reached the API, so they don't count toward latency
+    latency = frame["latency_ms"].where(frame["status"].isin([OK, ERROR])) / 1000
+    grouped = frame.assign(latency=latency).groupby(by)
+    table = pd.DataFrame({
+        "Requests": grouped.size(),
+        "Prompt Tokens": grouped["prompt_tokens"].sum(),
+        "Completion Tokens": grouped["completion_tokens"].sum(),
+        "Cost ($)": grouped["cost"].sum().round(4),
+        "Avg Latency (s)": grouped["latency"].mean().round(2),
+    })
+    return table.sort_values("Cost ($)", ascending=False)
@@ -0,0 +1,101 @@
+"""Venmo payment ingestion.
+
+Payments are keyed by transaction ID and filed into day partitions, with
+a hash index from ID to day for O(1) membership checks. Syncing the same
+payments again adds nothing, daily totals come from the day's partition
+(so they roll over at midnight), and profit updates only apply payments
+that haven't been applied before. Payments synced without an ID are
+keyed by a hash of their contents, numbered by their order within a
+sync so identical payments stay apart.
+"""
+
+import hashlib
+from datetime import date
+
+UNDATED = "undated"
+
+
+def transaction_id(transaction, occurrence=1):
+    """The payment's own ID, or a content hash for payments synced without one.
+
+    Identical payments in one sync (two $4 cherries in the same minute)
+    hash alike, so the ``occurrence``-th of them gets a numbered ID.
+    """
+    if transaction.get("id"):
+        return str(transaction["id"])
+    raw = "|".join(str(transaction.get(field, "")) for field in ("date", "time", "amount", "note"))
+    txn_id = "h-" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return txn_id if occurrence == 1 else f"{txn_id}-{occurrence}"
+
+
+def _as_date(value):
+    """ISO strings become dates, matching records restored by ``store.load``"""
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            pass
+    return value
+
+
+def _day(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10] if value else UNDATED
+
+
+class VenmoLedger:
+    """Day-partitioned, ID-indexed Venmo payments.
+
+    ``transactions`` is the flat list in the order payments were first
+    seen (what charts and reports read); ``partitions`` maps ISO day to
+    ``{id: payment}`` and ``index`` maps ID to day.
+    """
+
+    def __init__(self, transactions=()):
+        self.transactions = []
+        self.partitions = {}
+        self.index = {}
+        self.ingest(transactions)
+
+    def __contains__(self, txn_id):
+        return txn_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def ingest(self, transactions):
+        """Add payments not seen before; returns the ones that were new"""
+        added = []
+        # Repeats of a content hash within this batch are separate payments
+        occurrences = {}
+        for transaction in transactions:
+            txn_id = transaction_id(transaction)
+            if not transaction.get("id"):
+                occurrences[txn_id] = occurrences.get(txn_id, 0) + 1
+                txn_id = transaction_id(transaction, occurrences[txn_id])
+            if txn_id in self.index:
+                continue
+            record = {**transaction, "id": txn_id}
+            if "date" in record:
+                record["date"] = _as_date(record["date"])
+            day = _day(record.get("date"))
+            self.partitions.setdefault(day, {})[txn_id] = record
+            self.index[txn_id] = day
+            self.transactions.append(record)
+            added.append(record)
+        return added
+
+    def day(self, day=None):
+        """Payments on ``day`` (a date or ISO string; today by default)"""
+        return list(self.partitions.get(_day(day or date.today()), {}).values())
+
+    def daily_total(self, day=None):
+        return round(sum(t["amount"] for t in self.day(day)), 2)
+
+    def days(self):
+        return sorted(d for d in self.partitions if d != UNDATED)
+
+    def unapplied(self, applied_ids):
+        """Payments whose IDs are not in ``applied_ids`` (a set)"""
+        return [t for t in self.transactions if t["id"] not in applied_ids]
@@ -0,0 +1,235 @@
+"""Weather providers, TTL caching and per-location daily history.
+
+Daily history is kept as one DataFrame per location (``Date`` plus one
+column per measure) and persisted under ``DATA_DIR/weather`` so it can be
+joined to the sales ledger by date without refetching.
+"""
+
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import requests
+
+from cfo import DATA_DIR
+
+HISTORY_COLUMNS = ["Date", "temp_max", "temp_min", "precipitation", "humidity", "wind_speed", "description"]
+
+# WMO weather codes used by Open-Meteo, collapsed to short descriptions
+WMO_DESCRIPTIONS = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Fog", 48: "Fog", 51: "Drizzle", 53: "Drizzle", 55: "Drizzle",
+    61: "Rain", 63: "Rain", 65: "Heavy rain", 71: "Snow", 73: "Snow", 75: "Heavy snow",
+    80: "Showers", 81: "Showers", 82: "Heavy showers", 95: "Thunderstorm",
+}
+
+
+class WeatherProvider:
+    """Interface every weather source implements"""
+
+    def current(self, location):
+        """Return ``{"temperature", "humidity", "wind_speed", "description"}``"""
+        raise NotImplementedError
+
+    def history(self, location, start, end):
+        """Return daily rows between ``start`` and ``end`` as a DataFrame"""
+        raise NotImplementedError
+
+
+class FileWeatherProvider(WeatherProvider):
+    """Offline stand-in that serves weather from a local CSV.
+
+    The file has a ``location`` column plus :data:`HISTORY_COLUMNS`. The
+    latest row for a location doubles as its current conditions.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._frame = None
+
+    def _rows(self, location):
+        if self._frame is None:
+            frame = pd.read_csv(self.path, parse_dates=["Date"])
+            frame["location"] = frame["location"].str.lower()
+            self._frame = frame
+        rows = self._frame[self._frame["location"] == location.lower()]
+        if rows.empty:
+            raise KeyError(f"No weather on file for {location}")
+        return rows
+
+    def current(self, location):
+        latest = self._rows(location).sort_values("Date").iloc[-1]
+        return {
+            "temperature": round((float(latest["temp_max"]) + float(latest["temp_min"])) / 2, 1),
+            "humidity": float(latest["humidity"]),
+            "wind_speed": float(latest["wind_speed"]),
+            "description": latest["description"],
+        }
+
+    def history(self, location, start, end):
+        rows = self._rows(location)
+        mask = rows["Date"].between(pd.Timestamp(start), pd.Timestamp(end))
+        return rows.loc[mask, HISTORY_COLUMNS].reset_index(drop=True)
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Live provider backed by Open-Meteo, which needs no API key.
+
+    A history request covers the whole date range in a single call.
+    """
+
+    GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+    FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+    ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._coordinates = {}
+
+    def _locate(self, location):
+        if location not in self._coordinates:
+            response = self.session.get(
+                self.GEOCODE_URL, params={"name": location, "count": 1}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json().get("results")
+            if not results:
+                raise KeyError(f"Unknown location: {location}")
+            self._coordinates[location] = (results[0]["latitude"], results[0]["longitude"])
+        return self._coordinates[location]
+
+    def current(self, location):
+        latitude, longitude = self._locate(location)
+        response = self.session.get(
+            self.FORECAST_URL,
+            params={
+                "latitude": latitude,
+                "longitude": longitude,
+                "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        current = response.json()["current"]
+        return {
+            "temperature": current["temperature_2m"],
+            "humidity": current["relative_humidity_2m"],
+            "wind_speed": current["wind_speed_10m"],
+            "description": WMO_DESCRIPTIONS.get(current["weather_code"], "Unknown"),
+        }
+
+    def history(self, location, start, end):
+        latitude, longitude = self._locate(location)
+        response = self.session.get(
+            self.ARCHIVE_URL,
+            params={
+                "latitude": latitude,
+                "longitude": longitude,
+                "start_date": pd.Timestamp(start).strftime("%Y-%m-%d"),
+                "end_date": pd.Timestamp(end).strftime("%Y-%m-%d"),
+                "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,"
+                         "relative_humidity_2m_mean,wind_speed_10m_max,weather_code",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        daily = response.json()["daily"]
+        return pd.DataFrame({
+            "Date": pd.to_datetime(daily["time"]),
+            "temp_max": daily["temperature_2m_max"],
+            "temp_min": daily["temperature_2m_min"],
+            "precipitation": daily["precipitation_sum"],
+            "humidity": daily["relative_humidity_2m_mean"],
+            "wind_speed": daily["wind_speed_10m_max"],
+            "description": [WMO_DESCRIPTIONS.get(code, "Unknown") for code in daily["weather_code"]],
+        })
+
+
+class WeatherService:
+    """Caches a provider's answers.
+
+    Current conditions are cached for ``ttl`` seconds per location. Daily
+    history is fetched once per missing date range, then served from the
+    on-disk store. Safe to share between sessions.
+    """
+
+    def __init__(self, provider, ttl=600, store_dir=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.store_dir = store_dir or os.path.join(DATA_DIR, "weather")
+        self._current = {}
+        self._history = {}
+        self._attempted = {}
+        self._lock = threading.Lock()
+
+    def current(self, location):
+        key = location.strip().lower()
+        with self._lock:
+            cached = self._current.get(key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        value = self.provider.current(location)
+        with self._lock:
+            self._current[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def backfill(self, location, start, end):
+        """Make sure history covers ``start``..``end``, fetching gaps in one call.
+
+        Days the provider had nothing for are remembered, so asking again
+        does not refetch them.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        key = location.strip().lower()
+        with self._lock:
+            stored = self._load(location)
+            attempted = self._attempted.setdefault(key, set())
+            have = set(stored["Date"]) | attempted
+            wanted = pd.date_range(start, end, freq="D")
+            missing = [d for d in wanted if d not in have]
+            if not missing:
+                return stored
+            fetched = self.provider.history(location, missing[0], missing[-1])
+            attempted.update(missing)
+            merged = (
+                pd.concat([stored, fetched[HISTORY_COLUMNS]], ignore_index=True)
+                .drop_duplicates("Date", keep="last")
+                .sort_values("Date", ignore_index=True)
+            )
+            self._history[key] = merged
+            os.makedirs(self.store_dir, exist_ok=True)
+            merged.to_csv(self._path(location), index=False)
+            return merged
+
+    def history(self, location, start=None, end=None):
+        """Return stored daily history without touching the provider"""
+        with self._lock:
+            stored = self._load(location)
+        if start is not None:
+            stored = stored[stored["Date"] >= pd.Timestamp(start)]
+        if end is not None:
+            stored = stored[stored["Date"] <= pd.Timestamp(end)]
+        return stored.reset_index(drop=True)
+
+    def _path(self, location):
+        slug = re.sub(r"[^a-z0-9]+", "-", location.strip().lower()).strip("-")
+        return os.path.join(self.store_dir, f"{slug}.csv")
+
+    def _load(self, location):
+        key = location.strip().lower()
+        if key not in self._history:
+            path = self._path(location)
+            if os.path.exists(path):
+                self._history[key] = pd.read_csv(path, parse_dates=["Date"])
+            else:
+                self._history[key] = pd.DataFrame(columns=HISTORY_COLUMNS).astype({"Date": "datetime64[ns]"})
+        return self._history[key]
+
+
+def join_sales(sales, weather):
+    """Attach daily weather columns to a sales frame by calendar date"""
+    sales = sales.assign(Date=pd.to_datetime(sales["Date"]).dt.normalize())
+    return sales.merge(weather, on="Date", how="left")
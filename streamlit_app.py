@@ -2,14 +2,18 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from openai import OpenAI
 import json
 from datetime import datetime, timedelta
 import numpy as np
 import requests
-from PIL import Image
 import io
 import base64
+import uuid
+from pathlib import Path
+from concurrent.futures.process import BrokenProcessPool
+
+from cfo import archive, calculators, charts, chatlog, deals, events, export, facts, forecast, fx, history, images, ledger, live, llm, marketing, notes, pricing, reconcile, report, search, staffing, store, tools, venmo, weather
+from cfo import usage as usage_log
 
 # Page configuration
 st.set_page_config(
@@ -138,6 +142,10 @@ if st.sidebar.button("Chat Assistant", use_container_width=True):
     st.session_state.current_page = "Chat Assistant"
     st.rerun()
 
+if st.sidebar.button("AI Usage", use_container_width=True):
+    st.session_state.current_page = "AI Usage"
+    st.rerun()
+
 # Initialize current page if not set
 if "current_page" not in st.session_state:
     st.session_state.current_page = "Dashboard"
@@ -145,21 +153,95 @@ if "current_page" not in st.session_state:
 # Get current page
 page = st.session_state.current_page
 
-# Initialize OpenAI client
+# OpenAI API key (all model calls go through the LLM gateway below)
 openai_api_key = st.secrets.get("OPENAI_API_KEY")
 if not openai_api_key:
     st.error("Please add your OpenAI API key to continue.")
     st.stop()
 
-client = OpenAI(api_key=openai_api_key)
+# Shared services (one instance per server process, reused by every session)
+@st.cache_resource
+def get_llm(api_key, base_url=None):
+    """Gateway for every chat completion: one pooled client, timeouts, breakers, model routing"""
+    models = {
+        tier: st.secrets[f"LLM_{tier.upper()}_MODEL"]
+        for tier in llm.MODELS
+        if st.secrets.get(f"LLM_{tier.upper()}_MODEL")
+    }
+    # Budgets set on the AI Usage page take precedence over these
+    usage_ledger = usage_log.UsageLedger(
+        daily_budget=st.secrets.get("LLM_DAILY_BUDGET"),
+        page_budgets=dict(st.secrets.get("LLM_PAGE_BUDGETS", {})),
+    )
+    return llm.LLMGateway(api_key, base_url=base_url, models=models, usage=usage_ledger)
+
+gateway = get_llm(openai_api_key, st.secrets.get("OPENAI_BASE_URL"))
+
+@st.cache_resource
+def get_weather_service():
+    """Weather provider wrapped in a TTL cache and history store"""
+    if st.secrets.get("WEATHER_PROVIDER", "file") == "open-meteo":
+        provider = weather.OpenMeteoProvider()
+    else:
+        provider = weather.FileWeatherProvider(st.secrets.get("WEATHER_FILE", "sample_data/weather.csv"))
+    return weather.WeatherService(provider, ttl=600)
+
+@st.cache_resource
+def get_image_queue():
+    """Background image jobs with an on-disk prompt-hash cache"""
+    if st.secrets.get("IMAGE_PROVIDER", "placeholder") == "openai":
+        generator = images.OpenAIImageGenerator(gateway.client)
+    else:
+        generator = images.PlaceholderGenerator()
+    return images.ImageJobQueue(generator)
+
+@st.cache_resource
+def get_worker_pool():
+    """Render processes shared by marketing assets and chart exports; workers keep their font and layout caches"""
+    return marketing.worker_pool()
+
+@st.cache_resource(max_entries=256)
+def get_chat_log(name):
+    """Append-only chat history on disk, one log per conversation"""
+    return chatlog.ChatLog(name=name)
+
+@st.cache_resource
+def get_archive():
+    """Closed sales and Venmo months, memory-mapped once per process (None without pyarrow)"""
+    return archive.Archive() if archive.available() else None
+
+def get_fx_rates():
+    """Dated FX rate table, reloaded only when the rate file changes"""
+    return fx.load_rates(st.secrets.get("FX_RATES_FILE", "sample_data/fx_rates.csv"))
 
 # Initialize session state
+# Chat messages drawn per rerun; "Load earlier" adds another page from the chat log
+CHAT_WINDOW = 30
 if "messages" not in st.session_state:
+    # The conversation's log is named in the URL, so a reload picks its history back up
+    chat_id = st.query_params.get("chat")
+    if not chatlog.valid_name(chat_id):
+        chat_id = uuid.uuid4().hex[:16]
+        st.query_params["chat"] = chat_id
+    st.session_state.chat_log_id = chat_id
     st.session_state.messages = []
+    st.session_state.chat_log_cursor = 0  # messages already appended to the chat log
+    # Log rows written before this session; its own messages follow them
+    st.session_state.chat_log_start = len(get_chat_log(chat_id))
+    st.session_state.chat_window = CHAT_WINDOW
+if "archive_closed" not in st.session_state:
+    # Closed months move from the store to the shared archive; sessions hold only the open month
+    if get_archive() is not None:
+        for name in (archive.SALES, archive.VENMO):
+            try:
+                get_archive().close_store(name)
+            except Exception as e:
+                st.error(f"Unable to archive closed months of {name}: {str(e)}")
+    st.session_state.archive_closed = True
 if "sales_data" not in st.session_state:
-    st.session_state.sales_data = []
+    st.session_state.sales_data = store.load("sales_data", [])
 if "inventory_data" not in st.session_state:
-    st.session_state.inventory_data = {
+    st.session_state.inventory_data = store.load("inventory_data") or {
         "Blue Raspberry": 0,
         "Cherry": 0,
         "Lime": 0,
@@ -180,8 +262,155 @@ if "commands_data" not in st.session_state:
         "net_profits": 0.0,
         "total_sales": 0,
         "best_day": "None",
-        "notes": []
+        "notes": [],
+        # Venmo payments already added to net profits; kept with them so a reset clears both
+        "applied_ids": []
     }
+if "image_jobs" not in st.session_state:
+    st.session_state.image_jobs = []
+if "expense_data" not in st.session_state:
+    st.session_state.expense_data = store.load("expense_data", [])
+if "pnl_engine" not in st.session_state:
+    st.session_state.pnl_engine = ledger.PnLEngine()
+if "change_bus" not in st.session_state:
+    # Mutations emit change events; derived views drop only what a change affects
+    st.session_state.change_bus = events.EventBus()
+    st.session_state.unsaved = set()
+    st.session_state.ai_summaries = {}
+    # Sales rows carry an ID so the archive can tell identical sales apart
+    if ledger.assign_ids(st.session_state.sales_data):
+        st.session_state.unsaved.add(events.SALES)
+    st.session_state.change_bus.subscribe(events.SALES, lambda event: ledger.assign_ids(st.session_state.sales_data))
+
+    def refresh_statements(event):
+        """Drop cached P&L periods holding the changed rows"""
+        if event.action == "replace" or not event.dates:
+            st.session_state.pnl_engine.reset()
+        else:
+            st.session_state.pnl_engine.invalidate(*event.dates)
+
+    st.session_state.change_bus.subscribe([events.SALES, events.EXPENSES], refresh_statements)
+    st.session_state.change_bus.subscribe("*", lambda event: st.session_state.unsaved.add(event.dataset))
+    st.session_state.change_bus.subscribe("*", events.drop_on_change(st.session_state.ai_summaries, {
+        "sales_patterns": [events.SALES],
+        "financial_insights": [events.PROFIT],
+        "inventory_recommendations": [events.INVENTORY, events.SALES, events.VENMO],
+    }))
+
+@st.cache_resource(max_entries=4)
+def get_archived_rows(dataset, modified):
+    """Closed months of ``dataset`` over the memory map, one frame per file version for every session"""
+    return get_archive().frame(dataset)
+
+if "open_rows" not in st.session_state:
+    st.session_state.open_rows = {}
+# Archive plus open rows, joined at most once per dataset per run and then dropped
+run_frames = {}
+
+def with_archive(dataset, open_rows):
+    """Archived rows plus this session's ``open_rows()``.
+
+    The session keeps only its rows the archive doesn't hold, and
+    works them out again only after either side changes.
+    """
+    modified = get_archive().modified(dataset)
+    archived = get_archived_rows(dataset, modified)
+    key = (modified, st.session_state.change_bus.version(dataset))
+    cached = st.session_state.open_rows.get(dataset)
+    if cached is None or cached[0] != key:
+        cached = (key, get_archive().open_rows(dataset, open_rows(), archived))
+        st.session_state.open_rows[dataset] = cached
+    if run_frames.get(dataset, (None,))[0] != key:
+        run_frames[dataset] = (key, archive.combine(archived, cached[1]))
+    # Callers may add columns; a shallow copy keeps that off the shared frame
+    return run_frames[dataset][1].copy(deep=False)
+
+def sales_ledger_frame():
+    """Typed sales frame over the archived months plus this session's rows"""
+    if get_archive() is None:
+        return ledger.sales_frame(st.session_state.sales_data)
+    # Open rows keep their IDs for matching against the archive; undated rows are left out
+    frame = with_archive(
+        archive.SALES,
+        lambda: archive.normalize(archive.SALES, st.session_state.sales_data).dropna(subset=["Date"])
+    )
+    return frame[["Date", "Flavor", "Quantity", "Revenue"]]
+
+def venmo_history():
+    """Archived Venmo payments plus this session's, as a frame"""
+    if get_archive() is None:
+        return pd.DataFrame(st.session_state.venmo_data["transactions"])
+    return with_archive(archive.VENMO, lambda: st.session_state.venmo_data["transactions"])
+
+def emit_change(dataset, action, source, dates=(), keys=()):
+    """Publish a change event on this session's bus"""
+    return st.session_state.change_bus.emit(dataset, action, source, dates, keys)
+
+if "sales_history" not in st.session_state:
+    # Every sales change is logged (only the rows it touched) for undo, redo and as-of views
+    st.session_state.sales_history = history.ChangeLog(st.session_state.sales_data)
+    st.session_state.change_bus.subscribe(
+        events.SALES,
+        lambda event: st.session_state.sales_history.commit(st.session_state.sales_data, event.source)
+    )
+
+if "price_model" not in st.session_state:
+    # Elasticities are refit after sales changes, re-aggregating only the changed days
+    st.session_state.price_model = pricing.PriceModel()
+
+    def refresh_prices(event):
+        if event.action == "replace" or not event.dates:
+            st.session_state.price_model.reset()
+        else:
+            st.session_state.price_model.invalidate(*event.dates)
+
+    st.session_state.change_bus.subscribe(events.SALES, refresh_prices)
+
+def apply_sales_history(change):
+    """Bring the sales ledger in line with the change log after an undo or redo"""
+    st.session_state.sales_data = st.session_state.sales_history.records()
+    dates = sorted({row.get("Date") for row in history.changed_rows(change)}, key=str)
+    emit_change(events.SALES, "update", change.source, dates)
+
+def sales_history_controls(key):
+    """Undo and redo buttons plus an as-of view of the sales ledger"""
+    sales_history = st.session_state.sales_history
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("↩️ Undo", key=f"{key}_undo", disabled=not sales_history.can_undo()):
+            apply_sales_history(sales_history.undo())
+            st.rerun()
+    with col2:
+        if st.button("↪️ Redo", key=f"{key}_redo", disabled=not sales_history.can_redo()):
+            apply_sales_history(sales_history.redo())
+            st.rerun()
+    with st.expander("🕰️ Sales Data History"):
+        timeline = sales_history.timeline()
+        if not timeline:
+            st.info("No changes to your sales data yet this session.")
+            return
+        st.dataframe(
+            pd.DataFrame(timeline, columns=["Time", "Change", "Rows Removed", "Rows Added"]).iloc[::-1],
+            hide_index=True,
+            use_container_width=True
+        )
+        # Position k is the data after the first k changes
+        moments = [datetime.min] + [entry[0] for entry in timeline]
+        position = st.select_slider(
+            "View data as of",
+            options=range(len(moments)),
+            value=len(moments) - 1,
+            format_func=lambda k: moments[k].strftime("%H:%M:%S") if k else "Session start",
+            key=f"{key}_as_of"
+        )
+        past_records = sales_history.as_of(moments[position])
+        st.dataframe(pd.DataFrame(past_records), use_container_width=True)
+        if position < len(moments) - 1 and st.button("Restore This Version", key=f"{key}_restore"):
+            st.session_state.sales_data = past_records
+            label = moments[position].strftime("%H:%M:%S") if position else "session start"
+            emit_change(events.SALES, "replace", f"Restore sales data as of {label}")
+            st.rerun()
+
 if "venmo_data" not in st.session_state:
     st.session_state.venmo_data = {
         "connected": False,
@@ -192,6 +421,17 @@ if "venmo_data" not in st.session_state:
         "daily_total": 0.0,
         "sync_interval": 5  # minutes
     }
+    st.session_state.venmo_data.update(store.load("venmo_data", {}))
+    # Older saves kept applied payment IDs here, without the net profits they went into
+    st.session_state.venmo_data.pop("applied_ids", None)
+if "venmo_ledger" not in st.session_state:
+    # Dedupe by transaction ID; the flat list is the ledger's own list
+    st.session_state.venmo_ledger = venmo.VenmoLedger(st.session_state.venmo_data["transactions"])
+    if len(st.session_state.venmo_ledger) < len(st.session_state.venmo_data["transactions"]):
+        emit_change(events.VENMO, "delete", "Venmo duplicate cleanup")
+    st.session_state.venmo_data["transactions"] = st.session_state.venmo_ledger.transactions
+# Today's total comes from today's partition, so it rolls over at midnight
+st.session_state.venmo_data["daily_total"] = st.session_state.venmo_ledger.daily_total()
 if "custom_charts" not in st.session_state:
     st.session_state.custom_charts = {
         "folders": {
@@ -203,7 +443,8 @@ if "custom_charts" not in st.session_state:
                         "x_column": "Date",
                         "y_column": "Revenue",
                         "title": "Daily Revenue Trend",
-                        "color": "blue"
+                        "color": "blue",
+                        "aggregation": charts.aggregation_spec("sum", "day")
                     },
                     "Revenue by Flavor": {
                         "type": "pie",
@@ -232,48 +473,88 @@ if "custom_charts" not in st.session_state:
         "active_tab": "All Charts"
     }
 
+# Full-text search over chat, notes and deals
+SEARCH_LABELS = {"message": "💬 Chat", "note": "📝 Note", "deal": "🏷️ Deal"}
+if "search_index" not in st.session_state:
+    st.session_state.search_index = search.SearchIndex()
+    
+    def reindex_edits(event):
+        """Appends are picked up by the next sync; edits and deletes rebuild the source"""
+        if event.action == "add":
+            return
+        if event.dataset == events.DEALS:
+            st.session_state.search_index.reset("deal")
+        elif "notes" in event.keys or event.action == "replace":
+            st.session_state.search_index.reset("note")
+    
+    st.session_state.change_bus.subscribe([events.DEALS, events.COMMANDS], reindex_edits)
+
+def search_index():
+    """The session's search index, with anything written since the last search added"""
+    index = st.session_state.search_index
+    # Earlier search results aren't searchable themselves
+    index.sync(
+        "message", st.session_state.messages,
+        lambda m: "" if m["content"].startswith("🔎") else m["content"]
+    )
+    index.sync("note", st.session_state.commands_data["notes"], str)
+    deals = [
+        (category, deal)
+        for category, items in st.session_state.get("deals", {}).items()
+        for deal in items
+    ]
+    index.sync(
+        "deal", deals,
+        lambda d: f"{d[1].get('item', '')} · {d[1].get('supplier', '')} · {d[0]}"
+    )
+    return index
+
+# Ledger facts retrieved into chat prompts; rebuilt per source after change events
+if "fact_index" not in st.session_state:
+    st.session_state.fact_index = facts.FactIndex()
+    st.session_state.change_bus.subscribe("*", st.session_state.fact_index.mark_changed)
+
+def fact_builders():
+    """Functions producing each fact source from the session's data"""
+    sales_df = sales_ledger_frame()
+    return {
+        "sales": lambda: facts.sales_facts(sales_df),
+        "pnl": lambda: facts.pnl_facts(st.session_state.pnl_engine.statements(
+            sales_df, ledger.expense_frame(st.session_state.expense_data, rates=get_fx_rates()), "month"
+        )),
+        "inventory": lambda: facts.inventory_facts(st.session_state.inventory_data, sales_df),
+        "deals": lambda: facts.deal_facts(st.session_state.get("deals", {})),
+        "notes": lambda: facts.note_facts(st.session_state.commands_data["notes"]),
+        "totals": lambda: facts.totals_facts(st.session_state.commands_data),
+        "venmo": lambda: facts.venmo_facts(st.session_state.venmo_data),
+    }
+
+st.sidebar.markdown("---")
+search_query = st.sidebar.text_input("🔎 Search chat, notes & deals", key="sidebar_search")
+if search_query:
+    hits = search_index().search(search_query, limit=8)
+    if not hits:
+        st.sidebar.caption("No matches.")
+    for hit in hits:
+        st.sidebar.markdown(f"**{SEARCH_LABELS[hit.kind]}**  \n{hit.text}")
+
 # Dashboard Page
 if page == "Dashboard":
     st.header("📊 Business Dashboard")
     
-    # Editable Dashboard Metrics
-    st.subheader("📝 Edit Your Metrics")
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-        st.session_state.dashboard_metrics["total_revenue"] = st.number_input(
-            "Total Revenue ($)", 
-            min_value=0.0, 
-            value=st.session_state.dashboard_metrics["total_revenue"],
-            step=0.01
-        )
-    with col2:
-        st.session_state.dashboard_metrics["gross_profit"] = st.number_input(
-            "Gross Profit ($)", 
-            min_value=0.0, 
-            value=st.session_state.dashboard_metrics["gross_profit"],
-            step=0.01
-        )
-    with col3:
-        st.session_state.dashboard_metrics["net_profit"] = st.number_input(
-            "Net Profit ($)", 
-            min_value=0.0, 
-            value=st.session_state.dashboard_metrics["net_profit"],
-            step=0.01
-        )
-    with col4:
-        st.session_state.dashboard_metrics["top_flavor"] = st.text_input(
-            "Top Flavor", 
-            value=st.session_state.dashboard_metrics["top_flavor"]
-        )
-    with col5:
-        st.session_state.dashboard_metrics["top_flavor_percentage"] = st.number_input(
-            "Top Flavor %", 
-            min_value=0.0, 
-            max_value=100.0,
-            value=st.session_state.dashboard_metrics["top_flavor_percentage"],
-            step=0.1
-        )
+    # Metrics are computed from the sales and expense ledgers
+    statement_period = st.selectbox(
+        "Statement Period",
+        ["Season", "Month", "Week", "Day"],
+        help="Period-to-date figures from your sales and expense ledgers"
+    )
+    sales_df = sales_ledger_frame()
+    expenses_df = ledger.expense_frame(st.session_state.expense_data, rates=get_fx_rates())
+    if not sales_df.empty or not expenses_df.empty:
+        statement = st.session_state.pnl_engine.current(sales_df, expenses_df, statement_period.lower())
+        st.session_state.dashboard_metrics = ledger.dashboard_metrics(statement)
+    else:
+        st.info("Add sales data below and expenses on the Profit Calculator page to fill in your metrics.")
     
     # Display Metrics
     st.subheader("📊 Current Metrics")
@@ -288,6 +569,31 @@ if page == "Dashboard":
     with col4:
         st.metric("Top Flavor", st.session_state.dashboard_metrics["top_flavor"], f"{st.session_state.dashboard_metrics['top_flavor_percentage']:.1f}% sales")
     
+    if not sales_df.empty or not expenses_df.empty:
+        with st.expander("📑 P&L Statements"):
+            statements = st.session_state.pnl_engine.statements(sales_df, expenses_df, statement_period.lower())
+            statements.index = statements.index.astype(str)
+            st.dataframe(statements, use_container_width=True)
+    
+    # Same pack the nightly job builds (python -m cfo.report)
+    with st.expander("📄 Daily CFO Pack"):
+        if st.button("Build Today's Pack"):
+            with st.spinner("Building report..."):
+                try:
+                    pack_path, _, rebuilt_sections = report.build_report()
+                    with open(pack_path, "rb") as pack_file:
+                        st.session_state.cfo_pack = pack_file.read()
+                    st.success(f"✅ Pack ready ({len(rebuilt_sections)} of {len(report.SECTIONS)} sections rebuilt)")
+                except Exception as e:
+                    st.error(f"Unable to build the CFO pack: {str(e)}")
+        if st.session_state.get("cfo_pack"):
+            st.download_button(
+                "⬇️ Download CFO Pack",
+                st.session_state.cfo_pack,
+                file_name=f"cfo_pack_{datetime.now().strftime('%Y-%m-%d')}.html",
+                mime="text/html"
+            )
+    
     # Editable Sales Data for Charts
     st.subheader("📈 Edit Sales Data for Charts")
     
@@ -310,8 +616,11 @@ if page == "Dashboard":
             "Revenue": new_revenue
         }
         st.session_state.sales_data.append(new_data)
+        emit_change(events.SALES, "add", "Add Sales Data Point", [new_date], [new_flavor])
         st.success("Data point added!")
     
+    sales_history_controls("dashboard_sales")
+    
     # Display and edit existing sales data
     if st.session_state.sales_data:
         st.subheader("📋 Current Sales Data")
@@ -326,12 +635,17 @@ if page == "Dashboard":
                 "Date": st.column_config.DateColumn("Date"),
                 "Flavor": st.column_config.SelectboxColumn("Flavor", options=["Blue Raspberry", "Cherry", "Lime", "Orange", "Strawberry", "Grape", "Other"]),
                 "Quantity": st.column_config.NumberColumn("Quantity", min_value=0),
-                "Revenue": st.column_config.NumberColumn("Revenue ($)", min_value=0.0, format="$%.2f")
+                "Revenue": st.column_config.NumberColumn("Revenue ($)", min_value=0.0, format="$%.2f"),
+                "id": None
             }
         )
         
         # Update session state with edited data
-        st.session_state.sales_data = edited_df.to_dict('records')
+        if not edited_df.equals(df):
+            edited_records = edited_df.to_dict('records')
+            dates = events.changed_dates(st.session_state.sales_data, edited_records)
+            st.session_state.sales_data = edited_records
+            emit_change(events.SALES, "update", "Dashboard data editor", dates)
         
         # Charts
         col1, col2 = st.columns(2)
@@ -340,7 +654,7 @@ if page == "Dashboard":
             st.write("**Daily Revenue Trend**")
             if not df.empty:
                 daily_sales = df.groupby('Date')['Revenue'].sum().reset_index()
-                fig = px.line(daily_sales, x='Date', y='Revenue', title="Revenue Over Time")
+                fig = charts.time_series(daily_sales, 'Date', 'Revenue', "Revenue Over Time")
                 st.plotly_chart(fig, use_container_width=True)
         
         with col2:
@@ -375,7 +689,7 @@ elif page == "Deal Finder":
     st.subheader("📝 Add/Edit Deals")
     
     # Add new deal
-    col1, col2, col3, col4, col5 = st.columns(5)
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
     with col1:
         new_item = st.text_input("Item Name")
     with col2:
@@ -386,6 +700,8 @@ elif page == "Deal Finder":
         new_supplier = st.text_input("Supplier")
     with col5:
         new_rating = st.number_input("Rating", min_value=0.0, max_value=5.0, value=4.0, step=0.1)
+    with col6:
+        new_currency = st.selectbox("Currency", fx.CURRENCIES)
     
     if st.button("Add Deal") and new_item and new_price:
         if "deals" not in st.session_state:
@@ -394,36 +710,89 @@ elif page == "Deal Finder":
             st.session_state.deals[deal_category] = []
         
         new_deal = {
+            "id": deals.new_id(),
             "item": new_item,
             "price": new_price,
             "original": new_original,
             "supplier": new_supplier,
-            "rating": new_rating
+            "rating": new_rating,
+            "currency": new_currency,
+            "added": datetime.now().date()
         }
         st.session_state.deals[deal_category].append(new_deal)
+        emit_change(events.DEALS, "add", "Add Deal", [new_deal["added"]], [deal_category])
         st.success("Deal added!")
     
     # Display deals
     if "deals" in st.session_state and deal_category in st.session_state.deals:
         st.subheader(f"Best Deals on {deal_category}")
+        deals.ensure_ids(st.session_state.deals)
         
-        for i, deal in enumerate(st.session_state.deals[deal_category]):
-            with st.container():
-                col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
-                with col1:
-                    st.write(f"**{deal['item']}**")
-                    st.write(f"Supplier: {deal['supplier']}")
-                with col2:
-                    st.write(f"**${deal['price']}**")
-                with col3:
-                    st.write(f"~~${deal['original']}~~")
-                with col4:
-                    st.write(f"⭐ {deal['rating']}")
-                with col5:
-                    if st.button(f"Delete", key=f"delete_{i}"):
-                        st.session_state.deals[deal_category].pop(i)
-                        st.rerun()
-                st.divider()
+        # Bulk actions apply to the deals selected in the table below, in one update
+        table_key = f"deal_table_{deal_category}_{st.session_state.get('deal_table_version', 0)}"
+        with st.form("deal_bulk_actions"):
+            col1, col2 = st.columns(2)
+            with col1:
+                target_category = st.selectbox(
+                    "Move to category",
+                    list(dict.fromkeys(deal_categories + list(st.session_state.deals)))
+                )
+            with col2:
+                target_rating = st.number_input("Set rating", min_value=0.0, max_value=5.0, value=4.0, step=0.1)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                delete_selected = st.form_submit_button("🗑️ Delete Selected")
+            with col2:
+                move_selected = st.form_submit_button("📂 Move Selected")
+            with col3:
+                rate_selected = st.form_submit_button("⭐ Rate Selected")
+        
+        if delete_selected or move_selected or rate_selected:
+            table_state = st.session_state.get(table_key)
+            shown_key, shown_ids = st.session_state.get("deal_table_ids", (None, []))
+            selected_rows = table_state["selection"]["rows"] if table_state and shown_key == table_key else []
+            selected_ids = [shown_ids[row] for row in selected_rows if row < len(shown_ids)]
+            if not selected_ids:
+                st.warning("Select one or more deals in the table first.")
+            else:
+                st.session_state.deals, touched_categories = deals.bulk_update(
+                    st.session_state.deals,
+                    selected_ids,
+                    delete=delete_selected,
+                    category=target_category if move_selected else None,
+                    rating=target_rating if rate_selected else None
+                )
+                emit_change(
+                    events.DEALS,
+                    "delete" if delete_selected else "update",
+                    "Delete Deals" if delete_selected else "Move Deals" if move_selected else "Rate Deals",
+                    keys=sorted(touched_categories)
+                )
+                # A new table key drops the old row selection
+                st.session_state.deal_table_version = st.session_state.get("deal_table_version", 0) + 1
+                table_key = f"deal_table_{deal_category}_{st.session_state.deal_table_version}"
+                verb = "Deleted" if delete_selected else f"Moved to {target_category}" if move_selected else f"Rated {target_rating:g} ⭐"
+                st.success(f"✅ {verb}: {len(selected_ids)} deal(s)")
+        
+        # One table (drawn lazily by the browser however many deals there are), prices in the reporting currency
+        deals_df = deals.frame(st.session_state.deals.get(deal_category, []), get_fx_rates())
+        st.session_state.deal_table_ids = (table_key, list(deals_df.index))
+        st.dataframe(
+            deals_df,
+            key=table_key,
+            on_select="rerun",
+            selection_mode="multi-row",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Price": st.column_config.TextColumn("Price"),
+                deals.REPORTING_PRICE: st.column_config.NumberColumn(deals.REPORTING_PRICE, format="$%.2f"),
+                "Was": st.column_config.TextColumn("Was"),
+                "Rating": st.column_config.NumberColumn("Rating", format="⭐ %.1f"),
+                "Added": st.column_config.DateColumn("Added"),
+            }
+        )
+        st.caption(f"{len(deals_df)} deal(s) · select rows to delete, move or re-rate them together")
     
     # AI-powered deal analysis
     st.subheader("🤖 AI Deal Analysis")
@@ -435,14 +804,24 @@ elif page == "Deal Finder":
     if st.button("Get AI Recommendations") and analysis_prompt:
         with st.spinner("Analyzing deals..."):
             try:
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
+                st.write(gateway.complete(
+                    "deal_analysis",
+                    [
                         {"role": "system", "content": "You are a procurement expert for a slushie business. Analyze deals and provide recommendations based on cost, quality, and value."},
                         {"role": "user", "content": f"Analyze this request and provide specific deal recommendations: {analysis_prompt}"}
-                    ]
-                )
-                st.write(response.choices[0].message.content)
+                    ],
+                    page="Deal Finder",
+                    action="Get AI Recommendations"
+                ))
+            except usage_log.BudgetExceeded as e:
+                # Fall back to the saved deals that best match the request
+                gateway.record_fallback("deal_analysis", "Deal Finder", "Get AI Recommendations")
+                st.warning(f"💸 {str(e)}. Here are your saved deals that best match your request instead:")
+                hits = search_index().search(analysis_prompt, limit=5, kinds=["deal"])
+                for hit in hits:
+                    st.markdown(f"- {hit.text}")
+                if not hits:
+                    st.info("No saved deals match that request.")
             except Exception as e:
                 st.error(f"Unable to get AI deal analysis at the moment. Please check your internet connection and try again. (Error: {str(e)})")
 
@@ -457,12 +836,15 @@ elif page == "Data Analysis":
     
     if data_method == "Upload CSV":
         uploaded_file = st.file_uploader("Upload your sales data CSV", type=['csv'])
-        if uploaded_file is not None:
+        # The uploader keeps its file across reruns; only ingest a new upload once
+        if uploaded_file is not None and st.session_state.get("uploaded_sales_file") != uploaded_file.file_id:
             df = pd.read_csv(uploaded_file)
             # Ensure required columns exist
             if 'Quantity' not in df.columns:
                 df['Quantity'] = 1  # Default quantity if not provided
             st.session_state.sales_data = df.to_dict('records')
+            st.session_state.uploaded_sales_file = uploaded_file.file_id
+            emit_change(events.SALES, "replace", "CSV upload")
             st.success("Data uploaded successfully!")
     
     elif data_method == "Manual Entry":
@@ -486,10 +868,12 @@ elif page == "Data Analysis":
                 "Revenue": revenue
             }
             st.session_state.sales_data.append(new_data)
+            emit_change(events.SALES, "add", "Data Analysis manual entry", [date], [flavor])
             st.success("Data point added!")
     
     elif data_method == "Edit Existing Data":
         st.subheader("Edit Your Sales Data")
+        sales_history_controls("analysis_sales")
         
         if st.session_state.sales_data:
             df = pd.DataFrame(st.session_state.sales_data)
@@ -503,19 +887,23 @@ elif page == "Data Analysis":
                     "Date": st.column_config.DateColumn("Date"),
                     "Flavor": st.column_config.SelectboxColumn("Flavor", options=["Blue Raspberry", "Cherry", "Lime", "Orange", "Strawberry", "Grape", "Other"]),
                     "Quantity": st.column_config.NumberColumn("Quantity", min_value=0),
-                    "Revenue": st.column_config.NumberColumn("Revenue ($)", min_value=0.0, format="$%.2f")
+                    "Revenue": st.column_config.NumberColumn("Revenue ($)", min_value=0.0, format="$%.2f"),
+                    "id": None
                 }
             )
             
             # Update session state with edited data
-            st.session_state.sales_data = edited_df.to_dict('records')
+            if not edited_df.equals(df):
+                edited_records = edited_df.to_dict('records')
+                dates = events.changed_dates(st.session_state.sales_data, edited_records)
+                st.session_state.sales_data = edited_records
+                emit_change(events.SALES, "update", "Data Analysis data editor", dates)
         else:
             st.info("No data to edit. Add some data first!")
     
     # Display and analyze data
-    if st.session_state.sales_data:
-        df = pd.DataFrame(st.session_state.sales_data)
-        
+    df = sales_ledger_frame()
+    if not df.empty:
         st.subheader("📊 Data Analysis Results")
         
         col1, col2 = st.columns(2)
@@ -530,8 +918,8 @@ elif page == "Data Analysis":
         with col2:
             st.write("**Daily Sales Trend**")
             if not df.empty:
-                daily_sales = df.groupby('Date')['Revenue'].sum()
-                fig = px.line(daily_sales, title="Daily Revenue Trend")
+                daily_sales = df.groupby('Date')['Revenue'].sum().reset_index()
+                fig = charts.time_series(daily_sales, 'Date', 'Revenue', "Daily Revenue Trend")
                 st.plotly_chart(fig, use_container_width=True)
         
         # AI Pattern Analysis
@@ -545,17 +933,29 @@ elif page == "Data Analysis":
                 - Total Sales: {df.get('Quantity', pd.Series([0])).sum()} units
                 - Top Flavor: {flavor_performance.index[0] if not df.empty else 'None'}
                 - Date Range: {df['Date'].min()} to {df['Date'].max() if not df.empty else 'None'}
-                - Average Daily Revenue: ${df.groupby('Date')['Revenue'].sum().mean():.2f if not df.empty else 0}
+                - Average Daily Revenue: ${(df.groupby('Date')['Revenue'].sum().mean() if not df.empty else 0):.2f}
                 """
                 
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a business analyst specializing in food service. Analyze sales data and provide insights about consumer behavior, trends, and recommendations."},
-                        {"role": "user", "content": f"Analyze this slushie sales data and provide insights: {data_summary}"}
-                    ]
-                )
-                st.write(response.choices[0].message.content)
+                try:
+                    st.session_state.ai_summaries["sales_patterns"] = gateway.complete(
+                        "sales_patterns",
+                        [
+                            {"role": "system", "content": "You are a business analyst specializing in food service. Analyze sales data and provide insights about consumer behavior, trends, and recommendations."},
+                            {"role": "user", "content": f"Analyze this slushie sales data and provide insights: {data_summary}"}
+                        ],
+                        page="Data Analysis",
+                        action="Analyze Consumer Patterns"
+                    )
+                except usage_log.BudgetExceeded as e:
+                    gateway.record_fallback("sales_patterns", "Data Analysis", "Analyze Consumer Patterns")
+                    st.warning(f"💸 {str(e)}. Here is the summary worked out from your data instead:")
+                    st.markdown("\n".join(line.strip() for line in data_summary.strip().splitlines()).replace("$", "\\$"))
+                except Exception as e:
+                    st.error(f"Unable to analyze consumer patterns at the moment. Please try again shortly. (Error: {str(e)})")
+        
+        # Kept until the sales data changes
+        if "sales_patterns" in st.session_state.ai_summaries:
+            st.write(st.session_state.ai_summaries["sales_patterns"])
 
 # Inventory Recommendations Page
 elif page == "Inventory Recommendations":
@@ -595,8 +995,13 @@ elif page == "Inventory Recommendations":
     )
     
     # Update session state
+    changed_flavors = []
     for _, row in edited_inventory.iterrows():
-        st.session_state.inventory_data[row['Flavor']] = row['Gallons']
+        if st.session_state.inventory_data.get(row['Flavor']) != row['Gallons']:
+            st.session_state.inventory_data[row['Flavor']] = row['Gallons']
+            changed_flavors.append(row['Flavor'])
+    if changed_flavors:
+        emit_change(events.INVENTORY, "update", "Inventory editor", keys=changed_flavors)
     
     # Add new flavor
     st.subheader("Add New Flavor")
@@ -608,12 +1013,27 @@ elif page == "Inventory Recommendations":
     
     if st.button("Add Flavor") and new_flavor:
         st.session_state.inventory_data[new_flavor] = new_gallons
+        emit_change(events.INVENTORY, "add", "Add Flavor", keys=[new_flavor])
         st.success(f"Added {new_flavor} to inventory!")
         st.rerun()
     
     # Sales data for recommendations
     st.subheader("Recent Sales Data")
     sales_period = st.selectbox("Sales Period", ["Last Week", "Last Month", "Last Quarter"])
+    period_days = {"Last Week": 7, "Last Month": 30, "Last Quarter": 91}[sales_period]
+    
+    # Syrup poured for Venmo orders, from the flavor and size in each payment note
+    venmo_usage = None
+    venmo_payments = venmo_history()
+    if not venmo_payments.empty:
+        orders = notes.orders_frame(venmo_payments)
+        order_dates = pd.to_datetime(orders["date"].astype("string"), errors="coerce")
+        recent_orders = orders[order_dates > pd.Timestamp.today().normalize() - pd.Timedelta(days=period_days)]
+        if not recent_orders.empty:
+            venmo_usage = notes.flavor_usage(recent_orders)
+            venmo_usage["Gallons on Hand"] = pd.Series(st.session_state.inventory_data, dtype=float).reindex(venmo_usage.index)
+            st.write("**Syrup Used by Venmo Orders:**")
+            st.dataframe(venmo_usage.drop(columns=["Revenue"]), use_container_width=True)
     
     if st.button("Get Inventory Recommendations"):
         with st.spinner("Analyzing inventory..."):
@@ -626,6 +1046,9 @@ elif page == "Inventory Recommendations":
             
             Sales Period: {sales_period}
             
+            Syrup Used by Venmo Orders in this Period:
+            {venmo_usage[["Drinks", "Syrup (gal)"]].round(2).to_dict("index") if venmo_usage is not None else "No Venmo orders"}
+            
             Provide specific recommendations for:
             1. Which flavors to order more of
             2. Which flavors to reduce
@@ -633,24 +1056,38 @@ elif page == "Inventory Recommendations":
             4. Cost-saving opportunities
             """
             
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a CFO specializing in inventory management for food service businesses. Provide practical, cost-effective recommendations."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            st.write(response.choices[0].message.content)
-            
-            # Visual inventory chart
-            fig = px.bar(
-                x=list(st.session_state.inventory_data.keys()),
-                y=list(st.session_state.inventory_data.values()),
-                title="Current Inventory Levels",
-                labels={'x': 'Flavor', 'y': 'Gallons'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            try:
+                recommendations = gateway.complete(
+                    "inventory",
+                    [
+                        {"role": "system", "content": "You are a CFO specializing in inventory management for food service businesses. Provide practical, cost-effective recommendations."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    page="Inventory Recommendations",
+                    action="Get Inventory Recommendations"
+                )
+                st.session_state.ai_summaries["inventory_recommendations"] = (sales_period, recommendations)
+            except usage_log.BudgetExceeded as e:
+                # Fall back to a reorder list: lowest days of stock first
+                gateway.record_fallback("inventory", "Inventory Recommendations", "Get Inventory Recommendations")
+                st.warning(f"💸 {str(e)}. Here is how long each flavor lasts at recent sales instead (reorder from the top):")
+                stock = ledger.days_of_stock(st.session_state.inventory_data, sales_ledger_frame(), window_days=period_days)
+                st.dataframe(stock.sort_values("Days of Stock").round(1), use_container_width=True)
+            except Exception as e:
+                st.error(f"Unable to get inventory recommendations at the moment. Please try again shortly. (Error: {str(e)})")
+    
+    # Kept until inventory or sales change
+    if st.session_state.ai_summaries.get("inventory_recommendations", (None,))[0] == sales_period:
+        st.write(st.session_state.ai_summaries["inventory_recommendations"][1])
+        
+        # Visual inventory chart
+        fig = px.bar(
+            x=list(st.session_state.inventory_data.keys()),
+            y=list(st.session_state.inventory_data.values()),
+            title="Current Inventory Levels",
+            labels={'x': 'Flavor', 'y': 'Gallons'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
 # Profit Calculator Page
 elif page == "Profit Calculator":
@@ -660,20 +1097,86 @@ elif page == "Profit Calculator":
     
     # Initialize profit data if not exists
     if "profit_data" not in st.session_state:
-        st.session_state.profit_data = {
-            "total_sales": 0.0,
-            "other_revenue": 0.0,
-            "syrup_cost": 0.0,
-            "cup_cost": 0.0,
-            "ice_cost": 0.0,
-            "other_cogs": 0.0,
-            "rent": 0.0,
-            "utilities": 0.0,
-            "labor": 0.0,
-            "marketing": 0.0,
-            "other_expenses": 0.0
-        }
+        st.session_state.profit_data = {**ledger.empty_profit_data(), **store.load("profit_data", {})}
     
+    # Expense ledger
+    st.subheader("🧾 Expense Ledger")
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    with col1:
+        expense_date = st.date_input("Expense Date", key="expense_date")
+    with col2:
+        expense_category = st.selectbox(
+            "Category",
+            ledger.EXPENSE_CATEGORIES,
+            format_func=lambda c: ledger.CATEGORY_LABELS[c],
+            key="expense_category"
+        )
+    with col3:
+        expense_description = st.text_input("Description", key="expense_description")
+    with col4:
+        expense_amount = st.number_input("Amount", min_value=0.0, value=0.0, step=0.01, key="expense_amount")
+    with col5:
+        expense_currency = st.selectbox("Currency", fx.CURRENCIES, key="expense_currency")
+    with col6:
+        expense_recurrence = st.selectbox("Repeats", list(ledger.RECURRENCES), key="expense_recurrence")
+    
+    if st.button("Add Expense") and expense_amount > 0:
+        st.session_state.expense_data.append({
+            "Date": expense_date,
+            "Category": expense_category,
+            "Description": expense_description,
+            "Amount": expense_amount,
+            "Currency": expense_currency,
+            "Recurrence": expense_recurrence,
+            "Until": None
+        })
+        # Recurring items land in every period up to today
+        emit_change(events.EXPENSES, "add" if expense_recurrence == "One-time" else "replace",
+                    "Add Expense", [expense_date], [expense_category])
+        st.success("Expense added!")
+    
+    if st.session_state.expense_data:
+        expense_df = pd.DataFrame(st.session_state.expense_data)
+        edited_expenses = st.data_editor(
+            expense_df,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "Date": st.column_config.DateColumn("Date"),
+                "Category": st.column_config.SelectboxColumn("Category", options=ledger.EXPENSE_CATEGORIES),
+                "Description": st.column_config.TextColumn("Description"),
+                "Amount": st.column_config.NumberColumn("Amount", min_value=0.0, format="%.2f"),
+                "Currency": st.column_config.SelectboxColumn("Currency", options=fx.CURRENCIES),
+                "Recurrence": st.column_config.SelectboxColumn("Repeats", options=list(ledger.RECURRENCES)),
+                "Until": st.column_config.DateColumn("Until")
+            },
+            key="expense_editor"
+        )
+        if not edited_expenses.equals(expense_df):
+            edited_records = edited_expenses.to_dict('records')
+            rows = events.changed_rows(st.session_state.expense_data, edited_records)
+            recurring = any(row.get("Recurrence", "One-time") != "One-time" for row in rows)
+            st.session_state.expense_data = edited_records
+            emit_change(events.EXPENSES, "replace" if recurring else "update", "Expense editor",
+                        [row.get("Date") for row in rows])
+    
+    # Pull a closed or open period from the ledgers into the calculator
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        fill_period = st.selectbox("Fill calculator from ledger for this:", ["Season", "Month", "Week", "Day"])
+    with col2:
+        st.write("")
+        if st.button("📥 Fill from Ledger"):
+            statement = st.session_state.pnl_engine.current(
+                sales_ledger_frame(),
+                ledger.expense_frame(st.session_state.expense_data, rates=get_fx_rates()),
+                fill_period.lower()
+            )
+            st.session_state.profit_data = ledger.statement_profit_data(statement)
+            emit_change(events.PROFIT, "replace", "Fill from Ledger")
+            st.rerun()
+    
+    profit_inputs_before = dict(st.session_state.profit_data)
     col1, col2 = st.columns(2)
     
     with col1:
@@ -750,23 +1253,162 @@ elif page == "Profit Calculator":
             step=0.01
         )
     
+    changed_inputs = [k for k, v in st.session_state.profit_data.items() if profit_inputs_before.get(k) != v]
+    if changed_inputs:
+        emit_change(events.PROFIT, "update", "Profit Calculator inputs", keys=changed_inputs)
+    
+    # Labor from a demand forecast instead of a guess
+    with st.expander("👥 Staffing Forecast & Labor Schedule"):
+        st.write("Forecasts drinks per hour from your sales, Venmo payment times and the weather, "
+                 "then finds the cheapest shifts that keep up with demand.")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            staffing_city = st.text_input("Weather location:", value="New York", key="staffing_city")
+            week_start = st.date_input("Week starting:", value=datetime.now().date(), key="staffing_week")
+        with col2:
+            wage = st.number_input("Hourly wage ($)", min_value=0.0, value=15.0, step=0.5, key="staffing_wage")
+            drinks_per_staff_hour = st.number_input("Drinks one person serves per hour", min_value=1, value=30, key="staffing_rate")
+        with col3:
+            service_level = st.select_slider("Service level", options=[0.8, 0.9, 0.95, 0.99], value=0.9,
+                                             format_func=lambda level: f"{level:.0%} of hours", key="staffing_service")
+            shift_range = st.slider("Shift length (hours)", 1, 12, (3, 8), key="staffing_shift")
+        
+        weather_history = get_weather_service().history(staffing_city)
+        # Refit only when sales, Venmo payments or the weather history change
+        model_key = (st.session_state.change_bus.version(events.SALES, events.VENMO), staffing_city, len(weather_history))
+        cached = st.session_state.get("demand_model")
+        if cached is None or cached[0] != model_key:
+            try:
+                cached = (model_key, forecast.DemandModel.fit(sales_ledger_frame(), venmo_history(), weather_history))
+                st.session_state.demand_model = cached
+            except Exception as e:
+                st.error(f"Unable to fit the demand forecast: {str(e)}")
+        
+        if cached is not None and cached[0] == model_key:
+            demand_model = cached[1]
+            recent_weather = weather_history.tail(7)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                expected_high = st.number_input(
+                    "Expected high (°C)",
+                    value=round(float(recent_weather["temp_max"].mean()), 1) if not recent_weather.empty else forecast.DEFAULT_TEMP,
+                    key="staffing_temp"
+                )
+            with col2:
+                expected_rain = st.number_input("Expected rain (mm/day)", min_value=0.0, value=0.0, key="staffing_rain")
+            with col3:
+                open_hours = st.slider("Open hours", 0, 24, demand_model.open_hours(), key="staffing_open")
+            
+            if demand_model.observations == 0:
+                st.info("No sales yet; the forecast needs some sales history to work from.")
+            elif open_hours[0] < open_hours[1]:
+                week = pd.date_range(week_start, periods=7)
+                hourly = demand_model.hourly(week, expected_high, expected_rain)
+                try:
+                    staffed_hours, shifts = staffing.schedule(
+                        hourly, open_hours, service_level, drinks_per_staff_hour, wage, *shift_range
+                    )
+                except Exception as e:
+                    st.error(f"Unable to build a schedule: {str(e)}")
+                else:
+                    weekly_cost = float(shifts["Cost"].sum())
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Forecast Drinks", f"{staffed_hours['drinks'].sum():,.0f}")
+                    with col2:
+                        st.metric("Staff Hours", f"{int(shifts['Hours'].sum()):,}")
+                    with col3:
+                        st.metric("Weekly Labor Cost", f"${weekly_cost:,.2f}")
+                    
+                    grid = staffed_hours.assign(Day=staffed_hours["Date"].dt.strftime("%a %d")).pivot(
+                        index="Day", columns="hour", values="needed"
+                    ).reindex(week.strftime("%a %d"))
+                    fig = px.imshow(grid, text_auto=True, aspect="auto", color_continuous_scale="Blues",
+                                    labels={"x": "Hour", "y": "", "color": "Staff"}, title="Staff Needed per Hour")
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.dataframe(
+                        shifts,
+                        column_config={"Cost": st.column_config.NumberColumn("Cost ($)", format="$%.2f")},
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                    if st.button("Use as Labor Cost"):
+                        st.session_state.profit_data["labor"] = round(weekly_cost, 2)
+                        emit_change(events.PROFIT, "update", "Labor schedule", keys=["labor"])
+                        st.rerun()
+    
+    # Prices from how demand responded to past price changes
+    with st.expander("💲 Price Elasticity & Optimizer"):
+        st.write("Shows how demand for each flavor has responded to price in your sales ledger, "
+                 "and the price that earns the most per day after cup and syrup costs.")
+        sales_df = sales_ledger_frame()
+        try:
+            estimates = st.session_state.price_model.elasticities(sales_df)
+        except Exception as e:
+            estimates = None
+            st.error(f"Unable to estimate price elasticities: {str(e)}")
+        
+        if estimates is not None and estimates.empty:
+            st.info(f"No priced sales in the last {pricing.RECENT_DAYS} days. "
+                    "Add sales with a quantity and revenue to estimate elasticities.")
+        elif estimates is not None:
+            derived_cup, derived_syrup = pricing.unit_costs(
+                sales_df, ledger.expense_frame(st.session_state.expense_data, rates=get_fx_rates())
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                cup_cost = st.number_input("Cup & straw cost per drink ($)", min_value=0.0, step=0.01,
+                                           value=round(derived_cup or pricing.DEFAULT_CUP_COST, 3), key="pricing_cup")
+            with col2:
+                syrup_cost = st.number_input("Syrup cost per serving ($)", min_value=0.0, step=0.01,
+                                             value=round(derived_syrup or pricing.DEFAULT_SYRUP_COST, 3), key="pricing_syrup")
+            with col3:
+                max_change = st.slider("Largest price change (%)", 5, 50, int(pricing.MAX_CHANGE * 100), step=5, key="pricing_cap")
+            if derived_cup is None or derived_syrup is None:
+                st.caption("Costs missing from the expense ledger (last 90 days) use typical values; adjust them above.")
+            
+            # Size mix from Venmo notes, reused until payments change
+            mix_key = st.session_state.change_bus.version(events.VENMO)
+            cached_mix = st.session_state.get("size_mix")
+            if cached_mix is None or cached_mix[0] != mix_key:
+                cached_mix = st.session_state.size_mix = (mix_key, pricing.size_mix(venmo_history()))
+            plan = pricing.recommend(estimates, cup_cost, syrup_cost, cached_mix[1], max_change / 100)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Profit per Day Now", f"${plan['Profit/Day'].sum():,.2f}")
+            with col2:
+                gain = plan["New Profit/Day"].sum() - plan["Profit/Day"].sum()
+                st.metric("At Recommended Prices", f"${plan['New Profit/Day'].sum():,.2f}", f"${gain:,.2f}")
+            money = st.column_config.NumberColumn(format="$%.2f")
+            st.dataframe(
+                plan.drop(columns=["Stand"]) if plan["Stand"].nunique() == 1 else plan,
+                column_config={name: money for name in ["Unit Cost", "Current Price", "Recommended Price", "Profit/Day", "New Profit/Day"]},
+                hide_index=True,
+                use_container_width=True
+            )
+            if (estimates["Source"] != "estimated").any():
+                st.caption("Flavors always sold at one price use the elasticity shared by all flavors "
+                           f"(or {pricing.DEFAULT_ELASTICITY} when no price has changed yet).")
+            if st.button("Apply to Menu Prices"):
+                regular = plan[plan["Size"] == "Regular"]
+                if regular.empty:
+                    st.warning("No Regular size in the plan; menu prices were left unchanged.")
+                else:
+                    st.session_state.setdefault("menu_prices", {}).update(dict(zip(regular["Flavor"], regular["Recommended Price"])))
+                    # The menu editor starts over from the new prices
+                    st.session_state.pop("menu_prices_editor", None)
+                    st.success("✅ Menu prices updated with the recommended Regular prices.")
+    
     # Calculate profits
-    total_revenue = st.session_state.profit_data["total_sales"] + st.session_state.profit_data["other_revenue"]
-    total_cogs = (st.session_state.profit_data["syrup_cost"] + 
-                  st.session_state.profit_data["cup_cost"] + 
-                  st.session_state.profit_data["ice_cost"] + 
-                  st.session_state.profit_data["other_cogs"])
-    total_expenses = (st.session_state.profit_data["rent"] + 
-                      st.session_state.profit_data["utilities"] + 
-                      st.session_state.profit_data["labor"] + 
-                      st.session_state.profit_data["marketing"] + 
-                      st.session_state.profit_data["other_expenses"])
-    
-    gross_profit = total_revenue - total_cogs
-    net_profit = gross_profit - total_expenses
-    
-    gross_margin = (gross_profit / total_revenue) * 100 if total_revenue > 0 else 0
-    net_margin = (net_profit / total_revenue) * 100 if total_revenue > 0 else 0
+    summary = ledger.profit_summary(st.session_state.profit_data)
+    total_revenue = summary["total_revenue"]
+    total_cogs = summary["total_cogs"]
+    total_expenses = summary["total_expenses"]
+    gross_profit = summary["gross_profit"]
+    net_profit = summary["net_profit"]
+    gross_margin = summary["gross_margin"]
+    net_margin = summary["net_margin"]
     
     # Display results
     st.subheader("📊 Profit Analysis")
@@ -828,17 +1470,25 @@ elif page == "Profit Calculator":
                 - Operating Expenses: ${total_expenses:,.2f}
                 """
                 
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
+                st.session_state.ai_summaries["financial_insights"] = gateway.complete(
+                    "financial_insights",
+                    [
                         {"role": "system", "content": "You are a CFO specializing in small business financial analysis. Provide insights and recommendations for improving profitability."},
                         {"role": "user", "content": f"Analyze this slushie business financial data and provide recommendations: {financial_summary}"}
-                    ]
+                    ],
+                    page="Profit Calculator",
+                    action="Get Financial Insights"
                 )
-                
-                st.write(response.choices[0].message.content)
+            except usage_log.BudgetExceeded as e:
+                gateway.record_fallback("financial_insights", "Profit Calculator", "Get Financial Insights")
+                st.warning(f"💸 {str(e)}. Here is the summary worked out from your figures instead:")
+                st.markdown("\n".join(line.strip() for line in financial_summary.strip().splitlines()).replace("$", "\\$"))
             except Exception as e:
                 st.error(f"Unable to get AI insights at the moment. Please check your internet connection and try again. (Error: {str(e)})")
+    
+    # Kept until the calculator inputs change
+    if "financial_insights" in st.session_state.ai_summaries:
+        st.write(st.session_state.ai_summaries["financial_insights"])
 
 # Live Data & Images Page
 elif page == "Live Data & Images":
@@ -855,53 +1505,67 @@ elif page == "Live Data & Images":
     )
     
     if data_type == "Weather Data":
+        weather_service = get_weather_service()
         city = st.text_input("Enter city name:", value="New York")
         if st.button("Get Weather Data"):
             try:
-                # Using a free weather API (you'd need to sign up for a real API key)
-                weather_url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid=YOUR_API_KEY&units=metric"
-                st.info("Weather API requires a free API key from OpenWeatherMap. Sign up at openweathermap.org")
-                
-                # Mock weather data for demonstration
-                mock_weather = {
-                    "temperature": 22,
-                    "humidity": 65,
-                    "description": "Partly cloudy",
-                    "wind_speed": 12
-                }
+                current_weather = weather_service.current(city)
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Temperature", f"{mock_weather['temperature']}°C")
+                    st.metric("Temperature", f"{current_weather['temperature']}°C")
                 with col2:
-                    st.metric("Humidity", f"{mock_weather['humidity']}%")
+                    st.metric("Humidity", f"{current_weather['humidity']:.0f}%")
                 with col3:
-                    st.metric("Wind Speed", f"{mock_weather['wind_speed']} km/h")
+                    st.metric("Wind Speed", f"{current_weather['wind_speed']} km/h")
                 with col4:
-                    st.metric("Conditions", mock_weather['description'])
+                    st.metric("Conditions", current_weather['description'])
                 
                 st.success("Weather data retrieved successfully!")
                 
             except Exception as e:
                 st.error(f"Unable to fetch weather data: {str(e)}")
+        
+        # Season history, fetched once per location and joined to sales by date
+        st.write("**📅 Weather History**")
+        today = datetime.now().date()
+        history_range = st.date_input(
+            "Season dates:",
+            value=(today - timedelta(days=90), today - timedelta(days=1)),
+            key="weather_history_range"
+        )
+        if st.button("Backfill Weather History") and len(history_range) == 2:
+            try:
+                weather_service.backfill(city, *history_range)
+                st.success(f"Weather history for {city} is up to date.")
+            except Exception as e:
+                st.error(f"Unable to fetch weather history: {str(e)}")
+        
+        weather_history = weather_service.history(city)
+        if not weather_history.empty:
+            sales_df = sales_ledger_frame()
+            if not sales_df.empty:
+                daily_sales = sales_df.groupby("Date", as_index=False)["Revenue"].sum()
+                weather_sales = weather.join_sales(daily_sales, weather_history).dropna(subset=["temp_max"])
+                fig = px.scatter(
+                    weather_sales, x="temp_max", y="Revenue", color="description",
+                    title="Daily Revenue vs High Temperature",
+                    labels={"temp_max": "High (°C)", "Revenue": "Revenue ($)"}
+                )
+            else:
+                fig = px.line(weather_history, x="Date", y=["temp_max", "temp_min"], title=f"Daily Temperatures in {city}")
+            st.plotly_chart(fig, use_container_width=True)
     
     elif data_type == "Currency Exchange":
-        from_currency = st.selectbox("From:", ["USD", "EUR", "GBP", "CAD"])
-        to_currency = st.selectbox("To:", ["USD", "EUR", "GBP", "CAD"])
+        from_currency = st.selectbox("From:", fx.CURRENCIES)
+        to_currency = st.selectbox("To:", fx.CURRENCIES)
         amount = st.number_input("Amount:", min_value=0.01, value=1.0)
+        rate_date = st.date_input("Rate as of:", value=datetime.now().date())
         
         if st.button("Get Exchange Rate"):
             try:
-                # Mock exchange rate (you'd use a real API like exchangerate-api.com)
-                exchange_rates = {
-                    "USD": {"EUR": 0.85, "GBP": 0.73, "CAD": 1.25},
-                    "EUR": {"USD": 1.18, "GBP": 0.86, "CAD": 1.47},
-                    "GBP": {"USD": 1.37, "EUR": 1.16, "CAD": 1.71},
-                    "CAD": {"USD": 0.80, "EUR": 0.68, "GBP": 0.58}
-                }
-                
                 if from_currency != to_currency:
-                    rate = exchange_rates[from_currency][to_currency]
+                    rate = get_fx_rates().rate(from_currency, to_currency, rate_date)
                     converted = amount * rate
                     st.metric(f"Exchange Rate", f"1 {from_currency} = {rate:.4f} {to_currency}")
                     st.metric(f"Converted Amount", f"{converted:.2f} {to_currency}")
@@ -947,31 +1611,49 @@ elif page == "Live Data & Images":
     )
     
     if st.button("Generate Image") and image_prompt:
-        with st.spinner("Generating image..."):
-            try:
-                # This would use DALL-E API for real image generation
-                st.info("Image generation requires DALL-E API access. For now, showing a placeholder.")
-                
-                # Create a simple placeholder image
-                placeholder_img = Image.new('RGB', (400, 300), color='lightblue')
-                
-                # Add some text to the placeholder
-                from PIL import ImageDraw, ImageFont
-                draw = ImageDraw.Draw(placeholder_img)
-                try:
-                    font = ImageFont.truetype("arial.ttf", 20)
-                except:
-                    font = ImageFont.load_default()
-                
-                draw.text((50, 150), "AI Generated Image", fill='black', font=font)
-                draw.text((50, 180), "Would appear here", fill='black', font=font)
-                
-                st.image(placeholder_img, caption="Generated Image Placeholder", use_column_width=True)
-                
-                st.success("Image generation completed! (This is a placeholder - real generation requires DALL-E API)")
-                
-            except Exception as e:
-                st.error(f"Unable to generate image: {str(e)}")
+        job_key = get_image_queue().submit(image_prompt)
+        if job_key in st.session_state.image_jobs:
+            st.session_state.image_jobs.remove(job_key)
+        st.session_state.image_jobs.insert(0, job_key)
+    
+    # Jobs run in the background; only this block polls while any are pending
+    image_queue = get_image_queue()
+    recent_jobs = [image_queue.get(key) for key in st.session_state.image_jobs[:6]]
+    recent_jobs = [job for job in recent_jobs if job is not None]
+    
+    polling = any(not job.done for job in recent_jobs)
+
+    @st.fragment(run_every=2 if polling else None)
+    def show_image_jobs():
+        if polling and all(job.done for job in recent_jobs):
+            # The last job finished: rerun the page so this block stops polling
+            st.rerun()
+        for job in recent_jobs:
+            with st.container(border=True):
+                col1, col2 = st.columns([1, 2])
+                with col1:
+                    if job.status == "done":
+                        st.image(job.thumbnail_path)
+                    elif job.status == "failed":
+                        st.error("❌ Failed")
+                    else:
+                        st.info(f"⏳ {job.status.title()}...")
+                with col2:
+                    st.write(job.prompt)
+                    if job.status == "done":
+                        # The full-size image is read only when the button is clicked
+                        st.download_button(
+                            "Download full size",
+                            Path(job.image_path).read_bytes,
+                            file_name=f"slushie_{job.key[:8]}.png",
+                            mime="image/png",
+                            key=f"download_{job.key}"
+                        )
+                    elif job.status == "failed":
+                        st.caption(f"Unable to generate image: {job.error}")
+    
+    if recent_jobs:
+        show_image_jobs()
     
     # Business Image Templates
     st.subheader("📋 Business Image Templates")
@@ -981,9 +1663,104 @@ elif page == "Live Data & Images":
         ["Slushie Stand Design", "Menu Layout", "Social Media Post", "Business Card", "Flyer Design"]
     )
     
-    if st.button("Generate Template"):
-        st.info(f"Template for '{template_type}' would be generated here.")
-        st.write("This would create a professional business image template using AI.")
+    if template_type == "Slushie Stand Design":
+        if st.button("Generate Template"):
+            job_key = get_image_queue().submit(
+                "Professional design concept for a colorful family-run slushie stand, "
+                f"featuring {', '.join(st.session_state.inventory_data)} flavors, summer vibes"
+            )
+            if job_key not in st.session_state.image_jobs:
+                st.session_state.image_jobs.insert(0, job_key)
+            st.rerun()
+    else:
+        # Flavors in stock, priced from the sales ledger unless edited here
+        in_stock = [flavor for flavor, gallons in st.session_state.inventory_data.items() if gallons > 0]
+        if not in_stock:
+            st.caption("No flavors in stock on the Inventory page - showing every flavor.")
+            in_stock = list(st.session_state.inventory_data)
+        
+        if "menu_prices" not in st.session_state:
+            st.session_state.menu_prices = {}
+
+        def keep_menu_price_edits(flavors):
+            """Store the edited prices by flavor once, then start the editor over from them"""
+            for row, change in st.session_state.menu_prices_editor["edited_rows"].items():
+                if "Price" in change:
+                    flavor = flavors[int(row)]
+                    if change["Price"] is None:
+                        st.session_state.menu_prices.pop(flavor, None)
+                    else:
+                        st.session_state.menu_prices[flavor] = change["Price"]
+            # Row positions move with the stock list, so edits mustn't outlive this run
+            st.session_state.pop("menu_prices_editor", None)
+
+        ledger_prices = ledger.average_unit_prices(sales_ledger_frame())
+        prices_df = pd.DataFrame([
+            {"Flavor": flavor, "Price": st.session_state.menu_prices.get(flavor, round(ledger_prices.get(flavor, 4.00), 2))}
+            for flavor in in_stock
+        ])
+        edited_prices = st.data_editor(
+            prices_df,
+            use_container_width=True,
+            column_config={
+                "Flavor": st.column_config.TextColumn("Flavor", disabled=True),
+                "Price": st.column_config.NumberColumn("Price ($)", min_value=0.0, step=0.25, format="$%.2f")
+            },
+            key="menu_prices_editor",
+            # Keep only prices edited here; the rest follow the ledger as it changes
+            on_change=keep_menu_price_edits,
+            args=(list(prices_df["Flavor"]),)
+        )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            stands = st.text_input("Stands (comma separated):", value="Main Stand")
+        with col2:
+            tagline = st.text_input("Tagline:", value="Beat the heat!")
+        with col3:
+            contact = st.text_input("Contact / handle:", value="")
+        
+        stand_names = list(dict.fromkeys(stand.strip() for stand in stands.split(",") if stand.strip()))
+        menu_flavors = list(zip(edited_prices["Flavor"], edited_prices["Price"]))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            render_selected = st.button("Generate Template")
+        with col2:
+            render_all = st.button("Render All Templates")
+        
+        if (render_selected or render_all) and stand_names:
+            templates = list(marketing.TEMPLATES) if render_all else [template_type]
+            specs = [
+                marketing.asset_spec(template, stand, menu_flavors, tagline, contact)
+                for template in templates
+                for stand in stand_names
+            ]
+            with st.spinner(f"Rendering {len(specs)} assets..."):
+                try:
+                    results = marketing.render_batch(specs, pool=get_worker_pool())
+                    st.session_state.marketing_assets = [(spec["template"], spec["stand"], path) for spec, path, _ in results]
+                    fresh = sum(1 for _, _, rendered in results if rendered)
+                    st.success(f"✅ {len(results)} assets ready ({fresh} rendered, {len(results) - fresh} unchanged)")
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died; start a fresh pool on the next try
+                        get_worker_pool.clear()
+                    st.error(f"Unable to render templates: {str(e)}")
+        
+        assets = st.session_state.get("marketing_assets", [])
+        for row_start in range(0, len(assets), 3):
+            columns = st.columns(3)
+            for index, (column, (template, stand, path)) in enumerate(zip(columns, assets[row_start:row_start + 3]), row_start):
+                with column:
+                    st.image(path, caption=f"{template} - {stand}")
+                    st.download_button(
+                        "Download",
+                        Path(path).read_bytes,
+                        file_name=f"{stand}_{template}.png".replace(" ", "_").lower(),
+                        mime="image/png",
+                        key=f"asset_{index}"
+                    )
 
 # Live Charts Page
 elif page == "Live Charts":
@@ -992,74 +1769,48 @@ elif page == "Live Charts":
     st.write("Create, organize, and view custom charts and graphs for your business data.")
     
     # Chart creation and management functions
-    def create_chart(chart_config):
+    chart_sources = charts.source_frames(
+        sales_ledger_frame(),
+        venmo_history(),
+        st.session_state.dashboard_metrics
+    )
+    # Aggregated chart frames are cached by data version; sources are only
+    # rehashed after a change event (the metrics frame is three rows)
+    version_cache = st.session_state.setdefault("chart_data_versions", {})
+    source_events = {
+        "sales_data": st.session_state.change_bus.version(events.SALES),
+        "venmo_data": st.session_state.change_bus.version(events.VENMO),
+    }
+    chart_versions = {}
+    for name, df in chart_sources.items():
+        seen = version_cache.get(name)
+        if name in source_events and seen and seen[0] == source_events[name]:
+            chart_versions[name] = seen[1]
+        else:
+            chart_versions[name] = charts.data_version(df)
+            version_cache[name] = (source_events.get(name), chart_versions[name])
+    
+    def create_chart(chart_config, x_range=None):
         """Create a chart based on configuration"""
+        if chart_config["data_source"] not in chart_sources:
+            return None, "No data available for this chart"
+        source = chart_config["data_source"]
+        return charts.create_chart(chart_config, chart_sources[source], x_range, chart_versions[source])
+
+    def zoom_range(chart_name, chart_config):
+        """Range slider for large charts; the chart is resampled to the chosen window"""
+        source_df = chart_sources.get(chart_config["data_source"])
+        if not charts.is_large(chart_config, source_df):
+            return None
         try:
-            if chart_config["data_source"] == "sales_data" and st.session_state.sales_data:
-                df = pd.DataFrame(st.session_state.sales_data)
-            elif chart_config["data_source"] == "venmo_data" and st.session_state.venmo_data['transactions']:
-                df = pd.DataFrame(st.session_state.venmo_data['transactions'])
-            elif chart_config["data_source"] == "dashboard_metrics":
-                # Convert dashboard metrics to dataframe
-                metrics_data = [
-                    {"metric": "Total Revenue", "value": st.session_state.dashboard_metrics["total_revenue"]},
-                    {"metric": "Gross Profit", "value": st.session_state.dashboard_metrics["gross_profit"]},
-                    {"metric": "Net Profit", "value": st.session_state.dashboard_metrics["net_profit"]}
-                ]
-                df = pd.DataFrame(metrics_data)
-            else:
-                return None, "No data available for this chart"
-            
-            if df.empty:
-                return None, "No data available"
-            
-            # Create chart based on type
-            if chart_config["type"] == "line":
-                fig = px.line(
-                    df, 
-                    x=chart_config["x_column"], 
-                    y=chart_config["y_column"],
-                    title=chart_config["title"],
-                    color_discrete_sequence=[chart_config.get("color", "blue")]
-                )
-            elif chart_config["type"] == "bar":
-                fig = px.bar(
-                    df,
-                    x=chart_config["x_column"],
-                    y=chart_config["y_column"],
-                    title=chart_config["title"],
-                    color=chart_config.get("color", "blue")
-                )
-            elif chart_config["type"] == "pie":
-                fig = px.pie(
-                    df,
-                    values=chart_config["y_column"],
-                    names=chart_config["x_column"],
-                    title=chart_config["title"],
-                    color_discrete_sequence=px.colors.qualitative.Set3
-                )
-            elif chart_config["type"] == "scatter":
-                fig = px.scatter(
-                    df,
-                    x=chart_config["x_column"],
-                    y=chart_config["y_column"],
-                    title=chart_config["title"],
-                    color=chart_config.get("color", "blue")
-                )
-            elif chart_config["type"] == "histogram":
-                fig = px.histogram(
-                    df,
-                    x=chart_config["x_column"],
-                    title=chart_config["title"],
-                    color_discrete_sequence=[chart_config.get("color", "blue")]
-                )
-            else:
-                return None, f"Unknown chart type: {chart_config['type']}"
-            
-            return fig, None
-            
-        except Exception as e:
-            return None, f"Error creating chart: {str(e)}"
+            low, high = charts.x_bounds(source_df, chart_config["x_column"])
+            if low == high:
+                return None
+            return st.slider("🔍 Zoom to range", min_value=low, max_value=high,
+                             value=(low, high), key=f"zoom_{chart_name}")
+        except Exception:
+            # X values the slider can't handle (e.g. text) keep the full view
+            return None
     
     # Chart creation interface
     st.subheader("🎨 Create New Chart")
@@ -1082,12 +1833,12 @@ elif page == "Live Charts":
     
     with col2:
         # Column selection based on data source
-        if data_source == "sales_data" and st.session_state.sales_data:
-            df_sample = pd.DataFrame(st.session_state.sales_data)
+        if data_source == "sales_data" and not chart_sources["sales_data"].empty:
+            df_sample = chart_sources["sales_data"]
             x_column = st.selectbox("X Column:", df_sample.columns.tolist(), key="new_chart_x")
             y_column = st.selectbox("Y Column:", df_sample.columns.tolist(), key="new_chart_y")
-        elif data_source == "venmo_data" and st.session_state.venmo_data['transactions']:
-            df_sample = pd.DataFrame(st.session_state.venmo_data['transactions'])
+        elif data_source == "venmo_data" and not chart_sources["venmo_data"].empty:
+            df_sample = chart_sources["venmo_data"]
             x_column = st.selectbox("X Column:", df_sample.columns.tolist(), key="new_chart_x")
             y_column = st.selectbox("Y Column:", df_sample.columns.tolist(), key="new_chart_y")
         elif data_source == "dashboard_metrics":
@@ -1100,6 +1851,37 @@ elif page == "Live Charts":
         
         chart_color = st.color_picker("Chart Color:", "#1f77b4", key="new_chart_color")
     
+    # Aggregation is computed on the server; only the summary reaches the chart
+    with st.expander("🧮 Aggregation & Filters"):
+        source_columns = chart_sources[data_source].columns.tolist()
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            agg_func = st.selectbox(
+                "Aggregate Y by:",
+                charts.AGG_FUNCS,
+                index=charts.AGG_FUNCS.index("sum") if chart_type in ("bar", "pie") else 0,
+                key="new_chart_agg"
+            )
+        with col_b:
+            agg_bucket = st.selectbox("Time bucket (X):", list(charts.TIME_BUCKETS), key="new_chart_bucket")
+        with col_c:
+            agg_quantile = st.number_input(
+                "Quantile:", min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+                key="new_chart_quantile", disabled=agg_func != "quantile"
+            )
+        
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            filter_column = st.selectbox("Filter column:", ["(none)"] + source_columns, key="new_chart_filter_col")
+        with col_b:
+            filter_op = st.selectbox("Operator:", list(charts.FILTER_OPS) + ["in"], key="new_chart_filter_op")
+        with col_c:
+            filter_value = st.text_input("Value:", key="new_chart_filter_value", help="For 'in', separate values with commas")
+    
+    chart_filters = []
+    if filter_column != "(none)" and filter_value:
+        chart_filters.append({"column": filter_column, "op": filter_op, "value": filter_value})
+    
     # Folder selection
     folder_name = st.selectbox(
         "Save to Folder:",
@@ -1124,7 +1906,8 @@ elif page == "Live Charts":
                 "x_column": x_column,
                 "y_column": y_column,
                 "title": chart_name,
-                "color": chart_color
+                "color": chart_color,
+                "aggregation": charts.aggregation_spec(agg_func, agg_bucket, agg_quantile, chart_filters)
             }
             
             st.session_state.custom_charts["folders"][folder_name]["charts"][chart_name] = chart_config
@@ -1157,7 +1940,8 @@ elif page == "Live Charts":
                 for chart_name, chart_config in st.session_state.custom_charts["folders"][selected_folder]["charts"].items():
                     with st.expander(f"📊 {chart_name}"):
                         # Create and display chart
-                        fig, error = create_chart(chart_config)
+                        x_range = zoom_range(chart_name, chart_config)
+                        fig, error = create_chart(chart_config, x_range)
                         if fig:
                             st.plotly_chart(fig, use_container_width=True)
                         else:
@@ -1196,6 +1980,44 @@ elif page == "Live Charts":
                 st.success(f"Folder '{selected_folder}' deleted!")
                 st.rerun()
     
+    # Export chart folders as a report archive
+    st.subheader("📦 Export Charts")
+    export_folders = st.multiselect(
+        "Folders to export:",
+        list(st.session_state.custom_charts["folders"].keys()),
+        default=[st.session_state.custom_charts["active_folder"]] if st.session_state.custom_charts["active_folder"] in st.session_state.custom_charts["folders"] else [],
+        key="export_folders"
+    )
+    
+    if st.button("📦 Export Report", key="export_report_btn") and export_folders:
+        with st.spinner("Rendering charts..."):
+            try:
+                export_results = export.export_folders(
+                    st.session_state.custom_charts["folders"], chart_sources, export_folders,
+                    pool=get_worker_pool()
+                )
+                st.session_state.chart_report = export.build_archive(export_results)
+                rendered = sum(1 for r in export_results if r["rendered"])
+                st.success(f"✅ Exported {len(export_results)} charts ({rendered} rendered, {len(export_results) - rendered} unchanged)")
+                if any(r["error"] == export.PNG_UNAVAILABLE for r in export_results):
+                    st.info("Charts were exported as HTML only; install kaleido for PNG copies.")
+                for result in export_results:
+                    if result["error"] and result["error"] != export.PNG_UNAVAILABLE:
+                        st.warning(f"{result['folder']} / {result['chart']}: {result['error']}")
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    get_worker_pool.clear()
+                st.error(f"Unable to export charts: {str(e)}")
+    
+    if st.session_state.get("chart_report"):
+        st.download_button(
+            "⬇️ Download Report Archive",
+            st.session_state.chart_report,
+            file_name=f"slushie_charts_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+            mime="application/zip",
+            key="download_chart_report"
+        )
+    
     # Tab organization
     st.subheader("📑 Chart Tabs")
     
@@ -1205,33 +2027,31 @@ elif page == "Live Charts":
     with tab1:
         st.write("**Revenue-focused charts:**")
         # Revenue charts
-        if st.session_state.sales_data:
-            df = pd.DataFrame(st.session_state.sales_data)
-            if not df.empty:
-                col1, col2 = st.columns(2)
-                with col1:
-                    daily_revenue = df.groupby('Date')['Revenue'].sum().reset_index()
-                    fig = px.line(daily_revenue, x='Date', y='Revenue', title="Daily Revenue")
-                    st.plotly_chart(fig, use_container_width=True)
-                with col2:
-                    total_revenue = df['Revenue'].sum()
-                    st.metric("Total Revenue", f"${total_revenue:,.2f}")
+        df = chart_sources["sales_data"]
+        if not df.empty:
+            col1, col2 = st.columns(2)
+            with col1:
+                daily_revenue = df.groupby('Date')['Revenue'].sum().reset_index()
+                fig = charts.time_series(daily_revenue, 'Date', 'Revenue', "Daily Revenue")
+                st.plotly_chart(fig, use_container_width=True)
+            with col2:
+                total_revenue = df['Revenue'].sum()
+                st.metric("Total Revenue", f"${total_revenue:,.2f}")
     
     with tab2:
         st.write("**Flavor performance charts:**")
         # Flavor charts
-        if st.session_state.sales_data:
-            df = pd.DataFrame(st.session_state.sales_data)
-            if not df.empty:
-                col1, col2 = st.columns(2)
-                with col1:
-                    flavor_sales = df.groupby('Flavor')['Revenue'].sum().reset_index()
-                    fig = px.pie(flavor_sales, values='Revenue', names='Flavor', title="Revenue by Flavor")
-                    st.plotly_chart(fig, use_container_width=True)
-                with col2:
-                    flavor_counts = df.groupby('Flavor')['Quantity'].sum().reset_index()
-                    fig = px.bar(flavor_counts, x='Flavor', y='Quantity', title="Sales by Flavor")
-                    st.plotly_chart(fig, use_container_width=True)
+        df = chart_sources["sales_data"]
+        if not df.empty:
+            col1, col2 = st.columns(2)
+            with col1:
+                flavor_sales = df.groupby('Flavor')['Revenue'].sum().reset_index()
+                fig = px.pie(flavor_sales, values='Revenue', names='Flavor', title="Revenue by Flavor")
+                st.plotly_chart(fig, use_container_width=True)
+            with col2:
+                flavor_counts = df.groupby('Flavor')['Quantity'].sum().reset_index()
+                fig = px.bar(flavor_counts, x='Flavor', y='Quantity', title="Sales by Flavor")
+                st.plotly_chart(fig, use_container_width=True)
     
     with tab3:
         st.write("**Trend analysis charts:**")
@@ -1275,6 +2095,124 @@ elif page == "Live Charts":
     
     # Auto-updating charts and graphs
     st.subheader("📊 Auto-Updating Charts")
+    st.write("Follows saved sales and Venmo payments, including ones added from other devices. Only this panel refreshes.")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        live_enabled = st.toggle("Live updates", value=True, key="live_enabled")
+    with col2:
+        live_interval = st.selectbox("Refresh every (seconds):", [2, 5, 10, 30, 60], index=1, key="live_interval")
+    with col3:
+        live_window = st.selectbox("Points to keep:", [100, 250, 500, 1000], index=2, key="live_window")
+    
+    feeds = st.session_state.get("live_feeds")
+    if feeds is None or feeds["sales_data"].window != live_window:
+        feeds = st.session_state.live_feeds = live.live_feeds(live_window)
+    
+    @st.fragment(run_every=live_interval if live_enabled else None)
+    def auto_updating_charts():
+        added = {name: feed.poll() for name, feed in feeds.items()}
+        sales_points = feeds["sales_data"].frame()
+        venmo_points = feeds["venmo_data"].frame()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if not sales_points.empty:
+                daily = sales_points.groupby("time")["value"].sum().reset_index()
+                fig = px.line(daily, x="time", y="value", markers=True, title="Sales Revenue (rolling window)",
+                              labels={"time": "Date", "value": "Revenue"})
+                st.plotly_chart(fig, use_container_width=True, key="live_sales_chart")
+            else:
+                st.info("No saved sales yet.")
+            st.caption(f"{len(sales_points)} points · +{added['sales_data']} this tick")
+        with col2:
+            if not venmo_points.empty:
+                venmo_points = venmo_points.sort_values("time")
+                venmo_points["running"] = venmo_points["value"].cumsum()
+                fig = px.line(venmo_points, x="time", y="running", markers=True, hover_data=["label", "value"],
+                              title="Venmo Payments (running total)", labels={"time": "Time", "running": "Total ($)"})
+                fig.update_traces(line_color="green")
+                st.plotly_chart(fig, use_container_width=True, key="live_venmo_chart")
+            else:
+                st.info("No saved Venmo payments yet.")
+            st.caption(f"{len(venmo_points)} points · +{added['venmo_data']} this tick")
+        st.caption(f"Last checked {datetime.now().strftime('%H:%M:%S')}")
+    
+    auto_updating_charts()
+
+# AI Usage Page
+elif page == "AI Usage":
+    st.header("💸 AI Usage")
+    
+    st.write("Tokens, response times and cost of every AI request, by page and button.")
+    
+    usage_ledger = gateway.usage
+    usage_window = st.selectbox("Period", ["Today", "Last 7 Days", "Last 30 Days", "All Time"])
+    usage_df = usage_ledger.frame()
+    window_days = {"Today": 1, "Last 7 Days": 7, "Last 30 Days": 30}.get(usage_window)
+    if window_days and not usage_df.empty:
+        usage_df = usage_df[usage_df["at"] >= pd.Timestamp.today().normalize() - pd.Timedelta(days=window_days - 1)]
+    
+    # Today's spend against the budgets
+    spent_today = usage_ledger.spent_today()
+    if usage_ledger.daily_budget:
+        st.progress(
+            min(spent_today / usage_ledger.daily_budget, 1.0),
+            text=f"Spent today: ${spent_today:,.4f} of ${usage_ledger.daily_budget:,.2f}"
+        )
+    else:
+        st.caption(f"Spent today: ${spent_today:,.4f} (no daily budget set)")
+    
+    api_calls = usage_df[usage_df["status"].isin([usage_log.OK, usage_log.ERROR])] if not usage_df.empty else usage_df
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Requests", f"{len(api_calls):,}")
+    with col2:
+        st.metric("Tokens", f"{int(api_calls['prompt_tokens'].sum() + api_calls['completion_tokens'].sum()):,}" if not api_calls.empty else "0")
+    with col3:
+        st.metric("Cost", f"${usage_df['cost'].sum():,.4f}" if not usage_df.empty else "$0.0000")
+    with col4:
+        st.metric("Avg Response Time", f"{api_calls['latency_ms'].mean() / 1000:.2f}s" if not api_calls.empty else "–")
+    
+    if usage_df.empty:
+        st.info("No AI requests in this period yet.")
+    else:
+        degraded = usage_df[usage_df["status"].isin([usage_log.CACHED, usage_log.LOCAL])]
+        if not degraded.empty:
+            st.caption(f"🪫 {len(degraded)} answer(s) served from cache or computed locally because a budget was reached or the AI service was unavailable.")
+        
+        st.subheader("By Page")
+        st.dataframe(usage_log.summary(usage_df, "page"), use_container_width=True)
+        
+        st.subheader("By Button")
+        st.dataframe(usage_log.summary(usage_df, ["page", "action"]), use_container_width=True)
+        
+        st.subheader("By Model")
+        st.dataframe(usage_log.summary(api_calls, "model"), use_container_width=True)
+        
+        daily_cost = usage_df.groupby([usage_df["at"].dt.date.rename("Date"), "page"])["cost"].sum().reset_index()
+        fig = px.bar(daily_cost, x="Date", y="cost", color="page", title="Daily AI Cost by Page",
+                     labels={"cost": "Cost ($)", "page": "Page"})
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Budgets: once reached, pages answer from cache or from the app's own data
+    with st.expander("🎯 Daily Budgets"):
+        st.write("Set to 0 for no limit.")
+        new_daily_budget = st.number_input(
+            "All pages ($/day)", min_value=0.0, value=float(usage_ledger.daily_budget or 0.0), step=0.10, format="%.2f"
+        )
+        new_page_budgets = {}
+        for ai_page in ["Deal Finder", "Data Analysis", "Inventory Recommendations", "Profit Calculator", "Chat Assistant"]:
+            new_page_budgets[ai_page] = st.number_input(
+                f"{ai_page} ($/day)", min_value=0.0, value=float(usage_ledger.page_budgets.get(ai_page) or 0.0),
+                step=0.10, format="%.2f", key=f"budget_{ai_page}"
+            )
+        if st.button("Save Budgets"):
+            usage_ledger.set_budgets(
+                new_daily_budget or None,
+                {ai_page: limit or None for ai_page, limit in new_page_budgets.items()}
+            )
+            st.success("✅ Budgets saved")
 
 # Chat Assistant Page
 elif page == "Chat Assistant":
@@ -1355,6 +2293,7 @@ elif page == "Chat Assistant":
 - `/add note [text]` - Add a note
 - `/notes` - Show all notes
 - `/clear notes` - Clear all notes
+- `/search [words]` - Search chat history, notes and deals
 
 🧮 **Calculation Commands:**
 - `/profit margin [revenue] [costs]` - Calculate profit margin
@@ -1389,6 +2328,7 @@ elif page == "Chat Assistant":
                 amount = float(command_parts[1])
                 if command_parts[2] == "to" and command_parts[3] == "net" and command_parts[4] == "profit":
                     st.session_state.commands_data['net_profits'] += amount
+                    emit_change(events.COMMANDS, "update", "/add", keys=["net_profits"])
                     return f"✅ Added ${amount:,.2f} to net profits. New total: ${st.session_state.commands_data['net_profits']:,.2f}"
             except ValueError:
                 return "❌ Invalid amount. Please enter a valid number."
@@ -1401,6 +2341,7 @@ elif page == "Chat Assistant":
                 amount = int(command_parts[1])
                 if command_parts[2] == "to" and command_parts[3] == "sales":
                     st.session_state.commands_data['total_sales'] += amount
+                    emit_change(events.COMMANDS, "update", "/add", keys=["total_sales"])
                     return f"✅ Added {amount:,} to total sales. New total: {st.session_state.commands_data['total_sales']:,} units"
             except ValueError:
                 return "❌ Invalid amount. Please enter a valid number."
@@ -1412,11 +2353,13 @@ elif page == "Chat Assistant":
             if command_parts[1] == "best" and command_parts[2] == "day":
                 day = " ".join(command_parts[3:])
                 st.session_state.commands_data['best_day'] = day
+                emit_change(events.COMMANDS, "update", "/set", keys=["best_day"])
                 return f"✅ Set best performing day to: {day}"
             elif command_parts[1] == "net" and command_parts[2] == "profit":
                 try:
                     amount = float(command_parts[3])
                     st.session_state.commands_data['net_profits'] = amount
+                    emit_change(events.COMMANDS, "update", "/set", keys=["net_profits"])
                     return f"✅ Set net profits to: ${amount:,.2f}"
                 except ValueError:
                     return "❌ Invalid amount. Please enter a valid number."
@@ -1424,6 +2367,7 @@ elif page == "Chat Assistant":
                 try:
                     amount = int(command_parts[3])
                     st.session_state.commands_data['total_sales'] = amount
+                    emit_change(events.COMMANDS, "update", "/set", keys=["total_sales"])
                     return f"✅ Set total sales to: {amount:,} units"
                 except ValueError:
                     return "❌ Invalid amount. Please enter a valid number."
@@ -1431,6 +2375,7 @@ elif page == "Chat Assistant":
         elif command == "/add" and len(command_parts) >= 3 and command_parts[1] == "note":
             note = " ".join(command_parts[2:])
             st.session_state.commands_data['notes'].append(note)
+            emit_change(events.COMMANDS, "add", "/add note", keys=["notes"])
             return f"📝 **Note added:** {note}"
         
         elif command == "/notes":
@@ -1439,16 +2384,28 @@ elif page == "Chat Assistant":
             notes_text = "\n".join([f"{i+1}. {note}" for i, note in enumerate(st.session_state.commands_data['notes'])])
             return f"📝 **Saved Notes:**\n{notes_text}"
         
+        elif command == "/search":
+            query = " ".join(command_parts[1:])
+            if not query:
+                return "❌ Use: /search [words]"
+            hits = search_index().search(query, limit=10)
+            if not hits:
+                return f"🔎 No matches for \"{query}\"."
+            results = "\n".join(
+                f"{i+1}. {SEARCH_LABELS[hit.kind]}: {hit.text}"
+                for i, hit in enumerate(hits)
+            )
+            return f"🔎 **Search Results for \"{query}\":**\n{results}"
+        
         elif command == "/clear" and len(command_parts) > 1 and command_parts[1] == "notes":
             st.session_state.commands_data['notes'] = []
+            emit_change(events.COMMANDS, "delete", "/clear notes", keys=["notes"])
             return "🗑️ All notes cleared."
         
         elif command == "/profit" and len(command_parts) >= 4 and command_parts[1] == "margin":
             try:
-                revenue = float(command_parts[2])
-                costs = float(command_parts[3])
-                profit = revenue - costs
-                margin = (profit / revenue) * 100 if revenue > 0 else 0
+                result = calculators.profit_margin(float(command_parts[2]), float(command_parts[3]))
+                revenue, costs, profit, margin = result["revenue"], result["costs"], result["profit"], result["margin_percent"]
                 return f"💰 **Profit Margin Calculation:**\nRevenue: ${revenue:,.2f}\nCosts: ${costs:,.2f}\nProfit: ${profit:,.2f}\nMargin: {margin:.1f}%"
             except ValueError:
                 return "❌ Invalid numbers. Use: /profit margin [revenue] [costs]"
@@ -1458,8 +2415,7 @@ elif page == "Chat Assistant":
                 fixed_costs = float(command_parts[2])
                 price = float(command_parts[3])
                 variable_cost = float(command_parts[4])
-                contribution_margin = price - variable_cost
-                break_even_units = fixed_costs / contribution_margin if contribution_margin > 0 else 0
+                break_even_units = calculators.break_even(fixed_costs, price, variable_cost)["break_even_units"]
                 return f"📊 **Break-Even Analysis:**\nFixed Costs: ${fixed_costs:,.2f}\nPrice per Unit: ${price:,.2f}\nVariable Cost per Unit: ${variable_cost:,.2f}\nBreak-Even Units: {break_even_units:,.0f}"
             except ValueError:
                 return "❌ Invalid numbers. Use: /break even [fixed_costs] [price] [variable_cost]"
@@ -1469,10 +2425,8 @@ elif page == "Chat Assistant":
             
             if calc_type == "margin" and len(command_parts) >= 4:
                 try:
-                    revenue = float(command_parts[2])
-                    costs = float(command_parts[3])
-                    profit = revenue - costs
-                    margin = (profit / revenue) * 100 if revenue > 0 else 0
+                    result = calculators.profit_margin(float(command_parts[2]), float(command_parts[3]))
+                    revenue, costs, profit, margin = result["revenue"], result["costs"], result["profit"], result["margin_percent"]
                     return f"💰 **Profit Margin:**\nRevenue: ${revenue:,.2f}\nCosts: ${costs:,.2f}\nProfit: ${profit:,.2f}\nMargin: {margin:.1f}%"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate margin [revenue] [costs]"
@@ -1481,8 +2435,8 @@ elif page == "Chat Assistant":
                 try:
                     cost = float(command_parts[2])
                     markup_percent = float(command_parts[3])
-                    markup_amount = cost * (markup_percent / 100)
-                    selling_price = cost + markup_amount
+                    result = calculators.markup(cost, markup_percent)
+                    markup_amount, selling_price = result["markup_amount"], result["selling_price"]
                     return f"🏷️ **Markup Calculation:**\nCost: ${cost:,.2f}\nMarkup: {markup_percent:.1f}%\nMarkup Amount: ${markup_amount:,.2f}\nSelling Price: ${selling_price:,.2f}"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate markup [cost] [markup_percent]"
@@ -1491,8 +2445,8 @@ elif page == "Chat Assistant":
                 try:
                     original_price = float(command_parts[2])
                     discount_percent = float(command_parts[3])
-                    discount_amount = original_price * (discount_percent / 100)
-                    final_price = original_price - discount_amount
+                    result = calculators.discount(original_price, discount_percent)
+                    discount_amount, final_price = result["discount_amount"], result["final_price"]
                     return f"🏷️ **Discount Calculation:**\nOriginal Price: ${original_price:,.2f}\nDiscount: {discount_percent:.1f}%\nDiscount Amount: ${discount_amount:,.2f}\nFinal Price: ${final_price:,.2f}"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate discount [original_price] [discount_percent]"
@@ -1501,8 +2455,8 @@ elif page == "Chat Assistant":
                 try:
                     amount = float(command_parts[2])
                     tax_rate = float(command_parts[3])
-                    tax_amount = amount * (tax_rate / 100)
-                    total_with_tax = amount + tax_amount
+                    result = calculators.tax(amount, tax_rate)
+                    tax_amount, total_with_tax = result["tax_amount"], result["total_with_tax"]
                     return f"💰 **Tax Calculation:**\nAmount: ${amount:,.2f}\nTax Rate: {tax_rate:.1f}%\nTax Amount: ${tax_amount:,.2f}\nTotal with Tax: ${total_with_tax:,.2f}"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate tax [amount] [tax_rate]"
@@ -1511,8 +2465,8 @@ elif page == "Chat Assistant":
                 try:
                     bill_amount = float(command_parts[2])
                     tip_percent = float(command_parts[3])
-                    tip_amount = bill_amount * (tip_percent / 100)
-                    total_with_tip = bill_amount + tip_amount
+                    result = calculators.tip(bill_amount, tip_percent)
+                    tip_amount, total_with_tip = result["tip_amount"], result["total_with_tip"]
                     return f"💡 **Tip Calculation:**\nBill Amount: ${bill_amount:,.2f}\nTip: {tip_percent:.1f}%\nTip Amount: ${tip_amount:,.2f}\nTotal with Tip: ${total_with_tip:,.2f}"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate tip [bill_amount] [tip_percent]"
@@ -1521,7 +2475,7 @@ elif page == "Chat Assistant":
                 try:
                     current_stock = float(command_parts[2])
                     daily_usage = float(command_parts[3])
-                    days_remaining = current_stock / daily_usage if daily_usage > 0 else float('inf')
+                    days_remaining = calculators.inventory_days(current_stock, daily_usage)["days_remaining"]
                     return f"📦 **Inventory Analysis:**\nCurrent Stock: {current_stock:,.1f} units\nDaily Usage: {daily_usage:,.1f} units\nDays Remaining: {days_remaining:,.1f} days"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate inventory [current_stock] [daily_usage]"
@@ -1530,7 +2484,7 @@ elif page == "Chat Assistant":
                 try:
                     investment = float(command_parts[2])
                     returns = float(command_parts[3])
-                    roi_percent = ((returns - investment) / investment) * 100 if investment > 0 else 0
+                    roi_percent = calculators.roi(investment, returns)["roi_percent"]
                     return f"📈 **ROI Calculation:**\nInvestment: ${investment:,.2f}\nReturns: ${returns:,.2f}\nROI: {roi_percent:.1f}%"
                 except ValueError:
                     return "❌ Invalid numbers. Use: /calculate roi [investment] [returns]"
@@ -1544,14 +2498,19 @@ elif page == "Chat Assistant":
                     "net_profits": 0.0,
                     "total_sales": 0,
                     "best_day": "None",
-                    "notes": []
+                    "notes": [],
+                    "applied_ids": []
                 }
+                emit_change(events.COMMANDS, "replace", "/reset all")
                 return "🔄 All data reset to default values."
             elif len(command_parts) > 1 and command_parts[1] == "profits":
                 st.session_state.commands_data['net_profits'] = 0.0
+                st.session_state.commands_data['applied_ids'] = []
+                emit_change(events.COMMANDS, "update", "/reset profits", keys=["net_profits", "applied_ids"])
                 return "🔄 Net profits reset to $0.00"
             elif len(command_parts) > 1 and command_parts[1] == "sales":
                 st.session_state.commands_data['total_sales'] = 0
+                emit_change(events.COMMANDS, "update", "/reset sales", keys=["total_sales"])
                 return "🔄 Total sales reset to 0 units"
         
         elif command == "/status":
@@ -1573,15 +2532,18 @@ elif page == "Chat Assistant":
                 # Simulate syncing transactions
                 if st.session_state.venmo_data['connected']:
                     # Mock sync - in real implementation, this would call Venmo API
+                    today = datetime.now().date().isoformat()
                     new_transactions = [
-                        {"amount": 5.50, "note": "Blue Raspberry Slushie", "time": "2:30 PM"},
-                        {"amount": 4.00, "note": "Cherry Slushie", "time": "2:45 PM"},
-                        {"amount": 6.00, "note": "Large Strawberry", "time": "3:15 PM"}
+                        {"amount": 5.50, "note": "Blue Raspberry Slushie", "time": "2:30 PM", "date": today},
+                        {"amount": 4.00, "note": "Cherry Slushie", "time": "2:45 PM", "date": today},
+                        {"amount": 6.00, "note": "Large Strawberry", "time": "3:15 PM", "date": today}
                     ]
-                    st.session_state.venmo_data['transactions'].extend(new_transactions)
-                    st.session_state.venmo_data['daily_total'] += sum(t['amount'] for t in new_transactions)
+                    added = st.session_state.venmo_ledger.ingest(new_transactions)
+                    st.session_state.venmo_data['daily_total'] = st.session_state.venmo_ledger.daily_total()
                     st.session_state.venmo_data['last_sync'] = datetime.now().strftime("%H:%M")
-                    return f"✅ **Venmo Sync Complete:**\nSynced {len(new_transactions)} new transactions\nToday's Total: ${st.session_state.venmo_data['daily_total']:,.2f}\nLast Sync: {st.session_state.venmo_data['last_sync']}"
+                    if added:
+                        emit_change(events.VENMO, "add", "/venmo sync", [today], [t['id'] for t in added])
+                    return f"✅ **Venmo Sync Complete:**\nSynced {len(added)} new transactions ({len(new_transactions) - len(added)} already imported)\nToday's Total: ${st.session_state.venmo_data['daily_total']:,.2f}\nLast Sync: {st.session_state.venmo_data['last_sync']}"
                 else:
                     return "❌ Venmo not connected. Use `/venmo connect` for instructions."
             
@@ -1598,9 +2560,11 @@ elif page == "Chat Assistant":
             elif venmo_action == "auto" and len(command_parts) > 2:
                 if command_parts[2] == "on":
                     st.session_state.venmo_data['auto_sync'] = True
+                    emit_change(events.VENMO, "update", "/venmo auto", keys=["auto_sync"])
                     return "✅ Auto-sync enabled. Venmo will sync every 5 minutes."
                 elif command_parts[2] == "off":
                     st.session_state.venmo_data['auto_sync'] = False
+                    emit_change(events.VENMO, "update", "/venmo auto", keys=["auto_sync"])
                     return "❌ Auto-sync disabled."
                 else:
                     return "❌ Use: `/venmo auto on` or `/venmo auto off`"
@@ -1609,6 +2573,7 @@ elif page == "Chat Assistant":
                 st.session_state.venmo_data['connected'] = False
                 st.session_state.venmo_data['access_token'] = ""
                 st.session_state.venmo_data['auto_sync'] = False
+                emit_change(events.VENMO, "update", "/venmo disconnect", keys=["connected"])
                 return "🔌 Venmo disconnected successfully."
             
             else:
@@ -1638,6 +2603,7 @@ elif page == "Chat Assistant":
 - `/add note [text]` - Add note
 - `/notes` - Show notes
 - `/clear notes` - Clear notes
+- `/search [words]` - Search chat, notes & deals
 
 🧮 **Calculation Commands:**
 - `/profit margin [revenue] [costs]` - Calculate profit margin
@@ -1662,37 +2628,6 @@ elif page == "Chat Assistant":
         else:
             return f"❌ Unknown command: {command_text}\nType `/help` for available commands."
     
-    # Helper function to generate AI response with context
-    def generate_ai_response(prompt, context, tone, business_context=""):
-        try:
-            # Build the system message with context and tone
-            system_message = f"""You are a CFO assistant for a family-run slushie business. 
-            
-CONTEXT: The user is seeking advice in the area of {context}.
-TONE: Respond in a {tone.lower()} manner.
-
-{f"BUSINESS BACKGROUND: {business_context}" if business_context else ""}
-
-Provide practical, actionable advice on finances, operations, inventory, marketing, and business strategy. 
-Be specific and helpful based on the context and tone requested.
-
-IMPORTANT: You cannot access live internet data, create graphs, or generate images. 
-Focus on providing text-based advice, calculations, and recommendations based on the information provided.
-If asked for current prices or live data, explain that you work with the data provided by the user.
-If asked to create graphs, suggest using the Data Analysis section of this app instead."""
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True,
-            )
-            return response
-        except Exception as e:
-            return None
-    
     # Simple command interface
     st.subheader("Quick Commands")
     st.write("Click any command below to execute it instantly:")
@@ -1824,6 +2759,7 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
             if st.button("🔗 Connect Venmo Account", key="connect_venmo"):
                 st.session_state.venmo_data['connected'] = True
                 st.session_state.venmo_data['last_sync'] = datetime.now().strftime("%H:%M")
+                emit_change(events.VENMO, "update", "Connect Venmo Account", keys=["connected"])
                 st.success("✅ Venmo connected! (Demo mode)")
                 st.rerun()
         else:
@@ -1831,6 +2767,7 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
                 st.session_state.venmo_data['connected'] = False
                 st.session_state.venmo_data['access_token'] = ""
                 st.session_state.venmo_data['auto_sync'] = False
+                emit_change(events.VENMO, "update", "Disconnect Venmo", keys=["connected"])
                 st.success("🔌 Venmo disconnected")
                 st.rerun()
     
@@ -1843,6 +2780,7 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
         )
         if auto_sync != st.session_state.venmo_data['auto_sync']:
             st.session_state.venmo_data['auto_sync'] = auto_sync
+            emit_change(events.VENMO, "update", "Enable Auto-Sync", keys=["auto_sync"])
             st.rerun()
         
         sync_interval = st.selectbox(
@@ -1853,19 +2791,25 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
         )
         if sync_interval != st.session_state.venmo_data['sync_interval']:
             st.session_state.venmo_data['sync_interval'] = sync_interval
+            emit_change(events.VENMO, "update", "Sync Interval", keys=["sync_interval"])
             st.rerun()
         
         if st.button("🔄 Manual Sync", key="manual_sync"):
             if st.session_state.venmo_data['connected']:
                 # Simulate syncing
+                today = datetime.now().date().isoformat()
                 new_transactions = [
-                    {"amount": 5.50, "note": "Blue Raspberry Slushie", "time": datetime.now().strftime("%H:%M")},
-                    {"amount": 4.00, "note": "Cherry Slushie", "time": datetime.now().strftime("%H:%M")}
+                    {"amount": 5.50, "note": "Blue Raspberry Slushie", "time": datetime.now().strftime("%H:%M"), "date": today},
+                    {"amount": 4.00, "note": "Cherry Slushie", "time": datetime.now().strftime("%H:%M"), "date": today}
                 ]
-                st.session_state.venmo_data['transactions'].extend(new_transactions)
-                st.session_state.venmo_data['daily_total'] += sum(t['amount'] for t in new_transactions)
+                added = st.session_state.venmo_ledger.ingest(new_transactions)
+                st.session_state.venmo_data['daily_total'] = st.session_state.venmo_ledger.daily_total()
                 st.session_state.venmo_data['last_sync'] = datetime.now().strftime("%H:%M")
-                st.success(f"✅ Synced {len(new_transactions)} new transactions!")
+                if added:
+                    emit_change(events.VENMO, "add", "Manual Sync", [today], [t['id'] for t in added])
+                    st.success(f"✅ Synced {len(added)} new transactions!")
+                else:
+                    st.info("No new transactions since the last sync.")
                 st.rerun()
             else:
                 st.error("❌ Venmo not connected")
@@ -1890,21 +2834,104 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
         with col2:
             st.metric("Transaction Count", len(st.session_state.venmo_data['transactions']))
         with col3:
-            avg_amount = st.session_state.venmo_data['daily_total'] / len(st.session_state.venmo_data['transactions']) if st.session_state.venmo_data['transactions'] else 0
+            todays_payments = st.session_state.venmo_ledger.day()
+            avg_amount = st.session_state.venmo_data['daily_total'] / len(todays_payments) if todays_payments else 0
             st.metric("Average Transaction", f"${avg_amount:,.2f}")
+        
+        # Flavor, size and quantity read from the payment notes
+        with st.expander("🍧 Venmo Orders by Flavor"):
+            usage = notes.flavor_usage(notes.orders_frame(venmo_history()))
+            st.dataframe(
+                usage,
+                column_config={
+                    "Revenue": st.column_config.NumberColumn("Revenue ($)", format="$%.2f"),
+                    "Syrup (gal)": st.column_config.NumberColumn("Syrup (gal)", format="%.2f")
+                },
+                use_container_width=True
+            )
+            fig = px.bar(usage.reset_index(), x="Flavor", y="Drinks", title="Drinks Sold via Venmo by Flavor")
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Which payments made it into the sales ledger, and which didn't (archived months included)
+    venmo_payments, sales_df = venmo_history(), sales_ledger_frame()
+    if not venmo_payments.empty and not sales_df.empty:
+        with st.expander("🧾 Reconcile Venmo with Sales"):
+            tolerance_days = st.selectbox("Match payments up to this many days from the sale:", [0, 1, 2, 3], index=1)
+            # Reused until sales or Venmo data change
+            reconcile_key = (st.session_state.change_bus.version(events.SALES, events.VENMO), tolerance_days)
+            cached = st.session_state.get("reconciliation")
+            if cached is None or cached[0] != reconcile_key:
+                try:
+                    result = reconcile.reconcile(
+                        venmo_payments,
+                        sales_df,
+                        tolerance_days=tolerance_days
+                    )
+                    st.session_state.reconciliation = cached = (reconcile_key, result)
+                except Exception as e:
+                    st.error(f"Unable to reconcile payments: {str(e)}")
+            
+            if cached is not None and cached[0] == reconcile_key:
+                summary = cached[1]["summary"]
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Matched", f"{summary['matched']:,}", f"${summary['matched_amount']:,.2f}", delta_color="off")
+                with col2:
+                    st.metric("Payments not in Sales", f"{summary['unmatched_payments']:,}", f"${summary['unmatched_payment_amount']:,.2f}", delta_color="off")
+                with col3:
+                    st.metric("Sales without Payment", f"{summary['unmatched_sales']:,}", f"${summary['unmatched_sales_amount']:,.2f}", delta_color="off")
+                with col4:
+                    st.metric("Likely Duplicates", f"{summary['duplicate_payments'] + summary['duplicate_sales']:,}")
+                
+                for label, key in [
+                    ("Payments not recorded as sales", "unmatched_payments"),
+                    ("Sales with no matching payment (cash, or missed syncs)", "unmatched_sales"),
+                    ("Likely duplicate payments", "duplicate_payments"),
+                    ("Likely duplicate sales entries", "duplicate_sales"),
+                    ("Matched", "matched"),
+                ]:
+                    if not cached[1][key].empty:
+                        st.write(f"**{label}:**")
+                        st.dataframe(cached[1][key].head(500), use_container_width=True, hide_index=True)
     
     # Auto-update business data from Venmo
     if st.session_state.venmo_data['connected'] and st.session_state.venmo_data['auto_sync']:
         st.info("🔄 **Auto-Sync Active:** Venmo transactions will automatically update your business data every 5 minutes.")
         
         # Auto-update net profits from Venmo
+        # Each payment is applied once, however often this is clicked
         if st.button("💰 Update Net Profits from Venmo", key="update_profits"):
-            st.session_state.commands_data['net_profits'] += st.session_state.venmo_data['daily_total']
-            st.success(f"✅ Updated net profits! Added ${st.session_state.venmo_data['daily_total']:,.2f} from Venmo")
-            st.rerun()
-    
-    # Display chat messages
-    for message in st.session_state.messages:
+            applied_ids = set(st.session_state.commands_data['applied_ids'])
+            pending = st.session_state.venmo_ledger.unapplied(applied_ids)
+            if pending:
+                amount = sum(t['amount'] for t in pending)
+                st.session_state.commands_data['net_profits'] += amount
+                st.session_state.commands_data['applied_ids'].extend(t['id'] for t in pending)
+                emit_change(events.COMMANDS, "update", "Update Net Profits from Venmo", keys=["net_profits", "applied_ids"])
+                st.success(f"✅ Updated net profits! Added ${amount:,.2f} from {len(pending)} Venmo payments")
+            else:
+                st.info("All Venmo payments are already included in net profits.")
+    
+    # Display the latest chat messages; earlier ones are read from the chat log on request
+    chat_log = get_chat_log(st.session_state.chat_log_id)
+    session_messages = st.session_state.messages
+    logged_before_session = min(st.session_state.chat_log_start, len(chat_log))
+    total_messages = logged_before_session + len(session_messages)
+    window = min(st.session_state.chat_window, total_messages)
+    if total_messages > window:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"Showing the last {window:,} of {total_messages:,} messages")
+        with col2:
+            if st.button("⬆️ Load earlier", key="chat_load_earlier"):
+                st.session_state.chat_window += CHAT_WINDOW
+                st.rerun()
+    if window <= len(session_messages):
+        shown_messages = session_messages[len(session_messages) - window:]
+    else:
+        earlier = window - len(session_messages)
+        shown_messages = chat_log.read(logged_before_session - earlier, logged_before_session) + session_messages
+    for message in shown_messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -1932,6 +2959,14 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
                     try:
+                        # Ground the answer in the few ledger facts matching the question
+                        st.session_state.fact_index.refresh(fact_builders())
+                        relevant_facts = st.session_state.fact_index.top(prompt)
+                        facts_block = ""
+                        if relevant_facts:
+                            facts_block = "BUSINESS DATA (from the app's ledgers; use these numbers when they answer the question):\n"
+                            facts_block += "\n".join(f"- {fact}" for fact in relevant_facts)
+                        
                         # Build the system message with context and tone
                         system_message = f"""You are a CFO assistant for a family-run slushie business. 
                         
@@ -1940,28 +2975,55 @@ TONE: Respond in a {tone.lower()} manner.
 
 {f"BUSINESS BACKGROUND: {business_context}" if business_context else ""}
 
+{facts_block}
+
 Provide practical, actionable advice on finances, operations, inventory, marketing, and business strategy. 
 Be specific and helpful based on the context and tone requested.
 
 IMPORTANT: You cannot access live internet data, create graphs, or generate images. 
 Focus on providing text-based advice, calculations, and recommendations based on the information provided.
 If asked for current prices or live data, explain that you work with the data provided by the user.
-If asked to create graphs, suggest using the Data Analysis section of this app instead."""
+If asked to create graphs, suggest using the Data Analysis section of this app instead.
+Use the provided tools for any calculation or ledger figure instead of doing arithmetic yourself."""
                         
-                        response = client.chat.completions.create(
-                            model="gpt-3.5-turbo",
-                            messages=[
+                        # Calculations and ledger figures come from local tools, computed exactly
+                        tool_context = {
+                            "sales": sales_ledger_frame(),
+                            "expenses": ledger.expense_frame(st.session_state.expense_data, rates=get_fx_rates()),
+                            "profit_data": st.session_state.get("profit_data")
+                                or {**ledger.empty_profit_data(), **store.load("profit_data", {})},
+                            "pnl_engine": st.session_state.pnl_engine,
+                        }
+                        tool_calls = []
+                        response = tools.stream_with_tools(
+                            gateway,
+                            "chat",
+                            [
                                 {"role": "system", "content": system_message}
                             ] + [
                                 {"role": m["role"], "content": m["content"]}
                                 for m in st.session_state.messages
                             ],
-                            stream=True,
+                            tool_context,
+                            tool_calls,
+                            page="Chat Assistant",
+                            action="Chat message"
                         )
 
                         response_text = st.write_stream(response)
+                        if tool_calls:
+                            st.caption("🧮 Computed locally: " + ", ".join(sorted({name for name, _, _ in tool_calls})))
                         st.session_state.messages.append({"role": "assistant", "content": response_text})
                         
+                    except usage_log.BudgetExceeded as e:
+                        # Answer from the retrieved ledger facts alone
+                        gateway.record_fallback("chat", "Chat Assistant", "Chat message")
+                        local_answer = f"💸 {str(e)}, so I can't ask the AI model right now."
+                        if relevant_facts:
+                            local_answer += " Here is what your ledgers say about that:\n\n"
+                            local_answer += "\n".join(f"- {fact}" for fact in relevant_facts)
+                        st.markdown(local_answer)
+                        st.session_state.messages.append({"role": "assistant", "content": local_answer})
                     except Exception as e:
                         error_message = f"I'm having trouble connecting right now. Please try again in a moment. (Error: {str(e)})"
                         st.error(error_message)
@@ -1971,8 +3033,39 @@ If asked to create graphs, suggest using the Data Analysis section of this app i
     st.sidebar.markdown("---")
     if st.sidebar.button("Clear Chat History"):
         st.session_state.messages = []
+        st.session_state.chat_log_cursor = 0
+        st.session_state.chat_log_start = 0
+        st.session_state.chat_window = CHAT_WINDOW
+        get_chat_log(st.session_state.chat_log_id).clear()
         st.rerun()
 
+# Append this run's chat messages to the on-disk chat log
+get_chat_log(st.session_state.chat_log_id).append(st.session_state.messages[st.session_state.chat_log_cursor:])
+st.session_state.chat_log_cursor = len(st.session_state.messages)
+
+# Save changed ledgers so offline jobs (python -m cfo.report) see the same data
+if "saved_fingerprints" not in st.session_state:
+    st.session_state.saved_fingerprints = {}
+persisted_data = {
+    "sales_data": st.session_state.sales_data,
+    "expense_data": st.session_state.expense_data,
+    "inventory_data": st.session_state.inventory_data,
+    "venmo_data": {k: v for k, v in st.session_state.venmo_data.items() if k != "access_token"},
+}
+if "profit_data" in st.session_state:
+    persisted_data["profit_data"] = st.session_state.profit_data
+# Only datasets with change events since the last save are checked
+for name, value in persisted_data.items():
+    if name not in st.session_state.unsaved:
+        continue
+    st.session_state.unsaved.discard(name)
+    if name not in st.session_state.saved_fingerprints:
+        st.session_state.saved_fingerprints[name] = store.fingerprint(store.load(name))
+    value_fingerprint = store.fingerprint(value)
+    if value_fingerprint != st.session_state.saved_fingerprints[name]:
+        store.save(name, value)
+        st.session_state.saved_fingerprints[name] = value_fingerprint
+
 # Footer
 st.markdown("---")
 st.markdown(
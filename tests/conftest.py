@@ -0,0 +1,32 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cfo import llm, llm_stub  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """The LLM stand-in on a free local port; yields its handler class for changing behaviour"""
+    handler = type("Handler", (llm_stub.StubHandler,), {"requests_seen": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    handler.base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gateway(stub):
+    """A gateway to the stand-in with distinct model names per tier and no client retries"""
+    return llm.LLMGateway(
+        "sk-test", base_url=stub.base_url, max_retries=0,
+        models={"fast": "stub-fast", "standard": "stub-standard", "long": "stub-long"},
+    )
@@ -0,0 +1,61 @@
+import pytest
+
+from cfo import archive, ledger
+
+pytest.importorskip("pyarrow")
+
+TODAY = "2024-08-15"
+
+
+def sale(day, revenue=6.0, **fields):
+    return {"Date": day, "Flavor": "Cherry", "Quantity": 2, "Revenue": revenue, **fields}
+
+
+def test_identical_sales_both_archived_once(tmp_path):
+    closed = archive.Archive(str(tmp_path))
+    records = [sale("2024-07-03"), sale("2024-07-03"), sale("2024-08-01")]
+    ledger.assign_ids(records)
+
+    kept, added = closed.close(archive.SALES, records, TODAY)
+    assert added == 2
+    assert kept == records[2:]
+
+    # A session that still holds the closed rows saves them again
+    _, added = closed.close(archive.SALES, records, TODAY)
+    assert added == 0
+    assert len(closed.frame(archive.SALES)) == 2
+    assert closed.with_open(archive.SALES, records)["Revenue"].sum() == 18.0
+
+
+def test_back_dated_copy_of_archived_sale_is_kept(tmp_path):
+    closed = archive.Archive(str(tmp_path))
+    records = [sale("2024-07-03")]
+    ledger.assign_ids(records)
+    closed.close(archive.SALES, records, TODAY)
+
+    late = [sale("2024-07-03")]
+    ledger.assign_ids(late)
+    _, added = closed.close(archive.SALES, late, TODAY)
+    assert added == 1
+    assert len(closed.frame(archive.SALES)) == 2
+
+
+def test_rows_without_ids_match_by_value(tmp_path):
+    closed = archive.Archive(str(tmp_path))
+    closed.close(archive.SALES, [sale("2024-07-03"), sale("2024-07-03")], TODAY)
+    assert closed.frame(archive.SALES)["id"].tolist() == ["", ""]
+
+    # The same legacy rows, now with IDs, are not archived twice; a third copy is
+    records = [sale("2024-07-03"), sale("2024-07-03"), sale("2024-07-03")]
+    ledger.assign_ids(records)
+    _, added = closed.close(archive.SALES, records, TODAY)
+    assert added == 1
+    assert len(closed.frame(archive.SALES)) == 3
+
+
+def test_assign_ids_keeps_existing():
+    records = [sale("2024-07-03", id="a1"), sale("2024-07-03", id=7), sale("2024-07-03", id=float("nan"))]
+    assert ledger.assign_ids(records) == 1
+    assert [record["id"] for record in records[:2]] == ["a1", "7"]
+    assert len(records[2]["id"]) == 16
+    assert ledger.assign_ids(records) == 0
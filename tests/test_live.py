@@ -0,0 +1,57 @@
+import os
+from datetime import date
+
+from cfo import live, store
+
+
+def sale(day, revenue=6.0):
+    return {"Date": date(2024, 7, day), "Flavor": "Cherry", "Quantity": 2, "Revenue": revenue}
+
+
+def save(tmp_path, name, value):
+    store.save(name, value, str(tmp_path))
+    # Each save must look new to the feed even within one clock tick
+    target = store.path(name, str(tmp_path))
+    os.utime(target, ns=(0, os.stat(target).st_mtime_ns + 1_000_000_000))
+
+
+def test_tail_reads_only_appended_records(tmp_path):
+    save(tmp_path, "sales_data", [sale(1), sale(2)])
+    records, position = store.tail("sales_data", data_dir=str(tmp_path))
+    assert records == [sale(1), sale(2)]
+
+    save(tmp_path, "sales_data", [sale(1), sale(2), sale(3), sale(4)])
+    records, position = store.tail("sales_data", position, data_dir=str(tmp_path))
+    assert records == [sale(3), sale(4)]
+    assert store.tail("sales_data", position, data_dir=str(tmp_path)) == ([], position)
+
+    # An edited last row means the file no longer continues from there
+    save(tmp_path, "sales_data", [sale(1), sale(2), sale(3), sale(4, revenue=9.0), sale(5)])
+    assert store.tail("sales_data", position, data_dir=str(tmp_path)) is None
+
+
+def test_tail_of_records_inside_a_dict(tmp_path):
+    payment = {"id": "t1", "date": date(2024, 7, 1), "time": "14:00", "amount": 4.0, "note": "cherry"}
+    save(tmp_path, "venmo_data", {"connected": True, "transactions": [payment]})
+    _, position = store.tail("venmo_data", records_key="transactions", data_dir=str(tmp_path))
+    later = {**payment, "id": "t2", "amount": 5.5}
+    save(tmp_path, "venmo_data", {"connected": True, "last_sync": "14:05", "transactions": [payment, later]})
+    records, _ = store.tail("venmo_data", position, "transactions", str(tmp_path))
+    assert records == [later]
+
+
+def test_feed_polls_appended_rows_without_reloading(tmp_path, monkeypatch):
+    feed = live.StoreFeed("sales_data", live.sales_point, window=3, data_dir=str(tmp_path))
+    save(tmp_path, "sales_data", [sale(1), sale(2)])
+    assert feed.poll() == 2
+
+    monkeypatch.setattr(store, "load", None)
+    save(tmp_path, "sales_data", [sale(1), sale(2), sale(3), sale(4)])
+    assert feed.poll() == 2
+    assert feed.poll() == 0
+    assert feed.frame()["time"].dt.day.tolist() == [2, 3, 4]
+
+    # Editing history rebuilds the window from the whole file
+    save(tmp_path, "sales_data", [sale(1), sale(2, revenue=1.0)])
+    assert feed.poll() == 2
+    assert feed.frame()["value"].tolist() == [6.0, 1.0]
@@ -0,0 +1,130 @@
+import openai
+import pytest
+
+from cfo import llm, usage
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def ask(text="hi"):
+    return [{"role": "user", "content": text}]
+
+
+def test_route_by_task_and_prompt_size(gateway):
+    assert gateway.route("chat", ask()) == ["standard", "fast"]
+    assert gateway.route("deal_analysis", ask()) == ["fast", "standard"]
+    assert gateway.route("no_such_task", ask()) == ["standard", "fast"]
+    medium = ask("x" * 4 * (llm.STANDARD_PROMPT_TOKENS + 10))
+    assert gateway.route("deal_analysis", medium) == ["standard", "fast"]
+    long = ask("x" * 4 * (llm.LONG_PROMPT_TOKENS + 10))
+    assert gateway.route("deal_analysis", long) == ["long", "fast", "standard"]
+    assert gateway.route("chat", long) == ["long", "standard", "fast"]
+
+
+def test_request_goes_to_routed_model(gateway):
+    response, model = gateway.create("deal_analysis", ask())
+    assert model == response.model == "stub-fast"
+    _, model = gateway.create("deal_analysis", ask("x" * 4 * (llm.LONG_PROMPT_TOKENS + 10)))
+    assert model == "stub-long"
+
+
+def test_transient_error_falls_back_to_next_model(stub, gateway):
+    stub.fail_models = ("stub-standard",)
+    response, model = gateway.create("chat", ask())
+    assert model == "stub-fast"
+    assert response.choices[0].message.content == "Stub answer to: hi"
+    assert gateway.breaker("stub-standard").failures == 1
+    assert gateway.breaker("stub-fast").state == "closed"
+
+
+def test_last_error_raised_when_every_model_fails(stub, gateway):
+    stub.fail_models = ("stub-standard", "stub-fast")
+    with pytest.raises(openai.InternalServerError):
+        gateway.create("chat", ask())
+
+
+def test_breaker_opens_goes_half_open_and_recovers(stub, gateway):
+    clock = Clock()
+    breaker = gateway.breaker("stub-standard")
+    breaker.clock = clock
+    stub.fail_models = ("stub-standard",)
+    for _ in range(breaker.failure_threshold):
+        gateway.create("chat", ask())
+    assert breaker.state == "open"
+
+    # While open the model is skipped without a request
+    seen = stub.requests_seen
+    _, model = gateway.create("chat", ask())
+    assert model == "stub-fast"
+    assert stub.requests_seen == seen + 1
+
+    # Half-open lets one trial through; a failed trial re-opens at once
+    clock.now += breaker.reset_after
+    assert breaker.state == "half-open"
+    gateway.create("chat", ask())
+    assert breaker.state == "open"
+
+    clock.now += breaker.reset_after
+    stub.fail_models = ()
+    _, model = gateway.create("chat", ask())
+    assert model == "stub-standard"
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_breaker_allows_one_half_open_trial():
+    clock = Clock()
+    breaker = llm.CircuitBreaker(failure_threshold=2, reset_after=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_unavailable_when_every_breaker_is_open(gateway):
+    for model in ("stub-standard", "stub-fast"):
+        breaker = gateway.breaker(model)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+    with pytest.raises(llm.LLMUnavailable):
+        gateway.create("chat", ask())
+
+
+def test_stream_recorded_as_success(gateway, tmp_path):
+    gateway.usage = usage.UsageLedger(str(tmp_path))
+    stream, model = gateway.create("chat", ask(), stream=True, page="Chat Assistant")
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+    assert text == "Stub answer to: hi"
+    log = gateway.usage.frame()
+    assert log["status"].tolist() == [usage.OK]
+    assert log["completion_tokens"].iloc[0] > 0
+    assert gateway.breaker(model).failures == 0
+
+
+def test_error_mid_stream_recorded_as_failure(stub, gateway, tmp_path):
+    gateway.usage = usage.UsageLedger(str(tmp_path))
+    breaker = gateway.breaker("stub-standard")
+    stub.fail_stream = True
+    for attempt in range(breaker.failure_threshold):
+        stream, model = gateway.create("chat", ask(), stream=True, page="Chat Assistant")
+        assert model == "stub-standard"
+        with pytest.raises(openai.APIError):
+            for _ in stream:
+                pass
+    assert breaker.state == "open"
+    assert gateway.usage.frame()["status"].tolist() == [usage.ERROR] * breaker.failure_threshold
+
+    # The next request goes straight to the fallback model
+    _, model = gateway.create("chat", ask(), stream=True)
+    assert model == "stub-fast"
@@ -0,0 +1,48 @@
+from cfo import reconcile
+
+
+def payment(id, date, amount=5.0, note="cherry slushie", time="12:00"):
+    return {"id": id, "date": date, "time": time, "amount": amount, "note": note}
+
+
+def sale(date, flavor="Cherry", revenue=5.0):
+    return {"Date": date, "Flavor": flavor, "Quantity": 1, "Revenue": revenue}
+
+
+def test_exact_match_uses_each_sale_once():
+    result = reconcile.reconcile(
+        [payment("a", "2026-07-01"), payment("b", "2026-07-01")],
+        [sale("2026-07-01"), sale("2026-07-01")],
+    )
+    assert sorted(result["matched"]["sale"]) == [0, 1]
+    assert result["matched"]["method"].eq("exact").all()
+    assert result["summary"]["matched_amount"] == 10.0
+
+
+def test_nearest_and_amount_only_passes():
+    result = reconcile.reconcile(
+        [payment("a", "2026-07-02"), payment("b", "2026-07-05", note="thanks")],
+        [sale("2026-07-01"), sale("2026-07-05", flavor="Lime")],
+    )
+    assert dict(zip(result["matched"]["id"], result["matched"]["method"])) == {"a": "nearest", "b": "amount only"}
+
+
+def test_undated_rows_never_match():
+    result = reconcile.reconcile(
+        [payment("a", "bad"), payment("b", "bad")],
+        [sale("bad"), sale("bad")],
+    )
+    assert result["matched"].empty
+    assert result["summary"]["matched_amount"] == 0.0
+    assert result["summary"]["unmatched_payments"] == 2
+    assert result["summary"]["unmatched_sales"] == 2
+
+
+def test_undated_rows_leave_dated_matches_alone():
+    result = reconcile.reconcile(
+        [payment("a", "bad"), payment("b", "2026-07-01")],
+        [sale("bad"), sale("2026-07-01")],
+    )
+    assert result["matched"]["id"].tolist() == ["b"]
+    assert result["matched"]["payment"].is_unique and result["matched"]["sale"].is_unique
+    assert result["unmatched_payments"]["id"].tolist() == ["a"]
@@ -0,0 +1,77 @@
+import json
+
+from cfo import tools
+
+
+class RecordingGateway:
+    """Passes requests through to a gateway, keeping the keyword arguments of each"""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.requests = []
+
+    def create(self, task, messages, **kwargs):
+        self.requests.append({"messages": list(messages), **kwargs})
+        return self.gateway.create(task, messages, **kwargs)
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_tool_round_feeds_result_back(gateway):
+    recorder = RecordingGateway(gateway)
+    used = []
+    answer = "".join(tools.stream_with_tools(
+        recorder, "chat", ask('call_tool:profit_margin {"revenue": 200, "costs": 150}'), {}, used=used
+    ))
+
+    assert [name for name, _, _ in used] == ["profit_margin"]
+    result = json.loads(used[0][2])
+    assert result["profit"] == 50
+    assert answer == f"Tool results: {used[0][2]}"
+    # The second round carries the call and its result, linked by ID
+    assert len(recorder.requests) == 2
+    call, reply = recorder.requests[1]["messages"][-2:]
+    assert call["tool_calls"][0]["function"]["name"] == "profit_margin"
+    assert reply == {"role": "tool", "tool_call_id": call["tool_calls"][0]["id"], "content": used[0][2]}
+
+
+def test_max_rounds_forces_text_answer(gateway):
+    recorder = RecordingGateway(gateway)
+    used = []
+    answer = "".join(tools.stream_with_tools(
+        recorder, "chat", ask('call_tool:roi {"investment": 100, "returns": 150}'), {}, used=used, max_rounds=0
+    ))
+
+    assert used == []
+    assert answer == "Stub answer without tools to: roi"
+    assert len(recorder.requests) == 1
+    assert "tools" not in recorder.requests[0]
+
+
+def test_last_round_offers_no_tools(gateway):
+    recorder = RecordingGateway(gateway)
+    list(tools.stream_with_tools(
+        recorder, "chat", ask('call_tool:roi {"investment": 100, "returns": 150}'), {}, max_rounds=1
+    ))
+
+    assert ["tools" in request for request in recorder.requests] == [True, False]
+
+
+def test_tool_error_reported_as_json(gateway):
+    used = []
+    answer = "".join(tools.stream_with_tools(
+        gateway, "chat", ask('call_tool:break_even {"fixed_costs": 100}'), {}, used=used
+    ))
+
+    name, arguments, result = used[0]
+    assert name == "break_even"
+    assert set(json.loads(result)) == {"error"}
+    assert answer == f"Tool results: {result}"
+
+
+def test_run_tool_errors():
+    assert json.loads(tools.run_tool("no_such_tool", "{}", {})) == {"error": "Unknown tool: no_such_tool"}
+    assert "error" in json.loads(tools.run_tool("roi", "not json", {}))
+    assert json.loads(tools.run_tool("roi", '{"investment": 100, "returns": 150}', {}))["roi_percent"] == 50
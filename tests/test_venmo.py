@@ -0,0 +1,26 @@
+from cfo import venmo
+
+
+def payment(**fields):
+    return {"date": "2024-07-03", "time": "14:05", "amount": 4.0, "note": "cherry", **fields}
+
+
+def test_identical_payments_without_ids_are_kept_apart():
+    ledger = venmo.VenmoLedger()
+    added = ledger.ingest([payment(), payment(), payment(amount=5.5)])
+    assert len(added) == 3
+    assert len({record["id"] for record in added}) == 3
+    assert ledger.daily_total("2024-07-03") == 13.5
+
+
+def test_syncing_again_adds_nothing():
+    ledger = venmo.VenmoLedger([payment(), payment()])
+    assert ledger.ingest([payment(), payment()]) == []
+    # A later sync that sees a third identical payment adds only that one
+    assert len(ledger.ingest([payment(), payment(), payment()])) == 1
+    assert len(ledger) == 3
+
+
+def test_own_ids_are_used_as_given():
+    ledger = venmo.VenmoLedger([payment(id=17), payment(id=17)])
+    assert [record["id"] for record in ledger.transactions] == ["17"]